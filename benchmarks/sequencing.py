@@ -0,0 +1,121 @@
+"""
+Benchmarks of building and rendering transmon sequences against a dummy
+calibration config. Run with ``asv run`` or, for a one off profile with the
+time per waveform generator, ``profile_sequence_build``.
+"""
+from abc import ABC, abstractmethod
+from qdev_wrappers.transmon import clear_waveform_cache, profile_generators
+from qdev_wrappers.transmon.sequencing import dummy_calibration, \
+    make_allxy_sequence, make_benchmarking_sequence, \
+    make_floquet_dur_sequence, make_t1_sequence
+from qdev_wrappers.transmon.sequencing.floquet import _get_required_channels
+
+
+class _SequenceBenchmark(ABC):
+    qubit_count = 1
+
+    def setup(self, *params):
+        self._calibration = dummy_calibration(
+            qubit_count=self.qubit_count)
+        self._calibration.__enter__()
+        clear_waveform_cache()
+
+    def teardown(self, *params):
+        self._calibration.__exit__(None, None, None)
+
+    @abstractmethod
+    def build(self, *params):
+        """
+        Builds the sequence benchmarked for the given parameters
+        """
+
+    def render(self, *params):
+        self.build(*params).unwrap()
+
+    def track_generated_samples(self, *params):
+        with profile_generators() as generators:
+            self.render(*params)
+        return sum(g['samples'] for g in generators.values())
+
+    track_generated_samples.unit = 'samples'
+
+
+class AllXY(_SequenceBenchmark):
+
+    def time_build(self):
+        self.build()
+
+    def time_render(self):
+        self.render()
+
+    def peakmem_render(self):
+        self.render()
+
+    def build(self):
+        return make_allxy_sequence()
+
+
+class Benchmarking(_SequenceBenchmark):
+    params = [[10, 100, 1000, 5000], [2, 20]]
+    param_names = ['sequences', 'length']
+    timeout = 600
+
+    def time_build(self, sequences, length):
+        self.build(sequences, length)
+
+    def time_render(self, sequences, length):
+        self.render(sequences, length)
+
+    def peakmem_render(self, sequences, length):
+        self.render(sequences, length)
+
+    def build(self, sequences, length):
+        return make_benchmarking_sequence(length, sequences, seed=0)
+
+
+class T1(_SequenceBenchmark):
+    params = [10, 100, 1000, 5000]
+    param_names = ['elements']
+    timeout = 600
+
+    def time_build(self, elements):
+        self.build(elements)
+
+    def time_render(self, elements):
+        self.render(elements)
+
+    def peakmem_render(self, elements):
+        self.render(elements)
+
+    def build(self, elements):
+        return make_t1_sequence(0, 5e-6, 5e-6 / (elements - 1))
+
+
+class Floquet(_SequenceBenchmark):
+    params = [[1, 2, 4, 8], [10, 100, 1000]]
+    param_names = ['qubits', 'elements']
+    timeout = 600
+
+    def setup(self, qubits, elements):
+        self.qubit_count = qubits
+        super().setup(qubits, elements)
+
+    def time_build(self, qubits, elements):
+        self.build(qubits, elements)
+
+    def time_render(self, qubits, elements):
+        self.render(qubits, elements)
+
+    def peakmem_render(self, qubits, elements):
+        self.render(qubits, elements)
+
+    def build(self, qubits, elements):
+        control_channels = 1 if qubits == 1 else 2
+        channels = list(range(1, 1 + _get_required_channels(
+            qubit_num=qubits, control_channels_per_qubit=control_channels,
+            one_readout_ch_many_qubits=True)))
+        z_amps = None if qubits == 1 else [0.1] * qubits
+        return make_floquet_dur_sequence(
+            0, 5e-6, 5e-6 / (elements - 1),
+            qubit_indices=list(range(qubits)), channels=channels,
+            z_amps=z_amps)
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from typing import Any, BinaryIO, Dict, List, Sequence, Tuple
+import os
+import struct
+
+import numpy as np
+
+from qcodes.dataset.data_set import load_by_id
+from qcodes.dataset.measurements import res_type
+from qcodes.instrument.base import _BaseParameter
+from qcodes.instrument.parameter import ArrayParameter, ParameterWithSetpoints
+
+COLUMN_STORE_METADATA_TAG = 'column_store'
+
+# size of the .npy header, large enough for the shape to grow in place
+_HEADER_SIZE = 256
+
+
+def _npy_header(dtype: np.dtype, shape: Tuple[int, ...]) -> bytes:
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype),
+                   'fortran_order': False,
+                   'shape': shape})
+    # magic string, version and header length take 10 bytes
+    header = header.ljust(_HEADER_SIZE - 10 - 1) + '\n'
+    return (b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) +
+            header.encode('latin1'))
+
+
+def is_array_parameter(parameter: Any) -> bool:
+    return isinstance(parameter, (ArrayParameter, ParameterWithSetpoints))
+
+
+class ColumnStore:
+    """
+    Chunked column store for the array valued results of a doNd run, kept
+    next to the SQLite run. The results are buffered per point and appended
+    a whole inner sweep at a time to one ``.npy`` file per column, with the
+    values of the setpoints of each point in their own columns. Once closed
+    the columns can be read, also memory mapped, with ``np.load`` or
+    ``load_column_store``.
+
+    Args:
+        path: Folder to store the columns in
+        array_params: The parameters whose results are written to the store
+            instead of the SQLite database
+    """
+
+    def __init__(self, path: str,
+                 array_params: Sequence[_BaseParameter]) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._names = {param.full_name for param in array_params}
+        self._buffer: Dict[str, List[Any]] = defaultdict(list)
+        self._files: Dict[str, BinaryIO] = {}
+        self._dtypes: Dict[str, np.dtype] = {}
+        self._shapes: Dict[str, Tuple[int, ...]] = {}
+
+    def take(self, setpoints: Sequence[res_type],
+             results: Sequence[res_type]) -> List[res_type]:
+        """
+        Buffer the array valued ``results`` of one point together with its
+        ``setpoints`` and return the remaining results.
+        """
+        arrays = [r for r in results if r[0].full_name in self._names]
+        if len(arrays) == 0:
+            return list(results)
+        for param, value in (*setpoints, *arrays):
+            self._buffer[param.full_name].append(value)
+        return [r for r in results if r[0].full_name not in self._names]
+
+    def flush(self, reverse: bool = False) -> None:
+        """
+        Append the buffered points to the columns, in reversed order if
+        ``reverse``.
+        """
+        for name, values in self._buffer.items():
+            if reverse:
+                values = values[::-1]
+            self._append(name, np.asarray(values))
+        self._buffer.clear()
+
+    def _append(self, name: str, values: np.ndarray) -> None:
+        if name not in self._files:
+            self._dtypes[name] = values.dtype
+            self._shapes[name] = (0,) + values.shape[1:]
+            self._files[name] = open(os.path.join(self.path, f'{name}.npy'),
+                                     'w+b')
+            self._files[name].write(_npy_header(values.dtype,
+                                                self._shapes[name]))
+        if values.shape[1:] != self._shapes[name][1:]:
+            raise ValueError(f'Shape {values.shape[1:]} of {name} differs '
+                             f'from its previous shape '
+                             f'{self._shapes[name][1:]}')
+        dtype = np.result_type(self._dtypes[name], values.dtype)
+        if dtype != self._dtypes[name]:
+            self._promote(name, dtype)
+        file = self._files[name]
+        values.astype(self._dtypes[name], copy=False).tofile(file)
+        shape = self._shapes[name]
+        self._shapes[name] = (shape[0] + len(values),) + shape[1:]
+        # keep the header up to date so the file is readable after a crash
+        file.seek(0)
+        file.write(_npy_header(self._dtypes[name], self._shapes[name]))
+        file.seek(0, os.SEEK_END)
+        file.flush()
+
+    def _promote(self, name: str, dtype: np.dtype) -> None:
+        """
+        Rewrite the column ``name`` with the values appended so far cast to
+        ``dtype``, for values that do not fit its previous dtype.
+        """
+        file = self._files[name]
+        file.seek(_HEADER_SIZE)
+        previous = np.fromfile(file, dtype=self._dtypes[name],
+                               count=int(np.prod(self._shapes[name])))
+        self._dtypes[name] = dtype
+        file.seek(0)
+        file.truncate()
+        file.write(_npy_header(dtype, self._shapes[name]))
+        previous.astype(dtype).tofile(file)
+
+    def close(self) -> None:
+        """
+        Write out the remaining points and close the columns.
+        """
+        self.flush()
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+
+
+def load_column_store(run_id: int,
+                      mmap_mode: str = 'r') -> Dict[str, np.ndarray]:
+    """
+    Load the columns written to the column store of a doNd run.
+
+    Args:
+        run_id: The run measured with ``column_store=True``
+        mmap_mode: passed to ``np.load``, None loads the columns into memory
+
+    Returns:
+        Dictionary from parameter full names to the arrays of their values
+        at each point
+    """
+    path = load_by_id(run_id).metadata.get(COLUMN_STORE_METADATA_TAG)
+    if path is None:
+        raise ValueError(f'Run {run_id} has no column store')
+    return {os.path.splitext(file)[0]: np.load(os.path.join(path, file),
+                                               mmap_mode=mmap_mode)
+            for file in sorted(os.listdir(path)) if file.endswith('.npy')}
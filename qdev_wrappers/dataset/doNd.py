@@ -1,17 +1,26 @@
+from concurrent.futures import Future
 from contextlib import contextmanager
-from typing import Callable, Sequence, Union, Tuple, List, Optional, Iterator
+from typing import (Any, Callable, Dict, Sequence, Union, Tuple, List,
+                    Optional, Iterator)
+import json
 import os
-import time
 
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 
 from qcodes.dataset.measurements import Measurement, res_type, DataSaver
-from qcodes.instrument.base import _BaseParameter
+from qcodes.instrument.base import _BaseParameter, Instrument, InstrumentBase
+from qcodes.dataset.data_set import load_by_id
 from qcodes.dataset.plotting import plot_by_id
 from qcodes import config
 
+from qdev_wrappers.dataset.column_store import (
+    ColumnStore, COLUMN_STORE_METADATA_TAG, is_array_parameter)
+from qdev_wrappers.dataset.live_plot import LivePlot
+from qdev_wrappers.dataset.profiling import SweepProfiler
+from qdev_wrappers.plot_functions import _get_plot_executor
+
 ActionsT = Sequence[Callable[[], None]]
 
 ParamMeasT = Union[_BaseParameter, Callable[[], None]]
@@ -22,17 +31,99 @@ AxesTupleList = Tuple[List[matplotlib.axes.Axes],
 AxesTupleListWithRunId = Tuple[int, List[matplotlib.axes.Axes],
                       List[Optional[matplotlib.colorbar.Colorbar]]]
 
+RunIdWithFuture = Tuple[int, Future]
+
+LossT = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+SWEEP_METADATA_TAG = 'doNd_sweep'
+
 
-def _process_params_meas(param_meas: ParamMeasT) -> List[res_type]:
+def _process_params_meas(
+        param_meas: ParamMeasT,
+        profiler: Optional[SweepProfiler] = None
+) -> List[res_type]:
     output = []
     for parameter in param_meas:
         if isinstance(parameter, _BaseParameter):
-            output.append((parameter, parameter.get()))
+            if profiler is None:
+                output.append((parameter, parameter.get()))
+            else:
+                output.append((parameter, profiler.time_get(parameter)))
         elif callable(parameter):
-            parameter()
+            if profiler is None:
+                parameter()
+            else:
+                profiler.time_call(parameter)
     return output
 
 
+def _set_parameter(
+        param_set: _BaseParameter,
+        set_point: float,
+        profiler: Optional[SweepProfiler] = None,
+        last_set: Optional[Dict[_BaseParameter, float]] = None
+) -> None:
+    """
+    Set ``param_set`` to ``set_point``. If ``last_set`` is given, the set is
+    skipped when the parameter was already set to ``set_point`` in
+    ``last_set``, and ``last_set`` is updated otherwise.
+    """
+    if last_set is not None and last_set.get(param_set) == set_point:
+        return
+    if profiler is None:
+        param_set.set(set_point)
+    else:
+        profiler.time_set(param_set, set_point)
+    if last_set is not None:
+        last_set[param_set] = set_point
+
+
+def _set_cache(
+        params_set: Sequence[_BaseParameter],
+        skip_unchanged: Sequence[_BaseParameter]
+) -> Dict[_BaseParameter, Optional[Dict[_BaseParameter, float]]]:
+    """
+    Last set values for each of the swept parameters in ``skip_unchanged``,
+    shared between them, or None for the parameters that are always set.
+    """
+    last_set: Dict[_BaseParameter, float] = {}
+    return {param: last_set if param in skip_unchanged else None
+            for param in params_set}
+
+
+def _clear_set_cache(
+        cache: Dict[_BaseParameter, Optional[Dict[_BaseParameter, float]]]
+) -> None:
+    """
+    Forget the last set values, e.g. after user actions that may have
+    changed the swept parameters.
+    """
+    for last_set in cache.values():
+        if last_set is not None:
+            last_set.clear()
+
+
+def _add_result(
+        datasaver: DataSaver,
+        *results: res_type,
+        profiler: Optional[SweepProfiler] = None
+) -> None:
+    if profiler is None:
+        datasaver.add_result(*results)
+    else:
+        with profiler.timer('datasaver'):
+            datasaver.add_result(*results)
+
+
+def _finish_profiling(
+        datasaver: DataSaver,
+        profiler: Optional[SweepProfiler] = None
+) -> None:
+    if profiler is not None:
+        profiler.save(datasaver._dataset)
+        profiler.print_summary()
+
+
 def _register_parameters(
         meas: Measurement,
         param_meas: List[ParamMeasT],
@@ -67,6 +158,50 @@ def _set_write_period(
         meas.write_period = write_period
 
 
+def _describe_parameter(parameter: ParamMeasT) -> Dict[str, Optional[str]]:
+    if isinstance(parameter, _BaseParameter):
+        instrument = parameter.root_instrument
+        return {'parameter': parameter.full_name,
+                'instrument': instrument.name if instrument else None}
+    return {'callable': getattr(parameter, '__name__', repr(parameter))}
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Convert the numpy scalars and arrays that the sweep arguments may be
+    given as for ``json.dumps``.
+    """
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON '
+                    f'serializable')
+
+
+def _save_sweep(
+        datasaver: DataSaver,
+        function: str,
+        sweeps: Sequence[Tuple[_BaseParameter, float, float, int, float]],
+        param_meas: Sequence[ParamMeasT],
+        resumed_from: Optional[int] = None,
+        **kwargs: Any
+) -> None:
+    """
+    Store the definition of the sweep in the run metadata, so that an
+    interrupted run can be continued with ``resume``, and the run it
+    continues, if any.
+    """
+    sweep = {'function': function,
+             'sweeps': [dict(_describe_parameter(param), start=start,
+                             stop=stop, num_points=num_points, delay=delay)
+                        for param, start, stop, num_points, delay in sweeps],
+             'param_meas': [_describe_parameter(p) for p in param_meas],
+             'kwargs': kwargs}
+    datasaver._dataset.add_metadata(SWEEP_METADATA_TAG,
+                                    json.dumps(sweep, default=_json_default))
+    if resumed_from is not None:
+        datasaver._dataset.add_metadata('resumed_from', resumed_from)
+
+
 @contextmanager
 def _catch_keyboard_interrupts() -> Iterator[Callable[[], bool]]:
     interrupted = False
@@ -83,8 +218,9 @@ def _catch_keyboard_interrupts() -> Iterator[Callable[[], bool]]:
 def do0d(
     *param_meas:  ParamMeasT,
     write_period: Optional[float] = None,
-    do_plot: bool = True
-) -> AxesTupleListWithRunId:
+    do_plot: bool = True,
+    plot_in_background: bool = False
+) -> Union[AxesTupleListWithRunId, RunIdWithFuture]:
     """
     Perform a measurement of a single parameter. This is probably most
     useful for an ArrayParamter that already returns an array of data points
@@ -96,9 +232,13 @@ def do0d(
           supplied.
         do_plot: should png and pdf versions of the images be saved after the
             run.
+        plot_in_background: if True the plots are created and saved in a
+            separate process and the function returns right away. The
+            figures stay in that process, use ``plot_by_id`` for the axes.
 
     Returns:
-        The run_id of the DataSet created
+        The run_id of the DataSet created and, if ``plot_in_background``,
+        a future that resolves to the paths of the saved plot files.
     """
     meas = Measurement()
     _register_parameters(meas, param_meas)
@@ -107,7 +247,8 @@ def do0d(
     with meas.run() as datasaver:
         datasaver.add_result(*_process_params_meas(param_meas))
 
-    return _handle_plotting(datasaver, do_plot)
+    return _handle_plotting(datasaver, do_plot,
+                            background=plot_in_background)
 
 
 
@@ -120,8 +261,13 @@ def do1d(
     enter_actions: ActionsT = (),
     exit_actions: ActionsT = (),
     write_period: Optional[float] = None,
-    do_plot: bool = True
-) -> AxesTupleListWithRunId:
+    live_plot: bool = False,
+    profiler: Optional[SweepProfiler] = None,
+    skip_unchanged: Sequence[_BaseParameter] = (),
+    do_plot: bool = True,
+    plot_in_background: bool = False,
+    resumed_from: Optional[int] = None
+) -> Union[AxesTupleListWithRunId, RunIdWithFuture]:
     """
     Perform a 1D scan of ``param_set`` from ``start`` to ``stop`` in
     ``num_points`` measuring param_meas at each step. In case param_meas is
@@ -141,11 +287,26 @@ def do1d(
             called before the measurements start
         exit_actions: A list of functions taking no arguments that will be
             called after the measurements ends
+        live_plot: if True the measured parameters are plotted while the
+            measurement is running.
+        profiler: a ``SweepProfiler`` that records the time spent on each
+            set, get and write of every point of the sweep.
+        skip_unchanged: swept parameters that are not set again if their
+            setpoint equals the value they were last set to in this sweep.
+            Only list parameters which are not changed by anything else
+            during the sweep. The last set values are forgotten after
+            every action.
         do_plot: should png and pdf versions of the images be saved after the
             run.
+        plot_in_background: if True the plots are created and saved in a
+            separate process and the function returns right away. The
+            figures stay in that process, use ``plot_by_id`` for the axes.
+        resumed_from: the run this sweep continues, stored in the
+            'resumed_from' metadata. Set by ``resume``.
 
     Returns:
-        The run_id of the DataSet created
+        The run_id of the DataSet created and, if ``plot_in_background``,
+        a future that resolves to the paths of the saved plot files.
     """
     meas = Measurement()
     _register_parameters(meas, (param_set,))
@@ -157,12 +318,195 @@ def do1d(
     # do1D enforces a simple relationship between measured parameters
     # and set parameters. For anything more complicated this should be
     # reimplemented from scratch
+    live = None
+    if live_plot:
+        live = LivePlot(((param_set, start, stop, num_points),), param_meas)
+
     with _catch_keyboard_interrupts() as interrupted, meas.run() as datasaver:
+        _save_sweep(datasaver, 'do1d',
+                    ((param_set, start, stop, num_points, delay),),
+                    param_meas, resumed_from=resumed_from,
+                    write_period=write_period)
+        if live is not None:
+            live.subscribe(datasaver._dataset)
+        last_set = _set_cache((param_set,), skip_unchanged)
         for set_point in np.linspace(start, stop, num_points):
+            _set_parameter(param_set, set_point, profiler,
+                           last_set[param_set])
+            _add_result(datasaver, (param_set, set_point),
+                        *_process_params_meas(param_meas, profiler),
+                        profiler=profiler)
+            if live is not None:
+                live.update()
+    _finish_profiling(datasaver, profiler)
+    if live is not None:
+        live.update(force=True)
+    return _handle_plotting(datasaver, do_plot, interrupted(),
+                            background=plot_in_background)
+
+
+def gradient_loss(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Loss of each interval between neighbouring points given by its length
+    in the x-y plane, with both axes scaled to the range of the data. Steep
+    parts of the curve are thereby sampled more densely than flat ones.
+
+    Args:
+        x: sorted setpoints
+        y: measured values at the setpoints
+
+    Returns:
+        array with the loss of each of the ``len(x) - 1`` intervals
+    """
+    x_scale = np.ptp(x) or 1
+    y_scale = np.ptp(y) or 1
+    return np.hypot(np.diff(x) / x_scale, np.diff(y) / y_scale)
+
+
+def curvature_loss(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Loss of each interval between neighbouring points given by the area of
+    the triangles it forms with its neighbouring points, with both axes
+    scaled to the range of the data. Peaks and kinks are thereby sampled
+    more densely than straight parts of the curve. A small contribution of
+    the ``gradient_loss`` makes sure that no region is left out entirely.
+
+    Args:
+        x: sorted setpoints
+        y: measured values at the setpoints
+
+    Returns:
+        array with the loss of each of the ``len(x) - 1`` intervals
+    """
+    lengths = gradient_loss(x, y)
+    if len(x) < 3:
+        return lengths
+    xs = x / (np.ptp(x) or 1)
+    ys = y / (np.ptp(y) or 1)
+    areas = 0.5 * np.abs((xs[1:-1] - xs[:-2]) * (ys[2:] - ys[:-2]) -
+                         (xs[2:] - xs[:-2]) * (ys[1:-1] - ys[:-2]))
+    # each interval is adjacent to the triangles on both of its ends
+    padded = np.concatenate(([0], areas, [0]))
+    triangle = np.maximum(padded[:-1], padded[1:])
+    return np.sqrt(triangle) + 0.02 * lengths
+
+
+_LOSS_FUNCTIONS = {'gradient': gradient_loss,
+                   'curvature': curvature_loss}
+
+
+def do1d_adaptive(
+    param_set: _BaseParameter, start: float, stop: float,
+    num_points: int, delay: float,
+    *param_meas: ParamMeasT,
+    loss_param: Optional[_BaseParameter] = None,
+    loss: Union[str, LossT] = 'gradient',
+    min_step: Optional[float] = None,
+    initial_points: int = 5,
+    enter_actions: ActionsT = (),
+    exit_actions: ActionsT = (),
+    write_period: Optional[float] = None,
+    do_plot: bool = True,
+    plot_in_background: bool = False
+) -> Union[AxesTupleListWithRunId, RunIdWithFuture]:
+    """
+    Perform an adaptive 1D scan of ``param_set`` between ``start`` and
+    ``stop`` measuring param_meas at each step. The scan starts on a coarse
+    uniform grid of ``initial_points`` and then repeatedly bisects the
+    interval with the largest loss, so that points are concentrated where
+    the measured curve changes. The setpoints are stored in the DataSet in
+    the order they are measured.
+
+    Args:
+        param_set: The QCoDeS parameter to sweep over
+        start: Starting point of sweep
+        stop: End point of sweep
+        num_points: Maximum number of points to measure
+        delay: Delay after setting paramter before measurement is performed
+        *param_meas: Parameter(s) to measure at each step or functions that
+          will be called at each step. The function should take no arguments.
+          The parameters and functions are called in the order they are
+          supplied.
+        loss_param: The measured parameter whose values determine where to
+            measure next. Must return a scalar. Defaults to the first
+            parameter in ``param_meas``.
+        loss: Either 'gradient', 'curvature' or a function taking the sorted
+            setpoints and the corresponding values of ``loss_param`` and
+            returning the loss of each interval between neighbouring points.
+        min_step: Intervals shorter than twice this value are not split any
+            further. The scan stops early once all intervals are this short.
+        initial_points: Number of points of the initial uniform grid
+        enter_actions: A list of functions taking no arguments that will be
+            called before the measurements start
+        exit_actions: A list of functions taking no arguments that will be
+            called after the measurements ends
+        do_plot: should png and pdf versions of the images be saved after the
+            run.
+        plot_in_background: if True the plots are created and saved in a
+            separate process and the function returns right away. The
+            figures stay in that process, use ``plot_by_id`` for the axes.
+
+    Returns:
+        The run_id of the DataSet created and, if ``plot_in_background``,
+        a future that resolves to the paths of the saved plot files.
+    """
+    if loss_param is None:
+        loss_params = [p for p in param_meas if isinstance(p, _BaseParameter)]
+        if len(loss_params) == 0:
+            raise ValueError('do1d_adaptive needs at least one parameter to '
+                             'measure')
+        loss_param = loss_params[0]
+    elif loss_param not in param_meas:
+        raise ValueError(f'loss_param {loss_param.name} is not among the '
+                         f'measured parameters')
+    if isinstance(loss, str):
+        try:
+            loss = _LOSS_FUNCTIONS[loss]
+        except KeyError:
+            raise ValueError(f'Unknown loss {loss}, must be one of '
+                             f'{list(_LOSS_FUNCTIONS)} or a callable')
+
+    meas = Measurement()
+    _register_parameters(meas, (param_set,))
+    _register_parameters(meas, param_meas, setpoints=(param_set,))
+    _set_write_period(meas, write_period)
+    _register_actions(meas, enter_actions, exit_actions)
+    param_set.post_delay = delay
+
+    setpoints = np.array([])
+    values = np.array([])
+
+    with _catch_keyboard_interrupts() as interrupted, meas.run() as datasaver:
+
+        def measure(set_point):
+            nonlocal setpoints, values
             param_set.set(set_point)
-            datasaver.add_result((param_set, set_point),
-                                  *_process_params_meas(param_meas))
-    return _handle_plotting(datasaver, do_plot, interrupted())
+            results = _process_params_meas(param_meas)
+            datasaver.add_result((param_set, set_point), *results)
+            value = dict(results)[loss_param]
+            if np.ndim(value) != 0:
+                raise ValueError(f'loss_param {loss_param.name} must return '
+                                 f'a scalar')
+            index = np.searchsorted(setpoints, set_point)
+            setpoints = np.insert(setpoints, index, set_point)
+            if np.iscomplexobj(value):
+                value = np.abs(value)
+            values = np.insert(values, index, value)
+
+        for set_point in np.linspace(start, stop,
+                                     max(2, min(initial_points, num_points))):
+            measure(set_point)
+        while len(setpoints) < num_points:
+            losses = loss(setpoints, values)
+            steps = np.diff(setpoints)
+            losses[steps <= 2 * (min_step or 0)] = 0
+            index = np.argmax(losses)
+            if losses[index] <= 0:
+                break
+            measure(setpoints[index] + steps[index] / 2)
+
+    return _handle_plotting(datasaver, do_plot, interrupted(),
+                            background=plot_in_background)
 
 
 def do2d(
@@ -178,8 +522,16 @@ def do2d(
     after_inner_actions: ActionsT = (),
     write_period: Optional[float] = None,
     flush_columns: bool = False,
-    do_plot: bool=True
-) -> AxesTupleListWithRunId:
+    snake: bool = False,
+    live_plot: bool = False,
+    profiler: Optional[SweepProfiler] = None,
+    column_store: bool = False,
+    skip_unchanged: Sequence[_BaseParameter] = (),
+    snake_reversed: bool = False,
+    do_plot: bool = True,
+    plot_in_background: bool = False,
+    resumed_from: Optional[int] = None
+) -> Union[AxesTupleListWithRunId, RunIdWithFuture]:
 
     """
     Perform a 1D scan of ``param_set1`` from ``start1`` to ``stop1`` in
@@ -209,55 +561,256 @@ def do2d(
             called after the measurements ends
         before_inner_actions: Actions executed before each run of the inner loop
         after_inner_actions: Actions executed after each run of the inner loop
+        snake: if True the direction of the inner sweep is reversed on every
+            other run of the inner loop, so that the inner parameter never
+            has to ramp back to ``start2``. The results of each inner sweep
+            are still added to the dataset in the order from ``start2`` to
+            ``stop2``.
+        snake_reversed: if True the first inner sweep of a snake is reversed
+            instead of the second one.
+        live_plot: if True the measured parameters are plotted while the
+            measurement is running.
+        profiler: a ``SweepProfiler`` that records the time spent on each
+            set, get and write of every point of the sweep.
+        skip_unchanged: swept parameters that are not set again if their
+            setpoint equals the value they were last set to in this sweep.
+            Only list parameters which are not changed by anything else
+            during the sweep. The last set values are forgotten after
+            every action.
+        column_store: if True the results of array valued parameters are not
+            written to the database but appended a whole inner sweep at a
+            time to a ``ColumnStore`` next to it. Load them with
+            ``load_column_store``.
         do_plot: should png and pdf versions of the images be saved after the
             run.
+        plot_in_background: if True the plots are created and saved in a
+            separate process and the function returns right away. The
+            figures stay in that process, use ``plot_by_id`` for the axes.
+        resumed_from: the run this sweep continues, stored in the
+            'resumed_from' metadata. Set by ``resume``.
 
     Returns:
-        The run_id of the DataSet created
+        The run_id of the DataSet created and, if ``plot_in_background``,
+        a future that resolves to the paths of the saved plot files.
     """
+    array_params = []
+    if column_store:
+        array_params = [p for p in param_meas if is_array_parameter(p)]
 
     meas = Measurement()
     _register_parameters(meas, (param_set1, param_set2))
-    _register_parameters(meas, param_meas, setpoints=(param_set1, param_set2))
+    _register_parameters(meas,
+                         [p for p in param_meas if p not in array_params],
+                         setpoints=(param_set1, param_set2))
     _set_write_period(meas, write_period)
     _register_actions(meas, enter_actions, exit_actions)
 
     param_set1.post_delay = delay1
     param_set2.post_delay = delay2
 
+    setpoints2 = np.linspace(start2, stop2, num_points2)
+
+    live = None
+    if live_plot:
+        live = LivePlot(((param_set1, start1, stop1, num_points1),
+                         (param_set2, start2, stop2, num_points2)),
+                        param_meas)
+
     with _catch_keyboard_interrupts() as interrupted, meas.run() as datasaver:
-        for set_point1 in np.linspace(start1, stop1, num_points1):
+        _save_sweep(datasaver, 'do2d',
+                    ((param_set1, start1, stop1, num_points1, delay1),
+                     (param_set2, start2, stop2, num_points2, delay2)),
+                    param_meas, set_before_sweep=set_before_sweep,
+                    write_period=write_period, flush_columns=flush_columns,
+                    snake=snake, snake_reversed=snake_reversed,
+                    column_store=column_store, resumed_from=resumed_from)
+        store = None
+        if array_params:
+            store = ColumnStore(
+                os.path.join(
+                    os.path.splitext(datasaver._dataset.path_to_db)[0] +
+                    '_columns', str(datasaver.run_id)),
+                array_params)
+            datasaver._dataset.add_metadata(COLUMN_STORE_METADATA_TAG,
+                                            store.path)
+        if live is not None:
+            live.subscribe(datasaver._dataset)
+        last_set = _set_cache((param_set1, param_set2), skip_unchanged)
+        try:
+            for i, set_point1 in enumerate(np.linspace(start1, stop1,
+                                                       num_points1)):
+                reverse = snake and (i % 2 == 1) != snake_reversed
+                inner_setpoints = setpoints2[::-1] if reverse else setpoints2
                 if set_before_sweep:
-                    param_set2.set(start2)
+                    _set_parameter(param_set2, inner_setpoints[0], profiler,
+                                   last_set[param_set2])
 
-                param_set1.set(set_point1)
+                _set_parameter(param_set1, set_point1, profiler,
+                               last_set[param_set1])
                 for action in before_inner_actions:
                     action()
-                for set_point2 in np.linspace(start2, stop2, num_points2):
-                    # skip first inner set point if `set_before_sweep`
-                    if set_point2 == start2 and set_before_sweep:
-                        pass
-                    else:
-                        param_set2.set(set_point2)
-
-                    datasaver.add_result((param_set1, set_point1),
-                                         (param_set2, set_point2),
-                                         *_process_params_meas(param_meas))
+                if before_inner_actions:
+                    _clear_set_cache(last_set)
+                results = []
+                try:
+                    for j, set_point2 in enumerate(inner_setpoints):
+                        # skip first inner set point if `set_before_sweep`
+                        if j == 0 and set_before_sweep:
+                            pass
+                        else:
+                            _set_parameter(param_set2, set_point2, profiler,
+                                           last_set[param_set2])
+
+                        setpoints = ((param_set1, set_point1),
+                                     (param_set2, set_point2))
+                        measured = _process_params_meas(param_meas, profiler)
+                        if store is not None:
+                            measured = store.take(setpoints, measured)
+                        results.append((*setpoints, *measured))
+                        if not reverse:
+                            _add_result(datasaver, *results.pop(),
+                                        profiler=profiler)
+                        if live is not None:
+                            live.update()
+                finally:
+                    # a reversed inner sweep is stored in canonical order
+                    for result in reversed(results):
+                        _add_result(datasaver, *result, profiler=profiler)
+                    if store is not None:
+                        store.flush(reverse)
                 for action in after_inner_actions:
                     action()
+                if after_inner_actions:
+                    _clear_set_cache(last_set)
                 if flush_columns:
                     datasaver.flush_data_to_database()
+        finally:
+            # an interrupted sweep leaves a readable store
+            if store is not None:
+                store.close()
+
+    _finish_profiling(datasaver, profiler)
+    if live is not None:
+        live.update(force=True)
+    return _handle_plotting(datasaver, do_plot, interrupted(),
+                            background=plot_in_background)
+
+
+
+
+def _find_in_instrument(
+        instrument: InstrumentBase,
+        full_name: str
+) -> Optional[_BaseParameter]:
+    for parameter in instrument.parameters.values():
+        if parameter.full_name == full_name:
+            return parameter
+    for submodule in instrument.submodules.values():
+        if isinstance(submodule, InstrumentBase):
+            parameter = _find_in_instrument(submodule, full_name)
+            if parameter is not None:
+                return parameter
+    return None
+
+
+def _find_parameter(
+        description: Dict[str, Optional[str]],
+        parameters: Sequence[ParamMeasT]
+) -> ParamMeasT:
+    if 'callable' in description:
+        for parameter in parameters:
+            if (not isinstance(parameter, _BaseParameter) and
+                    getattr(parameter, '__name__', None) ==
+                    description['callable']):
+                return parameter
+        raise ValueError(f"Cannot find the function "
+                         f"{description['callable']} of the run, pass it "
+                         f"to resume")
+    for parameter in parameters:
+        if (isinstance(parameter, _BaseParameter) and
+                parameter.full_name == description['parameter']):
+            return parameter
+    if description['instrument'] is not None:
+        try:
+            instrument = Instrument.find_instrument(description['instrument'])
+        except KeyError:
+            pass
+        else:
+            parameter = _find_in_instrument(instrument,
+                                            description['parameter'])
+            if parameter is not None:
+                return parameter
+    raise ValueError(f"Cannot find the parameter {description['parameter']} "
+                     f"of the run, pass it to resume")
+
+
+def resume(
+    run_id: int,
+    *parameters: ParamMeasT,
+    **kwargs: Any
+) -> Union[AxesTupleListWithRunId, RunIdWithFuture]:
+    """
+    Continue a do1d or do2d run that was interrupted. The sweep is restarted
+    from the first point (do1d) or outer point (do2d) that was not completely
+    stored in the run, and the remaining points are measured into a new run
+    that refers back to ``run_id`` through its 'resumed_from' metadata.
 
-    return _handle_plotting(datasaver, do_plot, interrupted())
+    The swept and measured parameters are looked up by name among
+    ``parameters`` and among the parameters of the instruments that are
+    currently open. Functions called at each point cannot be stored and
+    must always be passed in ``parameters``.
 
+    Args:
+        run_id: The run to continue
+        *parameters: Parameters and functions of the original sweep
+        **kwargs: Keyword arguments passed on to do1d or do2d, e.g. actions,
+            in addition to the stored ones.
 
+    Returns:
+        The output of do1d or do2d for the new run
+    """
+    dataset = load_by_id(run_id)
+    sweep_metadata = dataset.metadata.get(SWEEP_METADATA_TAG)
+    if sweep_metadata is None:
+        raise ValueError(f'Run {run_id} was not measured by do1d or do2d')
+    sweep = json.loads(sweep_metadata)
+    sweeps = [(_find_parameter(s, parameters), s['start'], s['stop'],
+               s['num_points'], s['delay']) for s in sweep['sweeps']]
+    param_meas = [_find_parameter(p, parameters) for p in sweep['param_meas']]
+    kwargs = dict(sweep['kwargs'], **kwargs)
+
+    # the points of an inner sweep are measured and stored one row each
+    rows_per_point = 1
+    for _, _, _, num_points, _ in sweeps[1:]:
+        rows_per_point *= num_points
+    done = len(dataset) // rows_per_point
+
+    param_set, start, stop, num_points, delay = sweeps[0]
+    if done >= num_points:
+        raise ValueError(f'Run {run_id} is already complete')
+    start = np.linspace(start, stop, num_points)[done]
+    num_points -= done
+
+    if sweep['function'] == 'do1d':
+        res = do1d(param_set, start, stop, num_points, delay, *param_meas,
+                   resumed_from=run_id, **kwargs)
+    else:
+        param_set2, start2, stop2, num_points2, delay2 = sweeps[1]
+        if kwargs.get('snake') and done % 2 == 1:
+            # keep the direction of the inner sweeps of the original run
+            kwargs['snake_reversed'] = not kwargs.get('snake_reversed')
+        res = do2d(param_set, start, stop, num_points, delay,
+                   param_set2, start2, stop2, num_points2, delay2,
+                   *param_meas, resumed_from=run_id, **kwargs)
+    return res
 
 
 def _handle_plotting(
         datasaver: DataSaver,
         do_plot: bool = True,
-        interrupted: bool = False
-) -> AxesTupleList:
+        interrupted: bool = False,
+        background: bool = False
+) -> Union[AxesTupleListWithRunId, RunIdWithFuture]:
     """
     Save the plots created by datasaver as pdf and png
 
@@ -265,10 +818,17 @@ def _handle_plotting(
         datasaver: a measurement datasaver that contains a dataset to be saved
             as plot.
             :param do_plot:
+        background: if True the plots are created in a worker process and a
+            future for the paths of the saved files is returned instead.
 
     """
     dataid = datasaver.run_id
-    if do_plot == True:
+    if do_plot == True and background:
+        future = _get_plot_executor().submit(
+            _create_plots_in_background, dataid,
+            datasaver._dataset.path_to_db, config.user.mainfolder)
+        res = dataid, future
+    elif do_plot == True:
         res = _create_plots(datasaver)
     else:
         res = dataid, None, None
@@ -279,16 +839,48 @@ def _handle_plotting(
     return res
 
 
-def _create_plots(datasaver: DataSaver) -> AxesTupleList:
+def _create_plots(datasaver: DataSaver) -> AxesTupleListWithRunId:
     dataid = datasaver.run_id
     plt.ioff()
-    start = time.time()
     axes, cbs = plot_by_id(dataid)
-    stop = time.time()
-    print(f"plot by id took {stop - start}")
+    _save_plots(axes, dataid, datasaver._dataset.exp_name,
+                datasaver._dataset.sample_name)
+    plt.ion()
+    res = dataid, axes, cbs
+    return res
+
+
+def _create_plots_in_background(
+        dataid: int,
+        path_to_db: str,
+        mainfolder: str
+) -> List[str]:
+    """
+    Create and save the plots of a run in a worker process. The database and
+    the output folder are passed explicitly since the worker does not share
+    the config of the measurement process. Only the paths of the saved files
+    are returned, the figures are closed in the worker.
+    """
+    plt.switch_backend('agg')
+    config.core.db_location = path_to_db
+    config.user.mainfolder = mainfolder
+    dataset = load_by_id(dataid)
+    axes, cbs = plot_by_id(dataid)
+    try:
+        return _save_plots(axes, dataid, dataset.exp_name,
+                           dataset.sample_name)
+    finally:
+        for ax in axes:
+            plt.close(ax.figure)
+
+
+def _save_plots(
+        axes: List[matplotlib.axes.Axes],
+        dataid: int,
+        experiment_name: str,
+        sample_name: str
+) -> List[str]:
     mainfolder = config.user.mainfolder
-    experiment_name = datasaver._dataset.exp_name
-    sample_name = datasaver._dataset.sample_name
     storage_dir = os.path.join(mainfolder, experiment_name, sample_name)
     os.makedirs(storage_dir, exist_ok=True)
     png_dir = os.path.join(storage_dir, 'png')
@@ -297,13 +889,14 @@ def _create_plots(datasaver: DataSaver) -> AxesTupleList:
     os.makedirs(pdf_dif, exist_ok=True)
     save_pdf = True
     save_png = True
+    paths = []
     for i, ax in enumerate(axes):
         if save_pdf:
             full_path = os.path.join(pdf_dif, f'{dataid}_{i}.pdf')
             ax.figure.savefig(full_path, dpi=500)
+            paths.append(full_path)
         if save_png:
             full_path = os.path.join(png_dir, f'{dataid}_{i}.png')
             ax.figure.savefig(full_path, dpi=500)
-    plt.ion()
-    res = dataid, axes, cbs
-    return res
+            paths.append(full_path)
+    return paths
@@ -0,0 +1,270 @@
+from contextlib import contextmanager, redirect_stdout
+from datetime import timedelta
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from qcodes.dataset.experiment_container import new_experiment
+from qcodes.dataset.measurements import Measurement
+from qcodes.dataset.sqlite.database import connect
+from qcodes.instrument.base import _BaseParameter
+
+from qdev_wrappers.dataset.doNd import ActionsT, ParamMeasT
+
+
+@contextmanager
+def _no_post_delay(param: _BaseParameter) -> Iterator[None]:
+    post_delay = param.post_delay
+    param.post_delay = 0
+    try:
+        yield
+    finally:
+        param.post_delay = post_delay
+
+
+def _time_call(func: Callable[[], None], num_samples: int) -> float:
+    start = time.perf_counter()
+    for _ in range(num_samples):
+        func()
+    return (time.perf_counter() - start) / num_samples
+
+
+def _time_set(param: _BaseParameter, setpoints: np.ndarray,
+              num_samples: int) -> float:
+    """
+    Average time of setting ``param`` between its first two setpoints,
+    without the post delay. The parameter is left at the first setpoint.
+    """
+    values = [setpoints[(i + 1) % min(2, len(setpoints))]
+              for i in range(num_samples)]
+    with _no_post_delay(param):
+        param.set(setpoints[0])
+        start = time.perf_counter()
+        for value in values:
+            param.set(value)
+        duration = (time.perf_counter() - start) / num_samples
+        param.set(setpoints[0])
+    return duration
+
+
+def _ramp_time(param: _BaseParameter, distance: float) -> float:
+    """
+    Time the parameter spends stepping over ``distance`` if it has a step
+    and inter_delay.
+    """
+    step = getattr(param, 'step', None)
+    if not step:
+        return 0
+    return np.ceil(abs(distance) / step) * param.inter_delay
+
+
+def _time_measurements(param_meas: Sequence[ParamMeasT],
+                       num_samples: int) -> Dict[str, float]:
+    times = {}
+    for param in param_meas:
+        if isinstance(param, _BaseParameter):
+            times[f'get {param.full_name}'] = _time_call(param.get,
+                                                         num_samples)
+        elif callable(param):
+            name = getattr(param, '__name__', repr(param))
+            times[f'call {name}'] = _time_call(param, num_samples)
+    return times
+
+
+def _time_writes(
+        setpoints: Sequence[Tuple[_BaseParameter, float]],
+        param_meas: Sequence[ParamMeasT],
+        num_samples: int
+) -> Tuple[float, float]:
+    """
+    Time ``add_result`` and ``flush_data_to_database`` of a datasaver with
+    the parameters of the sweep registered, in a throwaway database. The
+    swept parameters are stored at ``setpoints`` and the measured
+    parameters are read once for the values to store.
+
+    Returns:
+        The average time of adding a result, including writing it to the
+        database, and the fixed overhead of a flush.
+    """
+    param_meas = [param for param in param_meas
+                  if isinstance(param, _BaseParameter)]
+    param_set = [param for param, _ in setpoints]
+    results = (list(setpoints) +
+               [(param, param.get()) for param in param_meas])
+    with tempfile.TemporaryDirectory() as folder:
+        conn = connect(os.path.join(folder, 'estimate.db'))
+        try:
+            exp = new_experiment('estimate', sample_name='estimate',
+                                 conn=conn)
+            meas = Measurement(exp=exp)
+            for param in param_set:
+                meas.register_parameter(param)
+            for param in param_meas:
+                meas.register_parameter(param, setpoints=param_set)
+            # only flush when asked to
+            meas.write_period = 1e9
+            with redirect_stdout(io.StringIO()), meas.run() as datasaver:
+                start = time.perf_counter()
+                for _ in range(num_samples):
+                    datasaver.add_result(*results)
+                add_time = (time.perf_counter() - start) / num_samples
+                flush_many = _time_call(datasaver.flush_data_to_database, 1)
+                datasaver.add_result(*results)
+                flush_one = _time_call(datasaver.flush_data_to_database, 1)
+        finally:
+            conn.close()
+    if num_samples > 1:
+        per_point = max(0, (flush_many - flush_one) / (num_samples - 1))
+    else:
+        per_point = flush_many
+    return add_time + per_point, min(flush_one, flush_many)
+
+
+def _write_time(
+        setpoints: Sequence[Tuple[_BaseParameter, float]],
+        param_meas: Sequence[ParamMeasT],
+        num_points: int, duration: float,
+        write_period: Optional[float],
+        num_samples: int,
+        extra_flushes: int = 0
+) -> float:
+    """
+    Estimated time spent storing ``num_points`` results in a sweep lasting
+    ``duration`` seconds without the writes. The datasaver flushes every
+    ``write_period`` seconds (5 s if None, the default of ``Measurement``)
+    and once at the end, plus ``extra_flushes`` times.
+    """
+    if write_period is None:
+        write_period = 5.0
+    point_time, flush_time = _time_writes(setpoints, param_meas, num_samples)
+    num_flushes = int(duration // write_period) + 1 + extra_flushes
+    return num_points * point_time + num_flushes * flush_time
+
+
+def _time_actions(actions: ActionsT) -> float:
+    return sum(_time_call(action, 1) for action in actions)
+
+
+def _print_estimate(estimate: Dict[str, float]) -> None:
+    width = max(len(key) for key in estimate)
+    total = estimate['total']
+    for key, duration in estimate.items():
+        if key == 'total':
+            continue
+        share = 100 * duration / total if total else 0
+        print(f'{key:<{width}} {timedelta(seconds=round(duration))} '
+              f'({share:.0f}%)')
+    print(f"{'total':<{width}} {timedelta(seconds=round(total))}")
+
+
+def estimate_do1d(
+    param_set: _BaseParameter, start: float, stop: float,
+    num_points: int, delay: float,
+    *param_meas: ParamMeasT,
+    write_period: Optional[float] = None,
+    num_samples: int = 3,
+    print_estimate: bool = True,
+    **kwargs
+) -> Dict[str, float]:
+    """
+    Estimate the duration of a ``do1d`` with the same arguments by timing a
+    few set and get calls. Note that ``param_set`` is really set, to the
+    first setpoints of the sweep. Additional keyword arguments of ``do1d``
+    are accepted and ignored.
+
+    Args:
+        write_period: The write period of the sweep, used to estimate the
+            time spent writing to the database
+        num_samples: Number of set and get calls to average over
+        print_estimate: Print the breakdown of the estimate
+
+    Returns:
+        The estimated time in seconds spent on each part of the sweep and
+        the total under the key 'total'.
+    """
+    setpoints = np.linspace(start, stop, num_points)
+    estimate = {
+        'set': num_points * _time_set(param_set, setpoints, num_samples),
+        'post_delay': num_points * delay,
+    }
+    for key, duration in _time_measurements(param_meas,
+                                            num_samples).items():
+        estimate[key] = num_points * duration
+    estimate['write'] = _write_time(((param_set, start),), param_meas,
+                                    num_points, sum(estimate.values()),
+                                    write_period, num_samples)
+    estimate['total'] = sum(estimate.values())
+    if print_estimate:
+        _print_estimate(estimate)
+    return estimate
+
+
+def estimate_do2d(
+    param_set1: _BaseParameter, start1: float, stop1: float,
+    num_points1: int, delay1: float,
+    param_set2: _BaseParameter, start2: float, stop2: float,
+    num_points2: int, delay2: float,
+    *param_meas: ParamMeasT,
+    set_before_sweep: bool = False,
+    before_inner_actions: ActionsT = (),
+    after_inner_actions: ActionsT = (),
+    snake: bool = False,
+    write_period: Optional[float] = None,
+    flush_columns: bool = False,
+    num_samples: int = 3,
+    print_estimate: bool = True,
+    **kwargs
+) -> Dict[str, float]:
+    """
+    Estimate the duration of a ``do2d`` with the same arguments by timing a
+    few set and get calls. Note that the swept parameters are really set, to
+    the first setpoints of the sweeps, and that the inner actions are called
+    once to time them. Additional keyword arguments of ``do2d`` are accepted
+    and ignored.
+
+    Args:
+        write_period: The write period of the sweep, used to estimate the
+            time spent writing to the database
+        flush_columns: Whether the sweep flushes after every inner sweep
+        num_samples: Number of set and get calls to average over
+        print_estimate: Print the breakdown of the estimate
+
+    Returns:
+        The estimated time in seconds spent on each part of the sweep and
+        the total under the key 'total'.
+    """
+    setpoints1 = np.linspace(start1, stop1, num_points1)
+    setpoints2 = np.linspace(start2, stop2, num_points2)
+    num_points = num_points1 * num_points2
+    set2 = _time_set(param_set2, setpoints2, num_samples)
+    # with set_before_sweep the first inner set of every inner sweep is
+    # moved before the outer set, so the number of inner sets is the same
+    estimate = {
+        'set outer': num_points1 * _time_set(param_set1, setpoints1,
+                                             num_samples),
+        'set inner': num_points * set2,
+        'post_delay': num_points1 * delay1 + num_points * delay2,
+    }
+    if not snake:
+        # ramping the inner parameter back to start2 before every inner sweep
+        estimate['ramp inner back'] = (
+            (num_points1 - 1) * _ramp_time(param_set2, stop2 - start2))
+    if before_inner_actions or after_inner_actions:
+        estimate['inner actions'] = num_points1 * (
+            _time_actions(before_inner_actions) +
+            _time_actions(after_inner_actions))
+    for key, duration in _time_measurements(param_meas,
+                                            num_samples).items():
+        estimate[key] = num_points * duration
+    estimate['write'] = _write_time(
+        ((param_set1, start1), (param_set2, start2)), param_meas, num_points,
+        sum(estimate.values()), write_period, num_samples,
+        extra_flushes=num_points1 if flush_columns else 0)
+    estimate['total'] = sum(estimate.values())
+    if print_estimate:
+        _print_estimate(estimate)
+    return estimate
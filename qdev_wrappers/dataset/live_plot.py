@@ -0,0 +1,160 @@
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from qcodes.dataset.data_set import DataSet
+from qcodes.dataset.sqlite.database import _convert_complex
+from qcodes.instrument.base import _BaseParameter
+from qcodes.instrument.parameter import Parameter, ParameterWithSetpoints
+
+SweepT = Tuple[_BaseParameter, float, float, int]
+
+
+class LivePlot:
+    """
+    Live plot of the scalar parameters measured by a do1d or do2d. The plot
+    subscribes to the DataSet of the measurement and writes the new results
+    into preallocated buffers as they are inserted, so that the DataSet is
+    never queried again and the cost of an update only depends on the number
+    of new points. Complex values are plotted by their magnitude.
+
+    Args:
+        sweeps: (parameter, start, stop, num_points) of the outer and the
+            inner sweep, as passed to the doNd function.
+        param_meas: The parameters and functions measured at each point.
+            Only scalar parameters are plotted.
+        refresh_period: Minimum time in seconds between two redraws of the
+            figures.
+    """
+
+    def __init__(self,
+                 sweeps: Sequence[SweepT],
+                 param_meas: Sequence[Any],
+                 refresh_period: float = 1) -> None:
+        if len(sweeps) not in (1, 2):
+            raise ValueError('LivePlot supports only 1D and 2D sweeps')
+        self._sweeps = [(str(param), start, stop, num_points)
+                        for param, start, stop, num_points in sweeps]
+        self._shape = tuple(num_points for *_, num_points in sweeps)
+        self._names = [str(param) for param in param_meas
+                       if isinstance(param, Parameter) and
+                       not isinstance(param, ParameterWithSetpoints)]
+        self.refresh_period = refresh_period
+
+        self._buffers = {name: np.full(self._shape, np.nan)
+                         for name in self._names}
+        self._limits = {name: [np.inf, -np.inf] for name in self._names}
+        self._columns: Dict[str, int] = {}
+        self._lock = Lock()
+        self._new_data = False
+        self._last_refresh = 0.0
+        self._artists: Dict[str, Any] = {}
+        self._create_figures(sweeps, param_meas)
+
+    def _create_figures(self,
+                        sweeps: Sequence[SweepT],
+                        param_meas: Sequence[Any]) -> None:
+        labels = [f'{param.label} ({param.unit})' for param, *_ in sweeps]
+        params = {str(param): param for param in param_meas}
+        for name in self._names:
+            param = params[name]
+            fig, ax = plt.subplots(1, 1)
+            label = f'{param.label} ({param.unit})'
+            if len(self._shape) == 1:
+                _, start, stop, num_points = self._sweeps[0]
+                line, = ax.plot(np.linspace(start, stop, num_points),
+                                self._buffers[name])
+                ax.set_xlabel(labels[0])
+                ax.set_ylabel(label)
+                self._artists[name] = line
+            else:
+                (_, start1, stop1, _), (_, start2, stop2, _) = self._sweeps
+                image = ax.imshow(self._buffers[name], origin='lower',
+                                  aspect='auto', interpolation='nearest',
+                                  extent=(start2, stop2, start1, stop1))
+                fig.colorbar(image, ax=ax, label=label)
+                ax.set_xlabel(labels[1])
+                ax.set_ylabel(labels[0])
+                self._artists[name] = image
+            ax.set_title(name)
+        plt.show(block=False)
+
+    def subscribe(self, dataset: DataSet) -> str:
+        """
+        Subscribe the plot to the results inserted into ``dataset``. Must be
+        called inside the ``meas.run()`` context before any results are
+        added.
+        """
+        self._columns = {spec.name: i
+                         for i, spec in enumerate(dataset.get_parameters())}
+        return dataset.subscribe(self.add_results, min_wait=100)
+
+    def add_results(self,
+                    results: List[Tuple[Any, ...]],
+                    length: int,
+                    state: Optional[Any]) -> None:
+        """
+        Subscriber callback that writes a chunk of new rows into the buffers.
+        """
+        if len(results) == 0:
+            return
+        rows = np.array(results, dtype=object)
+        index = tuple(self._to_index(rows[:, self._columns[name]],
+                                     start, stop, num_points)
+                      for name, start, stop, num_points in self._sweeps)
+        with self._lock:
+            for name in self._names:
+                values = rows[:, self._columns[name]]
+                valid = np.array([v is not None for v in values])
+                if not np.any(valid):
+                    continue
+                # the trigger passes complex values in their binary form
+                values = np.array([_convert_complex(v)
+                                   if isinstance(v, bytes) else v
+                                   for v in values[valid]])
+                if np.iscomplexobj(values):
+                    values = np.abs(values)
+                self._buffers[name][tuple(i[valid] for i in index)] = values
+                limits = self._limits[name]
+                limits[0] = min(limits[0], np.nanmin(values))
+                limits[1] = max(limits[1], np.nanmax(values))
+            self._new_data = True
+
+    @staticmethod
+    def _to_index(values: np.ndarray, start: float, stop: float,
+                  num_points: int) -> np.ndarray:
+        if num_points == 1 or start == stop:
+            return np.zeros(len(values), dtype=int)
+        fraction = (values.astype(float) - start) / (stop - start)
+        index = np.rint(fraction * (num_points - 1)).astype(int)
+        return np.clip(index, 0, num_points - 1)
+
+    def update(self, force: bool = False) -> None:
+        """
+        Redraw the figures if new results have arrived and at least
+        ``refresh_period`` has passed since the last redraw.
+        """
+        now = time.perf_counter()
+        if not self._new_data or (
+                not force and now - self._last_refresh < self.refresh_period):
+            return
+        with self._lock:
+            self._new_data = False
+            for name, artist in self._artists.items():
+                vmin, vmax = self._limits[name]
+                if vmin > vmax:
+                    continue
+                if len(self._shape) == 1:
+                    artist.set_ydata(self._buffers[name])
+                    margin = 0.05 * (vmax - vmin) or 1
+                    artist.axes.set_ylim(vmin - margin, vmax + margin)
+                else:
+                    artist.set_data(self._buffers[name])
+                    artist.set_clim(vmin, vmax)
+        for artist in self._artists.values():
+            artist.figure.canvas.draw_idle()
+            artist.figure.canvas.flush_events()
+        self._last_refresh = now
@@ -0,0 +1,84 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+import json
+import time
+
+import numpy as np
+
+from qcodes.dataset.data_set import DataSet
+from qcodes.instrument.base import _BaseParameter
+
+
+class SweepProfiler:
+    """
+    Records where a doNd sweep spends its time. Pass an instance as
+    ``profiler`` to a doNd function to record, for every point, the time
+    spent setting each swept parameter, waiting for its ``post_delay``,
+    getting each measured parameter and adding the results to the
+    datasaver. The individual durations are kept in ``timings``, a summary
+    is printed at the end of the run and stored in the run metadata under
+    the tag 'timings'.
+
+    The settle time is the part of a set call attributed to the
+    ``post_delay`` of the parameter, i.e. ``min(duration, post_delay)``.
+    """
+
+    metadata_tag = 'timings'
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, key: str, duration: float) -> None:
+        self.timings[key].append(duration)
+
+    @contextmanager
+    def timer(self, key: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(key, time.perf_counter() - start)
+
+    def time_set(self, param: _BaseParameter, value: Any) -> None:
+        start = time.perf_counter()
+        param.set(value)
+        duration = time.perf_counter() - start
+        settle = min(duration, param.post_delay)
+        self.record(f'set {param.full_name}', duration - settle)
+        self.record(f'settle {param.full_name}', settle)
+
+    def time_get(self, param: _BaseParameter) -> Any:
+        with self.timer(f'get {param.full_name}'):
+            return param.get()
+
+    def time_call(self, func: Callable[[], None]) -> None:
+        with self.timer(f"call {getattr(func, '__name__', repr(func))}"):
+            func()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Total, mean and maximum duration and number of calls for each of the
+        recorded steps.
+        """
+        return {key: {'total': float(np.sum(durations)),
+                      'mean': float(np.mean(durations)),
+                      'max': float(np.max(durations)),
+                      'count': len(durations)}
+                for key, durations in self.timings.items()}
+
+    def print_summary(self) -> None:
+        summary = self.summary()
+        if len(summary) == 0:
+            return
+        total = sum(s['total'] for s in summary.values())
+        width = max(len(key) for key in summary)
+        for key, s in sorted(summary.items(),
+                             key=lambda item: -item[1]['total']):
+            share = 100 * s['total'] / total if total else 0
+            print(f"{key:<{width}} total {s['total']:.3f} s ({share:.0f}%), "
+                  f"mean {1e3 * s['mean']:.3f} ms, "
+                  f"max {1e3 * s['max']:.3f} ms")
+
+    def save(self, dataset: DataSet) -> None:
+        dataset.add_metadata(self.metadata_tag, json.dumps(self.summary()))
@@ -1,18 +1,39 @@
 from typing import Tuple
 from os.path import sep
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+import atexit
 import functools
+import os
+import time
+import warnings
 from matplotlib import ticker
 import matplotlib.pyplot as plt
 import numpy as np
 
+from qcodes.plots.base import BasePlot
 from qcodes.plots.pyqtgraph import QtPlot
+from pyqtgraph.multiprocess.remoteproxy import ObjectProxy
 from qcodes.plots.qcmatplotlib import MatPlot
 from qdev_wrappers.file_setup import CURRENT_EXPERIMENT
 from qcodes.instrument.channel import MultiChannelInstrumentParameter
 from qcodes.utils.plotting import auto_range_iqr, auto_color_scale_from_config
 import qcodes
 
+# update policy of the live QtPlot of the doNd functions
+# min_interval: minimum time in seconds between two updates
+# max_fraction: maximum fraction of the loop time spent on updates
+# max_pixels: images with more pixels are downsampled while live
+live_plot_settings = {'min_interval': 0.5,
+                      'max_fraction': 0.1,
+                      'max_pixels': 250000}
+
+# saving of the individual plots of the loop sweep functions
+# parallel: render them in a pool of worker processes, which only pays off
+# for many or large plots
+save_plot_settings = {'parallel': False}
+
+_plot_executor = None
+
 
 def _plot_setup(data, inst_meas, useQT=True, startranges=None,
                 auto_color_scale=None, cutoff_percentile=None):
@@ -56,7 +77,6 @@ def _plot_setup(data, inst_meas, useQT=True, startranges=None,
             inst_meas_name = "{}{}_0_0".format(parent_instr_name, name)
             inst_meas_data = getattr(data, inst_meas_name)
 
-        inst_meta_data = __get_plot_type(inst_meas_data, plot)
         if useQT:
             plot.add(inst_meas_data, subplot=j + k + 1)
             plot.subplots[j + k].showGrid(True, True)
@@ -69,14 +89,13 @@ def _plot_setup(data, inst_meas, useQT=True, startranges=None,
             QtPlot.qc_helpers.foreground_qt_window(plot.win)
 
         else:
-            if 'z' in inst_meta_data:
-                xlen, ylen = inst_meta_data['z'].shape
-                rasterized = xlen * ylen > 5000
+            if _is_heatmap(inst_meas_data):
+                rasterized = np.prod(inst_meas_data.shape) > 5000
                 po = plot.add(inst_meas_data, subplot=j + k + 1,
                               rasterized=rasterized)
 
                 auto_color_scale_from_config(po.colorbar, auto_color_scale,
-                                             inst_meta_data['z'], cutoff_percentile)
+                                             inst_meas_data.ndarray, cutoff_percentile)
             else:
                 rasterized = False
                 plot.add(inst_meas_data, subplot=j + k + 1, color=color)
@@ -111,74 +130,367 @@ def _plot_setup(data, inst_meas, useQT=True, startranges=None,
     return plot, num_subplots
 
 
-def __get_plot_type(data, plot):
-    # this is a hack because expand_trace works
-    # in place. Also it should probably * expand its args and kwargs. N
-    # Same below
-    data_copy = deepcopy(data)
-    metadata = {}
-    plot.expand_trace((data_copy,), kwargs=metadata)
-    return metadata
+def _is_heatmap(data_array):
+    """
+    Whether data_array is plotted as a heatmap rather than as a line. This
+    is the decision BasePlot.expand_trace makes when the plot is added,
+    which only fills in the keyword arguments so the data is not copied.
+    """
+    if len(data_array) == 0:
+        # expand_trace looks at the first element
+        return np.ndim(data_array) > 1
+    trace = {}
+    BasePlot.expand_trace((data_array,), trace)
+    return 'z' in trace
 
 
-def _save_individual_plots(data, inst_meas, display_plot=True, auto_color_scale=None, cutoff_percentile=None):
+def _individual_array_names(data, inst_meas):
+    """
+    Names of the arrays in data of each parameter or component of a
+    multidimensional parameter in inst_meas.
+    """
+    array_names = []
+    for i in inst_meas:
+        names = getattr(i, "names", False) or (i.name,)
+        for name in names:
+            if issubclass(i.__class__, MultiChannelInstrumentParameter) or i._instrument is None:
+                inst_meas_name = name
+            else:
+                inst_meas_name = "{}_{}".format(i._instrument.name, name)
+                if not hasattr(data, inst_meas_name):
+                    inst_meas_name = "{}{}_0_0".format(i._instrument.name,
+                                                       name)
+            array_names.append(inst_meas_name)
+    return array_names
 
-    def _create_plot(i, name, data, counter_two, display_plot=True):
-        # Step the color on all subplots no just on plots
-        # within the same axis/subplot
-        # this is to match the qcodes-pyqtplot behaviour.
-        title = "{} #{:03d}".format(CURRENT_EXPERIMENT["sample_name"],
-                                    data.location_provider.counter)
-        rasterized_note = " rasterized plot full data available in datafile"
-        color = 'C' + str(counter_two)
-        counter_two += 1
-        plot = MatPlot()
-        if issubclass(i.__class__, MultiChannelInstrumentParameter) or i._instrument is None:
-            inst_meas_name = name
-        else:
-            inst_meas_name = "{}_{}".format(i._instrument.name, name)
-        inst_meas_data = getattr(data, inst_meas_name)
-        try:
-            inst_meas_data = getattr(data, inst_meas_name)
-        except AttributeError:
-            inst_meas_name = "{}{}_0_0".format(i._instrument.name, name)
-            inst_meas_data = getattr(data, inst_meas_name)
-        inst_meta_data = __get_plot_type(inst_meas_data, plot)
-        if 'z' in inst_meta_data:
-            xlen, ylen = inst_meta_data['z'].shape
-            rasterized = xlen * ylen > 5000
-            po = plot.add(inst_meas_data, rasterized=rasterized)
-
-            auto_color_scale_from_config(po.colorbar, auto_color_scale,
-                                         inst_meta_data['z'], cutoff_percentile)
-        else:
-            rasterized = False
-            plot.add(inst_meas_data, color=color)
-            plot.subplots[0].grid()
-        if rasterized:
-            plot.subplots[0].set_title(title + rasterized_note)
-        else:
-            plot.subplots[0].set_title(title)
-        title_list = plot.get_default_title().split(sep)
-        title_list.insert(-1, CURRENT_EXPERIMENT['pdf_subfolder'])
-        title = sep.join(title_list)
-        plot.rescale_axis()
-        plot.tight_layout()
-        plot.save("{}_{:03d}.pdf".format(title,
-                                         counter_two))
-        if display_plot:
-            plot.fig.canvas.draw()
-            plt.show()
+
+def _save_individual_plot(data, inst_meas_name, title, counter_two,
+                          pdf_subfolder, display_plot=True,
+                          auto_color_scale=None, cutoff_percentile=None):
+    # Step the color on all subplots no just on plots
+    # within the same axis/subplot
+    # this is to match the qcodes-pyqtplot behaviour.
+    rasterized_note = " rasterized plot full data available in datafile"
+    color = 'C' + str(counter_two)
+    counter_two += 1
+    plot = MatPlot()
+    inst_meas_data = getattr(data, inst_meas_name)
+    if _is_heatmap(inst_meas_data):
+        rasterized = np.prod(inst_meas_data.shape) > 5000
+        po = plot.add(inst_meas_data, rasterized=rasterized)
+
+        auto_color_scale_from_config(po.colorbar, auto_color_scale,
+                                     inst_meas_data.ndarray, cutoff_percentile)
+    else:
+        rasterized = False
+        plot.add(inst_meas_data, color=color)
+        plot.subplots[0].grid()
+    if rasterized:
+        plot.subplots[0].set_title(title + rasterized_note)
+    else:
+        plot.subplots[0].set_title(title)
+    title_list = plot.get_default_title().split(sep)
+    title_list.insert(-1, pdf_subfolder)
+    title = sep.join(title_list)
+    plot.rescale_axis()
+    plot.tight_layout()
+    plot.save("{}_{:03d}.pdf".format(title,
+                                     counter_two))
+    if display_plot:
+        plot.fig.canvas.draw()
+        plt.show()
+    else:
+        plt.close(plot.fig)
+
+
+def _render_individual_plots(location, formatter, io, plots, title,
+                             pdf_subfolder, auto_color_scale=None,
+                             cutoff_percentile=None):
+    """
+    Load the data set at location and save the individual plots given as
+    (array name, counter) pairs. Runs in a worker process of the plot
+    executor, so that the data is only loaded once per worker.
+    """
+    plt.switch_backend('agg')
+    data = qcodes.load_data(location, formatter=formatter, io=io)
+    for inst_meas_name, counter_two in plots:
+        _save_individual_plot(data, inst_meas_name, title, counter_two,
+                              pdf_subfolder, display_plot=False,
+                              auto_color_scale=auto_color_scale,
+                              cutoff_percentile=cutoff_percentile)
+
+
+def _get_plot_executor():
+    """
+    Pool of worker processes that plots are rendered and saved in, shared
+    by the loop and the dataset sweep functions. It is shut down at exit
+    after the pending plots are saved.
+    """
+    global _plot_executor
+    if _plot_executor is None:
+        _plot_executor = ProcessPoolExecutor()
+        atexit.register(_shutdown_plot_executor)
+    return _plot_executor
+
+
+def _shutdown_plot_executor():
+    global _plot_executor
+    if _plot_executor is not None:
+        _plot_executor.shutdown(wait=True)
+        _plot_executor = None
+
+
+def _save_individual_plots(data, inst_meas, display_plot=True, auto_color_scale=None, cutoff_percentile=None,
+                           wait=True, parallel_save=False):
+    """
+    Save a pdf of the plot of each parameter or component of a
+    multidimensional parameter in inst_meas.
+
+    Args:
+        wait: If False the plots are rendered in the background and a list
+            of futures is returned, whose results must be awaited before the
+            pdfs can be used. Only used with parallel_save.
+        parallel_save: If True and the plots are not displayed they are
+            rendered in parallel in a pool of worker processes that load the
+            data from its saved location.
+    """
+    title = "{} #{:03d}".format(CURRENT_EXPERIMENT["sample_name"],
+                                data.location_provider.counter)
+    pdf_subfolder = CURRENT_EXPERIMENT['pdf_subfolder']
+    array_names = _individual_array_names(data, inst_meas)
+
+    if display_plot or not parallel_save:
+        for counter_two, inst_meas_name in enumerate(array_names):
+            _save_individual_plot(data, inst_meas_name, title, counter_two,
+                                  pdf_subfolder, display_plot,
+                                  auto_color_scale=auto_color_scale,
+                                  cutoff_percentile=cutoff_percentile)
+        return []
+
+    plots = list(zip(array_names, range(len(array_names))))
+    num_workers = min(os.cpu_count() or 1, len(plots))
+    # the workers may have been started in another working directory
+    location = os.path.abspath(data.io.to_path(data.location))
+    executor = _get_plot_executor()
+    futures = [executor.submit(_render_individual_plots, location,
+                               data.formatter, data.io, plots[k::num_workers],
+                               title, pdf_subfolder,
+                               auto_color_scale=auto_color_scale,
+                               cutoff_percentile=cutoff_percentile)
+               for k in range(num_workers)]
+    if wait:
+        for future in futures:
+            future.result()
+    return futures
+
+
+def _stored_index(array):
+    """
+    Highest flat index stored in a DataArray so far, or None if unknown.
+    """
+    indices = [getattr(array, 'last_saved_index', None)]
+    modified_range = getattr(array, 'modified_range', None)
+    if modified_range:
+        indices.append(modified_range[1])
+    indices = [i for i in indices if i is not None]
+    return max(indices) if indices else None
+
+
+def _downsample_steps(shape, max_pixels):
+    """
+    Strides along the two axes of an image of the given shape such that it
+    has at most max_pixels pixels.
+    """
+    steps = [1, 1]
+    while np.prod([-(-n // step) for n, step in zip(shape, steps)]) \
+            > max_pixels:
+        # increase the step of the dimension with the most points left
+        i = int(np.argmax([n / step for n, step in zip(shape, steps)]))
+        steps[i] += 1
+    return steps
+
+
+def _downsample_image(config, max_pixels):
+    """
+    Copy of the config of an image trace with z and its setpoints taken at
+    a stride, such that z has at most max_pixels pixels.
+    """
+    z = np.asarray(config['z'])
+    steps = _downsample_steps(z.shape, max_pixels)
+    if steps == [1, 1]:
+        return config
+    config = dict(config)
+    config['z'] = z[::steps[0], ::steps[1]]
+    # x is the inner setpoint along the second axis of z, y the outer one
+    for axletter, step in (('x', steps[1]), ('y', steps[0])):
+        if config.get(axletter) is None:
+            continue
+        axdata = np.asarray(config[axletter])
+        if axdata.ndim == 2:
+            config[axletter] = axdata[::steps[0], ::steps[1]]
         else:
-            plt.close(plot.fig)
+            config[axletter] = axdata[::step]
+    return config
 
-    counter_two = 0
-    for j, i in enumerate(inst_meas):
-        if getattr(i, "names", False):
-            # deal with multidimensional parameter
-            for k, name in enumerate(i.names):
-                _create_plot(i, name, data, counter_two, display_plot)
-                counter_two += 1
+
+# internals of QtPlot the live slices are pushed with, when a qcodes
+# version lacks them the public update_plot is used instead
+_QTPLOT_METHODS = ('_get_transform',)
+_QTPLOT_IMAGE_KEYS = {'image', 'hist', 'histlevels', 'scales'}
+
+
+class _LivePlotUpdater:
+    """
+    Background task of a loop that updates a live QtPlot at a bounded cost.
+
+    The plot is updated at most every min_interval seconds and never takes
+    more than max_fraction of the time of the loop, measured by the duration
+    of the previous update. Each trace keeps a copy of its data in the plot
+    process and only the points, or rows of an image, stored since the
+    previous update are sent to it. Images with more than max_pixels pixels
+    are downsampled. Call plot.update() after the loop to draw the full data.
+    """
+
+    def __init__(self, plot, min_interval=None, max_fraction=None,
+                 max_pixels=None):
+        self.plot = plot
+        self.min_interval = (live_plot_settings['min_interval']
+                             if min_interval is None else min_interval)
+        self.max_fraction = (live_plot_settings['max_fraction']
+                             if max_fraction is None else max_fraction)
+        self.max_pixels = (live_plot_settings['max_pixels']
+                           if max_pixels is None else max_pixels)
+        self._interval = self.min_interval
+        self._last_update = -np.inf
+        self._stored = {}
+        self._sent = {}
+        self._push_slices = all(callable(getattr(plot, name, None))
+                                for name in _QTPLOT_METHODS)
+
+    def __call__(self):
+        start = time.perf_counter()
+        if start - self._last_update < self._interval:
+            return
+        for updater in self.plot.data_updaters:
+            updater()
+        full_update = False
+        for i, trace in enumerate(self.plot.traces):
+            config = trace['config']
+            data = config['z'] if 'z' in config else config['y']
+            stored = _stored_index(data)
+            if stored is not None and self._stored.get(i) == stored:
+                continue
+            self._stored[i] = stored
+            if not self._push_slice(i, trace, stored):
+                full_update = True
+        if full_update:
+            self.plot.update_plot()
+        duration = time.perf_counter() - start
+        self._interval = max(self.min_interval, duration / self.max_fraction)
+        self._last_update = start
+
+    def _buffer(self, item, shape):
+        """
+        Array in the process of the plot item that the slices are sent to.
+        """
+        if isinstance(item, ObjectProxy):
+            return self.plot.proc._import('numpy').zeros(shape)
+        return np.zeros(shape)
+
+    def _push_slice(self, i, trace, stored):
+        """
+        Send the data of a trace stored since the previous update to the
+        plot. Returns False if the trace can only be redrawn as a whole.
+        """
+        if not self._push_slices:
+            return False
+        config = trace['config']
+        plot_object = trace['plot_object']
+        if 'z' not in config:
+            arrays = [np.asarray(config[axletter]) for axletter in ('x', 'y')
+                      if config.get(axletter) is not None]
+            if arrays[-1].ndim != 1:
+                return False
+            self._push_line(i, plot_object, arrays, stored)
+        elif (isinstance(plot_object, dict) and
+                _QTPLOT_IMAGE_KEYS <= plot_object.keys() and
+                np.ndim(config['z']) == 2):
+            self._push_image(i, plot_object, config, stored)
         else:
-            _create_plot(i, i.name, data, counter_two, display_plot)
-            counter_two += 1
+            return False
+        return True
+
+    def _push_line(self, i, plot_object, arrays, stored):
+        count = len(arrays[-1]) if stored is None else stored + 1
+        state = self._sent.get(i)
+        if state is None:
+            state = self._sent[i] = {
+                'start': 0,
+                'buffers': [self._buffer(plot_object, array.shape)
+                            for array in arrays]}
+        start = state['start'] if state['start'] <= count else 0
+        for buffer, array in zip(state['buffers'], arrays):
+            buffer[start:count] = array[start:count]
+        plot_object.setData(*[buffer[:count] for buffer in state['buffers']])
+        state['start'] = count
+
+    def _push_image(self, i, plot_object, config, stored):
+        z = np.asarray(config['z'])
+        state = self._sent.get(i)
+        if state is None:
+            steps = _downsample_steps(z.shape, self.max_pixels)
+            # pyqtgraph draws the first axis of the image along x
+            shape = (-(-z.shape[1] // steps[1]), -(-z.shape[0] // steps[0]))
+            state = self._sent[i] = {
+                'start': 0, 'steps': steps, 'range': None,
+                'buffer': self._buffer(plot_object['image'], shape)}
+        steps = state['steps']
+        rows = len(z) if stored is None else stored // z.shape[1] + 1
+        count = -(-rows // steps[0])
+        start = state['start'] if state['start'] <= count else 0
+        new = np.array(z[::steps[0], ::steps[1]][start:count], dtype=float)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            new_range = (np.nanmin(new), np.nanmax(new))
+        if np.isnan(new_range[0]):
+            # nothing measured in these rows yet
+            return
+        z_range = new_range
+        if state['range'] is not None and start > 0:
+            z_range = (min(z_range[0], state['range'][0]),
+                       max(z_range[1], state['range'][1]))
+        state['range'] = z_range
+        new[np.isnan(new)] = z_range[0]
+        state['buffer'][:, start:count] = new.T
+
+        hist = plot_object['hist']
+        hist_range = hist.getLevels()
+        if hist_range == plot_object['histlevels']:
+            plot_object['histlevels'] = z_range
+            hist.setLevels(*z_range)
+            hist_range = z_range
+        image = plot_object['image']
+        image.setImage(state['buffer'][:, :count], levels=hist_range)
+        # the last row may still be filled further
+        state['start'] = count if stored is None else count - 1
+
+        downsampled = _downsample_image(config, self.max_pixels)
+        scales = plot_object['scales']
+        scales_changed = False
+        for axletter, axscale in scales.items():
+            if axscale.revisit:
+                newscale = self.plot._get_transform(
+                    downsampled.get(axletter))
+                if (newscale.translate != axscale.translate or
+                        newscale.scale != axscale.scale):
+                    scales_changed = True
+                scales[axletter] = newscale
+        if scales_changed:
+            image.resetTransform()
+            image.translate(scales['x'].translate, scales['y'].translate)
+            image.scale(scales['x'].scale, scales['y'].scale)
+        if downsampled is not config:
+            # the pixel size differs from the one of the full image drawn by
+            # plot.update() after the loop
+            for axletter, axscale in scales.items():
+                scales[axletter] = axscale._replace(revisit=True)
@@ -1,11 +1,20 @@
 import qcodes as qc
 import numpy as np
+import json
+import logging
+import os
+import tempfile
 from os.path import sep
 import collections
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from threading import Lock
 from typing import Optional, Union, Tuple, cast
 import matplotlib.pyplot as plt
 
 from qdev_wrappers.file_setup import CURRENT_EXPERIMENT
+from qcodes.data.data_array import DataArray
+from qcodes.data.gnuplot_format import GNUPlotFormat
 from qcodes.utils.plotting import auto_range_iqr, apply_color_scale_limits
 from qcodes.plots.pyqtgraph import QtPlot
 from qcodes.plots.qcmatplotlib import MatPlot
@@ -13,12 +22,374 @@ import qcodes
 
 Number = Union[float, int]
 
+log = logging.getLogger(__name__)
+
+# name of the binary copy of the arrays kept in the folder of a dataset
+SIDECAR_NAME = 'arrays.npz'
+# if True the sidecar is written the first time all arrays of a dataset
+# are read, a data folder without write access is only logged
+write_sidecars = True
+# files next to the data that are not part of it
+_NOT_DATA = ('.npz', '.tmp')
+
 def check_experiment_is_initialized():
     if not getattr(CURRENT_EXPERIMENT, "init", True): 
         raise RuntimeError("Experiment not initalized. "
                            "use qc.Init(mainfolder, samplename)")
 
 
+class DataCache:
+    """
+    Least recently used cache of the legacy DataSets loaded by show_num.
+
+    A DataSet is cached under its location together with the modification
+    time and size of its files and is loaded again once they change. The
+    DataSets may contain only some of their data arrays, the missing ones
+    are read when they are first asked for. If the arrays of all cached
+    DataSets take up more than max_bytes, the least recently used DataSets
+    are dropped.
+
+    The cached DataSets are shared between all callers, do not modify
+    their arrays in place.
+    """
+
+    def __init__(self, max_bytes=2 * 1024**3):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._lock = Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self, path, array_ids=None):
+        """
+        Load the DataSet at path, reading at least the data arrays in
+        array_ids, or all arrays if None, and their setpoints.
+        """
+        stamp = _file_stamp(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['stamp'] != stamp:
+                entry = None
+        if entry is None:
+            data = qc.DataSet(location=path)
+            data.read_metadata()
+            entry = {'data': data, 'stamp': stamp, 'complete': False,
+                     'lock': Lock()}
+        data = entry['data']
+        # the arrays of a cached DataSet are added by one caller at a time
+        with entry['lock']:
+            if not entry['complete']:
+                if array_ids is None:
+                    _read_arrays(data)
+                    entry['complete'] = True
+                elif not set(array_ids) <= set(data.arrays):
+                    _read_arrays(data, set(array_ids) - set(data.arrays))
+        with self._lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            self._evict()
+        return data
+
+    def _evict(self):
+        nbytes = [_nbytes(entry['data']) for entry in self._entries.values()]
+        total = sum(nbytes)
+        # always keep the most recently used DataSet
+        for path, size in zip(list(self._entries)[:-1], nbytes):
+            if total <= self.max_bytes:
+                break
+            del self._entries[path]
+            total -= size
+
+
+data_cache = DataCache()
+
+
+def _nbytes(data):
+    return sum(array.ndarray.nbytes for array in data.arrays.values()
+               if array.ndarray is not None)
+
+
+def _data_files(path, io=None):
+    io = io or qc.DataSet.default_io
+    return [fn for fn in io.list(path) if not fn.endswith(_NOT_DATA)]
+
+
+def _file_stamp(path, io=None):
+    """
+    Latest modification time in ns and total size of the data files at
+    path, which change whenever data is written to them.
+    """
+    io = io or qc.DataSet.default_io
+    stats = [os.stat(io.to_path(fn)) for fn in _data_files(path, io)]
+    if not stats:
+        return None
+    return [max(stat.st_mtime_ns for stat in stats),
+            sum(stat.st_size for stat in stats)]
+
+
+def _read_arrays(data, array_ids=None):
+    """
+    Read the data arrays in array_ids, or all if None, and their setpoints
+    into data.
+
+    The arrays are read from the binary sidecar in the folder of the
+    dataset if it is up to date. Otherwise files in the GNUPlot format are
+    parsed with numpy, only the columns asked for, and if write_sidecars
+    and all arrays were read the sidecar is written for the next time. Any
+    other format is read with its formatter.
+    """
+    formatter = data.formatter
+    if not isinstance(formatter, GNUPlotFormat):
+        data.read()
+        return
+    data_files = _data_files(data.location, data.io)
+    if not data_files:
+        raise IOError('no data found at ' + data.location)
+    sidecar = os.path.join(os.path.dirname(data.io.to_path(data_files[0])),
+                           SIDECAR_NAME)
+    stamp = _file_stamp(data.location, data.io)
+    if _read_sidecar(data, sidecar, stamp, array_ids):
+        return
+    for fn in data_files:
+        if not fn.endswith(formatter.extension):
+            continue
+        with data.io.open(fn, 'r') as f:
+            _read_gnuplot_file(data, f, formatter, array_ids)
+    if write_sidecars and array_ids is None:
+        _write_sidecar(data, sidecar, stamp)
+
+
+def _write_sidecar(data, sidecar, stamp):
+    """
+    Write the arrays of data and how they refer to each other to the
+    uncompressed npz file sidecar, tagged with the stamp of the data files
+    they were read from, see _file_stamp.
+    """
+    layout = {array_id: {'label': array.label,
+                         'is_setpoint': array.is_setpoint,
+                         'set_arrays': [set_array.array_id
+                                        for set_array in array.set_arrays],
+                         'last_saved_index': (
+                             None if array.last_saved_index is None
+                             else int(array.last_saved_index))}
+              for array_id, array in data.arrays.items()}
+    header = json.dumps({'stamp': stamp, 'arrays': layout})
+    arrays = {array_id: array.ndarray
+              for array_id, array in data.arrays.items()}
+    tmp = None
+    try:
+        # a file of its own for each writer, which is not part of the data
+        fd, tmp = tempfile.mkstemp(suffix='.tmp',
+                                   dir=os.path.dirname(sidecar))
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, __layout__=np.array(header), **arrays)
+        # replace in one step so readers never see a partial file
+        os.replace(tmp, sidecar)
+    except OSError:
+        log.warning('Could not write {}'.format(sidecar), exc_info=True)
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _read_sidecar(data, sidecar, stamp, array_ids=None):
+    """
+    Read the data arrays in array_ids, or all if None, and their setpoints
+    from the sidecar into data, if it was written for data files with the
+    given stamp, see _file_stamp. Only the arrays needed are loaded from
+    the file.
+
+    Returns:
+        True if the arrays were read, False if the sidecar is missing or
+        out of date.
+    """
+    if not os.path.isfile(sidecar):
+        return False
+    try:
+        with np.load(sidecar) as arrays:
+            header = json.loads(str(arrays['__layout__']))
+            if header.get('stamp') != stamp:
+                return False
+            layout = header['arrays']
+            wanted = [array_id for array_id, info in layout.items()
+                      if not info['is_setpoint'] and
+                      (array_ids is None or array_id in array_ids)]
+            # add the setpoints of the wanted arrays
+            for array_id in list(wanted):
+                wanted += layout[array_id]['set_arrays']
+            wanted = [array_id for array_id in layout
+                      if array_id in wanted and array_id not in data.arrays]
+            # set arrays are created before the arrays that refer to them
+            for array_id in sorted(wanted,
+                                   key=lambda array_id: (
+                                       not layout[array_id]['is_setpoint'],
+                                       len(layout[array_id]['set_arrays']))):
+                info = layout[array_id]
+                array = DataArray(
+                    label=info['label'], array_id=array_id,
+                    is_setpoint=info['is_setpoint'],
+                    set_arrays=tuple(data.arrays[set_id]
+                                     for set_id in info['set_arrays']
+                                     if set_id != array_id),
+                    snapshot=data.get_array_metadata(array_id),
+                    preset_data=arrays[array_id])
+                array.modified_range = None
+                array.last_saved_index = info['last_saved_index']
+                data.add_array(array)
+    except (OSError, ValueError, KeyError):
+        log.warning('Could not read {}'.format(sidecar), exc_info=True)
+        return False
+    return True
+
+
+def _read_gnuplot_file(data, f, formatter, array_ids=None):
+    ids = formatter._read_comment_line(f).split()
+    labels = formatter._get_labels(formatter._read_comment_line(f))
+    shape = tuple(map(int, formatter._read_comment_line(f).split()))
+    ndim = len(shape)
+    columns = [i for i, array_id in enumerate(ids[ndim:], ndim)
+               if (array_ids is None or array_id in array_ids) and
+               array_id not in data.arrays]
+    if not columns:
+        return
+
+    # the values of the points follow one after another, separated by
+    # whitespace and blank lines, only the requested columns are converted
+    tokens = f.read().split()
+    size = int(np.prod(shape))
+    num_read = min(len(tokens) // len(ids), size)
+    last_index = np.unravel_index(max(num_read - 1, 0), shape)
+
+    def read_column(i):
+        # an interrupted measurement leaves the remaining points empty
+        column = np.full(size, np.nan)
+        column[:num_read] = np.array(tokens[i:num_read * len(ids):len(ids)],
+                                     dtype=float)
+        return column.reshape(shape)
+
+    def add_array(array, index):
+        data.add_array(array)
+        # only the points read are marked as stored, like DataSet.read
+        array.modified_range = None
+        if num_read:
+            array.mark_saved(array.flat_index(index))
+
+    set_arrays = ()
+    for i, array_id in enumerate(ids[:ndim]):
+        if array_id in data.arrays:
+            set_array = data.arrays[array_id]
+        else:
+            # the setpoints of dimension i only depend on the outer indices
+            index = (slice(None),) * (i + 1) + (0,) * (ndim - i - 1)
+            set_array = DataArray(label=labels[i], array_id=array_id,
+                                  set_arrays=set_arrays,
+                                  shape=shape[:i + 1], is_setpoint=True,
+                                  snapshot=data.get_array_metadata(array_id),
+                                  preset_data=read_column(i)[index])
+            add_array(set_array, last_index[:i + 1])
+        set_arrays = set_arrays + (set_array,)
+
+    for i in columns:
+        data_array = DataArray(label=labels[i], array_id=ids[i],
+                               set_arrays=set_arrays, shape=shape,
+                               snapshot=data.get_array_metadata(ids[i]),
+                               preset_data=read_column(i))
+        add_array(data_array, last_index)
+
+
+def _view_dataset(data, array_ids=None):
+    """
+    DataSet with read-only views of the data arrays in array_ids, or all if
+    None, and their setpoints, which share their memory with the arrays of
+    data. Assign a new ndarray to an array of the view to change it, the
+    arrays of data are left untouched.
+    """
+    view = qc.DataSet(location=data.location, io=data.io,
+                      formatter=data.formatter)
+    view.metadata.update(deepcopy(data.metadata))
+    arrays = [array for array in data.arrays.values()
+              if array_ids is None or array.array_id in array_ids]
+    for array in list(arrays):
+        arrays += [set_array for set_array in array.set_arrays
+                   if set_array not in arrays]
+    views = {}
+    # set arrays are added before the arrays that refer to them
+    for array in sorted(arrays, key=lambda array: (not array.is_setpoint,
+                                                   len(array.shape))):
+        ndarray = array.ndarray.view()
+        ndarray.flags.writeable = False
+        views[array.array_id] = DataArray(
+            label=array.label, array_id=array.array_id, name=array.name,
+            unit=array.unit, is_setpoint=array.is_setpoint,
+            set_arrays=tuple(views[set_array.array_id]
+                             for set_array in array.set_arrays
+                             if set_array is not array),
+            shape=array.shape, preset_data=ndarray)
+        views[array.array_id].modified_range = array.modified_range
+        views[array.array_id].last_saved_index = array.last_saved_index
+        view.add_array(views[array.array_id])
+    return view
+
+
+def _location(id, samplefolder=None):
+    if samplefolder==None:
+        check_experiment_is_initialized()
+        samplefolder = qc.DataSet.location_provider.fmt.format(counter='')
+    return samplefolder + '{0:03d}'.format(id)
+
+
+def load_num(id, samplefolder=None, array_ids=None):
+    """
+    Load the legacy DataSet with the given id through the data_cache.
+
+    Args:
+        id (int): id of the dataset
+        samplefolder (str): Sample folder if loading data from different
+            sample than the initialized.
+        array_ids: ids of the data arrays to read, all arrays if None. Pass
+            () to read only the metadata.
+
+    Returns:
+        the DataSet
+    """
+    return data_cache.load(_location(id, samplefolder), array_ids)
+
+
+def load_datasets(paths, array_ids=None, max_workers=8):
+    """
+    Load the legacy DataSets at paths in parallel through the data_cache.
+
+    Args:
+        paths: locations of the DataSets
+        array_ids: ids of the data arrays to read, all arrays if None. The
+            setpoints of the arrays are always read.
+        max_workers: maximum number of DataSets loaded at the same time
+
+    Returns:
+        list of the DataSets, the same DataSet for repeated paths
+    """
+    paths = list(paths)
+    # each DataSet is only loaded once
+    unique = list(collections.OrderedDict.fromkeys(paths))
+    if len(unique) == 1:
+        loaded = [data_cache.load(unique[0], array_ids)]
+    else:
+        with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(unique))) as pool:
+            loaded = list(pool.map(
+                lambda path: data_cache.load(path, array_ids), unique))
+    datasets = dict(zip(unique, loaded))
+    return [datasets[path] for path in paths]
+
+
+def _data_names(data):
+    """
+    Ids of all arrays of data, also those that were not read.
+    """
+    return list(data.metadata.get('arrays', data.arrays).keys())
+
+
 def show_num(ids, samplefolder=None, useQT=False, avg_sub='',
              do_plots=True, savepng=True, fig_size=[6,4], clim=None,
              dataname=None, xlim=None, ylim=None, transpose=False,
@@ -48,6 +419,11 @@ def show_num(ids, samplefolder=None, useQT=False, avg_sub='',
             See also the plotting tuorial notebook.
         **kwargs: Are passed to plot function
 
+    The datasets are loaded through data_cache in parallel, only the array
+    dataname and its setpoints if it is given. The returned datasets hold
+    read-only views of the cached arrays, assign a new ndarray to an array
+    to change it.
+
     Returns:
         data, plots : returns the plots and the datasets
 
@@ -73,9 +449,11 @@ def show_num(ids, samplefolder=None, useQT=False, avg_sub='',
 
 
     # Load all datasets into list
-    for id in ids:
-        path = samplefolder + '{0:03d}'.format(id)
-        data = qc.load_data(path)
+    paths = [_location(id, samplefolder) for id in ids]
+    array_ids = None if dataname is None else [dataname]
+    for data in load_datasets(paths, array_ids=array_ids):
+        # the cached dataset is shared with later calls
+        data = _view_dataset(data, array_ids)
         data_list.append(data)
 
         # find datanames to be plotted
@@ -83,9 +461,9 @@ def show_num(ids, samplefolder=None, useQT=False, avg_sub='',
             if useQT and len(ids) is not 1:
                 raise ValueError('qcodes.QtPlot does not support multigraph plotting. Set useQT=False to plot multiple datasets.')
             if dataname is not None:
-                if dataname not in [key for key in data.arrays.keys() if "_set" not in key]:
+                if dataname not in [key for key in _data_names(data) if "_set" not in key]:
                     raise RuntimeError('Dataname not in dataset. Input dataname was: \'{}\''.format(dataname), \
-                        'while dataname(s) in dataset are: \'{}\'.'.format('\', \''.join(data.arrays.keys())))
+                        'while dataname(s) in dataset are: \'{}\'.'.format('\', \''.join(_data_names(data))))
                 keys = [dataname]
             else:
                 keys = [key for key in data.arrays.keys() if "_set" not in key]
@@ -118,12 +496,13 @@ def show_num(ids, samplefolder=None, useQT=False, avg_sub='',
                         set0_temp.ndarray = set0_temp.ndarray.T
                         set1_temp.ndarray = set1_temp.ndarray.T
                         arrays.set_arrays = (set1_temp,set0_temp,)
+                    # the arrays are read-only views, replace them
                     if avg_sub == 'row':
-                        for i in range(np.shape(arrays.ndarray)[0]):
-                            arrays.ndarray[i,:] -= np.nanmean(arrays.ndarray[i,:])
+                        arrays.ndarray = arrays.ndarray - np.nanmean(
+                            arrays.ndarray, axis=1, keepdims=True)
                     if avg_sub == 'col':
-                        for i in range(np.shape(arrays.ndarray)[1]):
-                            arrays.ndarray[:,i] -= np.nanmean(arrays.ndarray[:,i])
+                        arrays.ndarray = arrays.ndarray - np.nanmean(
+                            arrays.ndarray, axis=0, keepdims=True)
                     array_list.append(arrays)
 
                     # Find axis limits for dataset
@@ -220,10 +599,10 @@ def show_meta(id,instruments,samplefolder=None,key_word=''):
         check_experiment_is_initialized()
 
         path = qc.DataSet.location_provider.fmt.format(counter=str_id)
-        data = qc.load_data(path)
     else:
         path = '{}{}{}'.format(samplefolder,sep,str_id)
-        data = qc.load_data(path)
+    # only the metadata is needed
+    data = data_cache.load(path, array_ids=())
 
 
     for instr in instruments:
@@ -2,44 +2,147 @@ import matplotlib.pyplot as plt
 from os.path import sep
 from typing import Optional, Tuple, Sequence, Union
 Number = Union[float, int]
-from collections import Iterable
+from collections import Iterable, OrderedDict
 from contextlib import suppress
 from pyqtgraph.multiprocess.remoteproxy import ClosedError
 
 import qcodes as qc
+from qcodes.instrument.parameter import Parameter, MultiParameter
 from qcodes.instrument.visa import VisaInstrument
 from qcodes.plots.pyqtgraph import QtPlot
 from qcodes.actions import Task
 from qcodes.data.data_set import DataSet
 from qcodes.loops import Loop
 from qcodes.measure import Measure
+from qcodes.utils.threading import thread_map
 from qdev_wrappers.file_setup import CURRENT_EXPERIMENT
 from qdev_wrappers.file_setup import pdfdisplay
 from qdev_wrappers.plot_functions import _plot_setup, \
-    _save_individual_plots
+    _save_individual_plots, _individual_array_names, _LivePlotUpdater, \
+    save_plot_settings
 from qdev_wrappers.device_annotator.device_image import save_device_image
 
 import logging
 log = logging.getLogger(__name__)
 
+# names of the instruments that failed to respond during a parallel readout
+_instruments_with_errors = set()
 
-def _flush_buffers(*params):
+
+def _flush_buffers(*params, only_with_errors=False):
     """
     If possible, flush the VISA buffer of the instrument of the
     provided parameters. The params can be instruments as well.
 
     Supposed to be called inside doNd like so:
     _flush_buffers(inst_set, *inst_meas)
+
+    If only_with_errors is True only the instruments that failed to respond
+    during a previous parallel readout are flushed. An instrument is
+    forgotten once its buffer has been flushed.
     """
     instr_names = set(p.root_instrument.name
                       for p in params
                       if p.root_instrument is not None)
+    if only_with_errors:
+        instr_names &= _instruments_with_errors
     for name in instr_names:
         instr = qc.Instrument.find_instrument(name)
         # suppress for non visa instruments, that do not implement this
         # method
         with suppress(AttributeError):
             instr.device_clear()
+        _instruments_with_errors.discard(name)
+
+
+def _readout_bus(param):
+    """
+    The bus that param is read out over. Instruments on the same GPIB board
+    share the bus, any other instrument has a connection of its own.
+    """
+    instr = param.root_instrument
+    if instr is None:
+        return param.full_name
+    if isinstance(instr, VisaInstrument):
+        resource = instr.visa_handle.resource_name
+        if resource.upper().startswith('GPIB'):
+            return resource.split('::')[0].upper()
+    return instr.name
+
+
+class _ParallelReadout(MultiParameter):
+    """
+    Gets a number of scalar parameters in parallel. The parameters are
+    grouped by the bus they are read out over, the parameters of a group
+    are read one after another and the groups are read in parallel
+    threads. The values are stored under the full names of the parameters,
+    so the data set is the same as if they were measured one by one.
+
+    If a parameter fails to respond its instrument is remembered and its
+    buffer is flushed before the next measurement.
+    """
+
+    def __init__(self, params):
+        self.params = tuple(params)
+        super().__init__('parallel_readout',
+                         names=tuple(p.full_name for p in self.params),
+                         shapes=((),) * len(self.params),
+                         labels=tuple(p.label for p in self.params),
+                         units=tuple(p.unit for p in self.params))
+        groups = OrderedDict()
+        for i, param in enumerate(self.params):
+            groups.setdefault(_readout_bus(param), []).append(i)
+        self.groups = list(groups.values())
+
+    def _read_group(self, group, values):
+        for i in group:
+            param = self.params[i]
+            try:
+                values[i] = param.get()
+            except Exception:
+                if param.root_instrument is not None:
+                    _instruments_with_errors.add(param.root_instrument.name)
+                raise
+
+    def get_raw(self):
+        values = [None] * len(self.params)
+        try:
+            thread_map([self._read_group] * len(self.groups),
+                       args=[(group, values) for group in self.groups])
+        except KeyboardInterrupt:
+            # replies to reads that were cut short may still arrive
+            _instruments_with_errors.update(
+                p.root_instrument.name for p in self.params
+                if p.root_instrument is not None)
+            raise
+        return tuple(values)
+
+
+def _group_readout(inst_meas):
+    """
+    Replace each run of consecutive scalar parameters in inst_meas that are
+    read out over more than one bus by a _ParallelReadout of them. Tasks
+    and array valued parameters are left in place.
+    """
+    def is_scalar(action):
+        return (isinstance(action, Parameter) and
+                not hasattr(action, 'names') and
+                not getattr(action, 'shape', None))
+
+    grouped = []
+    run = []
+    for action in list(inst_meas) + [None]:
+        if action is not None and is_scalar(action):
+            run.append(action)
+            continue
+        if len(set(_readout_bus(p) for p in run)) > 1:
+            grouped.append(_ParallelReadout(run))
+        else:
+            grouped += run
+        run = []
+        if action is not None:
+            grouped.append(action)
+    return tuple(grouped)
 
 
 def _select_plottables(tasks):
@@ -97,6 +200,7 @@ def _do_measurement_single(measurement: Measure, meas_params: tuple,
 def _do_measurement(loop: Loop, set_params: tuple, meas_params: tuple,
                     do_plots: Optional[bool]=True,
                     use_threads: bool=True,
+                    parallel_readout: bool=False,
                     auto_color_scale: Optional[bool]=None,
                     cutoff_percentile: Optional[Union[Tuple[Number, Number], Number]]=None) -> Tuple[QtPlot, DataSet]:
     """
@@ -109,10 +213,14 @@ def _do_measurement(loop: Loop, set_params: tuple, meas_params: tuple,
         set_params: tuple of tuples. Each tuple is of the form
             (param, start, stop)
         meas_params: tuple of parameters to measure
-        do_plots: Whether to do a live plot
+        do_plots: Whether to do a live plot. The live plot is updated
+            according to plot_functions.live_plot_settings.
         use_threads: Whether to use threads to parallelise simultaneous
             measurements. If only one thing is being measured at the time
             in loop, this does nothing.
+        parallel_readout: Whether the measured parameters of the loop are
+            read out in parallel. If True only the instruments that failed
+            to respond during a previous parallel readout are flushed.
         auto_color_scale: if True, the colorscale of heatmap plots will be
             automatically adjusted to disregard outliers.
         cutoff_percentile: percentile of data that may maximally be clipped
@@ -124,7 +232,7 @@ def _do_measurement(loop: Loop, set_params: tuple, meas_params: tuple,
     """
     try:
         parameters = [sp[0] for sp in set_params] + list(meas_params)
-        _flush_buffers(*parameters)
+        _flush_buffers(*parameters, only_with_errors=parallel_readout)
 
         # startranges for _plot_setup
         try:
@@ -153,15 +261,17 @@ def _do_measurement(loop: Loop, set_params: tuple, meas_params: tuple,
             plot = None
         try:
             if do_plots:
-                _ = loop.with_bg_task(plot.update).run(use_threads=use_threads)
+                _ = loop.with_bg_task(_LivePlotUpdater(plot)).run(
+                    use_threads=use_threads)
             else:
                 _ = loop.run(use_threads=use_threads)
         except KeyboardInterrupt:
             interrupted = True
             print("Measurement Interrupted")
         if do_plots:
-            # Ensure the correct scaling before saving
+            # Draw the full data and ensure the correct scaling before saving
             try:
+                plot.update()
                 plot.autorange()
                 plot.save()
             except (ClosedError, ConnectionError):
@@ -191,6 +301,15 @@ def _do_MatPlot(data,meas_params,
                 auto_color_scale: Optional[bool]=None,
                 cutoff_percentile: Optional[Union[Tuple[Number, Number], Number]]=None):
     plt.ioff()
+    individual = len(_individual_array_names(data, meas_params)) > 1
+    # unless they are displayed, the individual plots can be rendered in
+    # worker processes while the combined plot is rendered here
+    futures = []
+    if individual and not pdfdisplay['individual']:
+        futures = _save_individual_plots(
+            data, meas_params, False, auto_color_scale=auto_color_scale,
+            cutoff_percentile=cutoff_percentile, wait=False,
+            parallel_save=save_plot_settings['parallel'])
     plot, num_subplots = _plot_setup(data, meas_params, useQT=False,
                                      auto_color_scale=auto_color_scale,
                                      cutoff_percentile=cutoff_percentile)
@@ -217,16 +336,17 @@ def _do_MatPlot(data,meas_params,
         plt.show()
     else:
         plt.close(plot.fig)
-    if num_subplots > 1:
-        _save_individual_plots(data, meas_params,
-                               pdfdisplay['individual'],
+    if individual and pdfdisplay['individual']:
+        _save_individual_plots(data, meas_params, True,
                                auto_color_scale=auto_color_scale,
                                cutoff_percentile=cutoff_percentile)
+    for future in futures:
+        future.result()
     plt.ion()
 
 
 def do1d(inst_set, start, stop, num_points, delay, *inst_meas, do_plots=True,
-         use_threads=False,
+         use_threads=False, parallel_readout=False,
          auto_color_scale: Optional[bool]=None,
          cutoff_percentile: Optional[Union[Tuple[Number, Number], Number]]=None):
     """
@@ -244,6 +364,10 @@ def do1d(inst_set, start, stop, num_points, delay, *inst_meas, do_plots=True,
              and can be displayed with show_num.
         use_threads: If True and if multiple things are being measured,
             multiple threads will be used to parallelise the waiting.
+        parallel_readout: If True the measured parameters are grouped by
+            the instrument bus they are read out over and the groups are
+            read in parallel at each step. Only instruments that failed to
+            respond are flushed before the measurement.
         auto_color_scale: if True, the colorscale of heatmap plots will be
             automatically adjusted to disregard outliers.
         cutoff_percentile: percentile of data that may maximally be clipped
@@ -256,15 +380,17 @@ def do1d(inst_set, start, stop, num_points, delay, *inst_meas, do_plots=True,
 
     """
 
+    actions = _group_readout(inst_meas) if parallel_readout else inst_meas
     loop = qc.Loop(inst_set.sweep(start,
                                   stop,
-                                  num=num_points), delay).each(*inst_meas)
+                                  num=num_points), delay).each(*actions)
 
     set_params = (inst_set, start, stop),
     meas_params = _select_plottables(inst_meas)
 
     plot, data = _do_measurement(loop, set_params, meas_params,
                                  do_plots=do_plots, use_threads=use_threads,
+                                 parallel_readout=parallel_readout,
                                  auto_color_scale=auto_color_scale,
                                  cutoff_percentile=cutoff_percentile)
 
@@ -327,6 +453,7 @@ def do1dDiagonal(inst_set, inst2_set, start, stop, num_points,
 def do2d(inst_set, start, stop, num_points, delay,
          inst_set2, start2, stop2, num_points2, delay2,
          *inst_meas, do_plots=True, use_threads=False,
+         parallel_readout=False,
          set_before_sweep: Optional[bool]=False,
          innerloop_repetitions: Optional[int]=1,
          innerloop_pre_tasks: Optional[Sequence]=None,
@@ -351,6 +478,10 @@ def do2d(inst_set, start, stop, num_points, delay,
             Data is still saved and can be displayed with show_num.
         use_threads: If True and if multiple things are being measured,
             multiple threads will be used to parallelise the waiting.
+        parallel_readout: If True the measured parameters are grouped by
+            the instrument bus they are read out over and the groups are
+            read in parallel at each step. Only instruments that failed to
+            respond are flushed before the measurement.
         set_before_sweep: if True the outer parameter is set to its first value
             before the inner parameter is swept to its next value.
         innerloop_pre_tasks: Tasks to execute before each iteration of the
@@ -377,12 +508,14 @@ def do2d(inst_set, start, stop, num_points, delay,
                     continue
             raise ValueError("3d plotting is not supported")
 
+    inner_actions = (_group_readout(inst_meas) if parallel_readout
+                     else inst_meas)
     actions = []
     for i_rep in range(innerloop_repetitions):
         innerloop = qc.Loop(inst_set2.sweep(start2,
                                             stop2,
                                             num=num_points2),
-                            delay2).each(*inst_meas)
+                            delay2).each(*inner_actions)
         if set_before_sweep:
             ateach = [innerloop, Task(inst_set2, start2)]
         else:
@@ -406,6 +539,7 @@ def do2d(inst_set, start, stop, num_points, delay,
 
     plot, data = _do_measurement(outerloop, set_params, meas_params,
                                  do_plots=do_plots, use_threads=use_threads,
+                                 parallel_readout=parallel_readout,
                                  auto_color_scale=auto_color_scale,
                                  cutoff_percentile=cutoff_percentile)
 
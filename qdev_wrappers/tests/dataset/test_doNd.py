@@ -2,14 +2,23 @@
 These are the basic black box tests for the doNd functions.
 """
 
-from qdev_wrappers.dataset.doNd import do0d, do1d, do2d
+from qdev_wrappers.dataset.doNd import (do0d, do1d, do2d, do1d_adaptive, resume,
+                                        SWEEP_METADATA_TAG)
+from qdev_wrappers.dataset.column_store import ColumnStore, load_column_store
+from qdev_wrappers.dataset.live_plot import LivePlot
+from qdev_wrappers.dataset.profiling import SweepProfiler
 from typing import Tuple, List, Optional
-from qcodes.instrument.parameter import Parameter
-from qcodes import config, new_experiment, load_by_id
+from qcodes.instrument.parameter import Parameter, ArrayParameter
+from qcodes import config, new_experiment, load_by_id, load_last_experiment
 from qcodes.utils import validators
 
+import json
+import os
+from unittest.mock import patch
+
 import pytest
 import numpy as np
+import matplotlib.pyplot as plt
 config.user.mainfolder = "output"  # set ouput folder for doNd's
 new_experiment("doNd-tests", sample_name="no sample")
 
@@ -230,3 +239,337 @@ def test_do2d_output_data(_param, _paramComplex, _param_set):
     assert np.allclose(data.get_parameter_data(_param_set.name)[_param_set.name][_param_set.name], np.array([0.5, 0.5, 0.625, 0.625,
                                                 0.75, 0.75, 0.875, 0.875,
                                                 1, 1] * 5))
+
+
+def test_do2d_snake(_param):
+
+    set_values = []
+    inner = Parameter('inner_setter_parameter',
+                      set_cmd=set_values.append,
+                      get_cmd=None)
+    outer = Parameter('outer_setter_parameter',
+                      set_cmd=None,
+                      get_cmd=None)
+
+    exp = do2d(outer, 0, 1, 3, 0,
+               inner, 0, 1, 3, 0,
+               _param, snake=True, do_plot=False)
+
+    assert np.allclose(set_values, [0, 0.5, 1, 1, 0.5, 0, 0, 0.5, 1])
+    set_values.clear()
+
+    do2d(outer, 0, 1, 3, 0, inner, 0, 1, 3, 0, _param, snake=True,
+         skip_unchanged=(inner,), do_plot=False)
+
+    # the first point of a reversed inner sweep is already set
+    assert np.allclose(set_values, [0, 0.5, 1, 0.5, 0, 0.5, 1])
+
+    data = load_by_id(exp[0])
+    assert np.allclose(data.get_parameter_data(_param.name)[_param.name][inner.name],
+                       np.array([0, 0.5, 1] * 3))
+
+
+@pytest.mark.parametrize('loss', ['gradient', 'curvature'])
+def test_do1d_adaptive(_param_set, loss):
+
+    step = Parameter('step_parameter',
+                     set_cmd=None,
+                     get_cmd=lambda: float(_param_set.get() > 0.3))
+
+    exp = do1d_adaptive(_param_set, 0, 1, 20, 0, step, loss=loss,
+                        do_plot=False)
+    data = load_by_id(exp[0])
+    setpoints = data.get_parameter_data(step.name)[step.name][_param_set.name]
+
+    assert len(setpoints) == 20
+    assert np.all(np.isin([0, 0.25, 0.5, 0.75, 1], setpoints))
+    # the additional points are spent around the step
+    assert np.sum((setpoints > 0.25) & (setpoints < 0.5)) >= 10
+
+
+def test_do1d_adaptive_min_step(_param_set, _param):
+
+    exp = do1d_adaptive(_param_set, 0, 1, 100, 0, _param, min_step=0.1,
+                        do_plot=False)
+    data = load_by_id(exp[0])
+    setpoints = data.get_parameter_data(_param.name)[_param.name][_param_set.name]
+
+    assert np.min(np.diff(np.sort(setpoints))) >= 0.1
+    assert len(setpoints) < 100
+
+
+def test_do1d_plot_in_background(_param_set, _param):
+
+    figures = plt.get_fignums()
+    run_id, future = do1d(_param_set, 0, 1, 5, 0, _param,
+                          plot_in_background=True)
+    paths = future.result()
+
+    assert type(run_id) == int
+    png = os.path.join(config.user.mainfolder, 'doNd-tests', 'no sample',
+                       'png', f'{run_id}_0.png')
+    assert os.path.abspath(png) in [os.path.abspath(p) for p in paths]
+    assert all(os.path.isfile(p) for p in paths)
+    # no figures are created in the measurement process
+    assert plt.get_fignums() == figures
+
+
+def test_do2d_live_plot(_param, _paramComplex):
+
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+    inner = Parameter('inner_setter_parameter', set_cmd=None, get_cmd=None)
+
+    live_plots = []
+
+    def _live_plot(*args):
+        live_plots.append(LivePlot(*args))
+        return live_plots[-1]
+
+    with patch('qdev_wrappers.dataset.doNd.LivePlot', side_effect=_live_plot):
+        do2d(outer, 0, 1, 3, 0, inner, 0, 1, 4, 0, _param, _paramComplex,
+             snake=True, live_plot=True, do_plot=False)
+
+    buffers = live_plots[0]._buffers
+    assert np.allclose(buffers[_param.full_name], np.ones((3, 4)))
+    assert np.allclose(buffers[_paramComplex.full_name],
+                       np.full((3, 4), np.sqrt(2)))
+
+
+@pytest.mark.parametrize('skip_unchanged', [False, True])
+def test_do2d_skips_redundant_sets(_param, skip_unchanged):
+
+    inner_values = []
+    outer_values = []
+    inner = Parameter('inner_setter_parameter',
+                      set_cmd=inner_values.append,
+                      get_cmd=None)
+    outer = Parameter('outer_setter_parameter',
+                      set_cmd=outer_values.append,
+                      get_cmd=None)
+
+    do2d(outer, 1, 1, 2, 0, inner, 0, 1, 3, 0, _param,
+         snake=True, skip_unchanged=(outer, inner) if skip_unchanged else (),
+         do_plot=False)
+
+    if skip_unchanged:
+        assert outer_values == [1]
+        assert np.allclose(inner_values, [0, 0.5, 1, 0.5, 0])
+    else:
+        assert outer_values == [1, 1]
+        assert np.allclose(inner_values, [0, 0.5, 1, 1, 0.5, 0])
+
+
+def test_do2d_skip_unchanged_after_actions():
+
+    inner_values = []
+    inner = Parameter('inner_setter_parameter', set_cmd=inner_values.append,
+                      get_cmd=lambda: inner_values[-1])
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+    measured = Parameter('measured_parameter', set_cmd=None,
+                         get_cmd=lambda: inner_values[-1])
+
+    # the action moves the inner parameter away from its last setpoint
+    exp = do2d(outer, 0, 1, 2, 0, inner, 0.2, 1, 3, 0, measured,
+               snake=True, skip_unchanged=(outer, inner),
+               after_inner_actions=[lambda: inner.set(0)], do_plot=False)
+
+    assert np.allclose(inner_values, [0.2, 0.6, 1, 0, 1, 0.6, 0.2, 0])
+    data = load_by_id(exp[0]).get_parameter_data(measured.name)
+    data = data[measured.name]
+    assert np.allclose(data[measured.name], data[inner.name])
+
+
+def test_do2d_profiler(_param, _param_set):
+
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+    profiler = SweepProfiler()
+
+    exp = do2d(outer, 0, 1, 2, 0, _param_set, 0, 1, 3, 0.01, _param,
+               profiler=profiler, do_plot=False)
+
+    assert len(profiler.timings[f'get {_param.full_name}']) == 6
+    assert len(profiler.timings[f'set {outer.full_name}']) == 2
+    assert len(profiler.timings['datasaver']) == 6
+    assert np.all(np.array(
+        profiler.timings[f'settle {_param_set.full_name}']) > 0.005)
+
+    data = load_by_id(exp[0])
+    timings = json.loads(data.get_metadata(SweepProfiler.metadata_tag))
+    assert timings[f'get {_param.full_name}']['count'] == 6
+
+
+@pytest.mark.parametrize('snake', [False, True])
+def test_do2d_resume(_param_set, snake):
+
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+    gets = []
+
+    def _get():
+        gets.append(_param_set.get())
+        if len(gets) == 5:
+            raise KeyboardInterrupt
+        return _param_set.get()
+
+    interrupted = Parameter('interrupted_parameter', set_cmd=None,
+                            get_cmd=_get)
+
+    with pytest.raises(KeyboardInterrupt):
+        do2d(outer, 0, 1, 4, 0, _param_set, 0, 1, 3, 0, interrupted,
+             snake=snake, do_plot=False)
+    run_id = load_last_experiment().data_sets()[-1].run_id
+
+    exp = resume(run_id, outer, _param_set, interrupted, do_plot=False)
+
+    data = load_by_id(exp[0])
+    assert data.metadata['resumed_from'] == run_id
+    setpoints = data.get_parameter_data(interrupted.name)[interrupted.name]
+    assert np.allclose(setpoints[outer.name], np.repeat([1 / 3, 2 / 3, 1], 3))
+    assert np.allclose(setpoints[_param_set.name], [0, 0.5, 1] * 3)
+    if snake:
+        # the second inner sweep of the original run was reversed
+        assert np.allclose(gets[5:], [1, 0.5, 0, 0, 0.5, 1, 1, 0.5, 0])
+    else:
+        assert np.allclose(gets[5:], [0, 0.5, 1] * 3)
+
+
+def test_do2d_numpy_arguments(_param, _param_set):
+
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+
+    exp = do2d(outer, np.float32(0), np.float64(1), np.int64(2), 0,
+               _param_set, np.float32(0), 1, np.int64(3), 0, _param,
+               write_period=np.float64(0.5), do_plot=False)
+
+    data = load_by_id(exp[0])
+    sweep = json.loads(data.metadata[SWEEP_METADATA_TAG])
+    assert sweep['sweeps'][0]['num_points'] == 2
+    assert sweep['sweeps'][1]['start'] == 0
+    assert sweep['kwargs']['write_period'] == 0.5
+    assert len(data) == 6
+
+
+def test_do2d_resume_interrupted_snake(_param_set):
+
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+    gets = []
+    interrupt_at = [5]
+
+    def _get():
+        gets.append(_param_set.get())
+        if len(gets) in interrupt_at:
+            raise KeyboardInterrupt
+        return _param_set.get()
+
+    interrupted = Parameter('interrupted_parameter', set_cmd=None,
+                            get_cmd=_get)
+
+    # interrupted in the second, reversed, inner sweep
+    with pytest.raises(KeyboardInterrupt):
+        do2d(outer, 0, 1, 5, 0, _param_set, 0, 1, 3, 0, interrupted,
+             snake=True, do_plot=False)
+    first_id = load_last_experiment().data_sets()[-1].run_id
+
+    # the resumed run starts with the reversed sweep and is interrupted in
+    # the sweep after it
+    interrupt_at.append(len(gets) + 5)
+    with pytest.raises(KeyboardInterrupt):
+        resume(first_id, outer, _param_set, interrupted, do_plot=False)
+    second = load_last_experiment().data_sets()[-1]
+    assert second.run_id != first_id
+    assert second.metadata['resumed_from'] == first_id
+    assert json.loads(second.metadata[SWEEP_METADATA_TAG])['sweeps'][1]['start'] == 0
+
+    exp = resume(second.run_id, outer, _param_set, interrupted,
+                 do_plot=False)
+
+    data = load_by_id(exp[0])
+    assert data.metadata['resumed_from'] == second.run_id
+    # the third inner sweep was interrupted in the resumed run and starts
+    # the new one in the forward direction
+    assert np.allclose(gets[-9:], [0, 0.5, 1, 1, 0.5, 0, 0, 0.5, 1])
+    setpoints = data.get_parameter_data(interrupted.name)[interrupted.name]
+    assert np.allclose(setpoints[outer.name], np.repeat([0.5, 0.75, 1], 3))
+    assert np.allclose(setpoints[_param_set.name], [0, 0.5, 1] * 3)
+
+
+class _ArrayParam(ArrayParameter):
+
+    def __init__(self, source):
+        super().__init__('array_parameter', shape=(4,),
+                         setpoints=((0, 1, 2, 3),))
+        self._source = source
+
+    def get_raw(self):
+        return self._source.get() * np.arange(4)
+
+
+@pytest.mark.parametrize('snake', [False, True])
+def test_do2d_column_store(_param, snake):
+
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+    inner = Parameter('inner_setter_parameter', set_cmd=None, get_cmd=None)
+    array_param = _ArrayParam(inner)
+
+    exp = do2d(outer, 0, 1, 3, 0, inner, 0, 1, 2, 0, _param, array_param,
+               column_store=True, snake=snake, do_plot=False)
+
+    data = load_by_id(exp[0])
+    assert data.parameters == f'{outer.name},{inner.name},{_param.name}'
+
+    columns = load_column_store(exp[0])
+    assert np.allclose(columns[outer.full_name], np.repeat([0, 0.5, 1], 2))
+    assert np.allclose(columns[inner.full_name], [0, 1] * 3)
+    assert columns[array_param.full_name].shape == (6, 4)
+    assert np.allclose(columns[array_param.full_name][1::2], np.arange(4))
+
+
+def test_do2d_column_store_interrupted(_param):
+
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+    inner = Parameter('inner_setter_parameter', set_cmd=None, get_cmd=None)
+    array_param = _ArrayParam(inner)
+    gets = []
+
+    def _get():
+        gets.append(inner.get())
+        if len(gets) == 4:
+            raise KeyboardInterrupt
+        return 1
+
+    interrupted = Parameter('interrupted_parameter', set_cmd=None,
+                            get_cmd=_get)
+
+    close = patch.object(ColumnStore, 'close', autospec=True,
+                         side_effect=ColumnStore.close)
+    with pytest.raises(KeyboardInterrupt), close as closed:
+        do2d(outer, 0, 1, 3, 0, inner, 0, 1, 2, 0, array_param, interrupted,
+             column_store=True, do_plot=False)
+    assert closed.call_count == 1
+    run_id = load_last_experiment().data_sets()[-1].run_id
+
+    # the store is closed with the points measured before the interrupt
+    columns = load_column_store(run_id, mmap_mode=None)
+    assert np.allclose(columns[outer.full_name], [0, 0, 0.5])
+    assert np.allclose(columns[inner.full_name], [0, 1, 0])
+    assert np.allclose(columns[array_param.full_name],
+                       [0 * np.arange(4), np.arange(4), 0 * np.arange(4)])
+
+
+def test_column_store_promotes_dtype(tmpdir):
+
+    setter = Parameter('setter_parameter', set_cmd=None, get_cmd=None)
+    array_param = _ArrayParam(setter)
+    store = ColumnStore(str(tmpdir), [array_param])
+
+    for values in (np.arange(4, dtype=np.int64),
+                   np.full(4, 0.25, dtype=np.float32),
+                   np.full(4, 1 + 2j)):
+        store.take(((setter, 0),), ((array_param, values),))
+        store.flush()
+    store.close()
+
+    column = np.load(os.path.join(str(tmpdir),
+                                  f'{array_param.full_name}.npy'))
+    assert column.dtype == np.complex128
+    assert np.array_equal(column, [np.arange(4), np.full(4, 0.25),
+                                   np.full(4, 1 + 2j)])
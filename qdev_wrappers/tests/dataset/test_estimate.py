@@ -0,0 +1,102 @@
+"""
+Tests for the time estimates of the doNd functions.
+"""
+
+from qdev_wrappers.dataset import estimate
+from qdev_wrappers.dataset.estimate import estimate_do1d, estimate_do2d
+from qcodes.instrument.parameter import Parameter
+
+import pytest
+
+
+@pytest.fixture()
+def _param():
+    return Parameter('simple_parameter',
+                     set_cmd=None,
+                     get_cmd=lambda: 1)
+
+
+@pytest.fixture()
+def _param_set():
+    return Parameter('simple_setter_parameter',
+                     set_cmd=None,
+                     get_cmd=None)
+
+
+def test_estimate_do1d(_param_set, _param):
+    result = estimate_do1d(_param_set, 0, 1, 10, 0.01, _param,
+                           write_period=1)
+
+    assert result['post_delay'] == pytest.approx(0.1)
+    assert f'get {_param.full_name}' in result
+    assert result['write'] > 0
+    assert result['total'] == pytest.approx(
+        sum(v for k, v in result.items() if k != 'total'))
+    assert _param_set.get() == 0
+    assert _param_set.post_delay == 0
+
+
+@pytest.mark.parametrize('snake', [False, True])
+def test_estimate_do2d_ramp(_param, snake):
+    outer = Parameter('outer_setter_parameter', set_cmd=None, get_cmd=None)
+    inner = Parameter('inner_setter_parameter', set_cmd=None, get_cmd=None)
+    inner.step = 0.1
+    inner.inter_delay = 0.001
+
+    result = estimate_do2d(outer, 0, 1, 5, 0, inner, 0, 1, 3, 0.001,
+                           _param, snake=snake)
+
+    assert result['post_delay'] == pytest.approx(0.015)
+    if snake:
+        assert 'ramp inner back' not in result
+    else:
+        assert result['ramp inner back'] == pytest.approx(0.04)
+
+
+@pytest.mark.parametrize('set_before_sweep', [False, True])
+def test_estimate_do2d_inner_sets(_param, _param_set, monkeypatch,
+                                  set_before_sweep):
+    monkeypatch.setattr(estimate, '_time_set', lambda *args: 1.0)
+    inner = Parameter('inner_setter_parameter', set_cmd=None, get_cmd=None)
+
+    result = estimate_do2d(_param_set, 0, 1, 5, 0, inner, 0, 1, 3, 0,
+                           _param, set_before_sweep=set_before_sweep)
+
+    assert result['set outer'] == 5
+    assert result['set inner'] == 15
+
+
+def test_estimate_write_period(_param_set, _param, monkeypatch):
+    # 1 ms per point and 100 ms per flush
+    monkeypatch.setattr(estimate, '_time_writes', lambda *args: (1e-3, 0.1))
+    monkeypatch.setattr(estimate, '_time_set', lambda *args: 0)
+
+    # the sweep takes 1 s without writing, so flushing every 0.1 s adds
+    # about 10 flushes to the final flush at the end
+    frequent = estimate_do1d(_param_set, 0, 1, 10, 0.1, _param,
+                             write_period=0.1)
+    rare = estimate_do1d(_param_set, 0, 1, 10, 0.1, _param,
+                         write_period=100)
+
+    assert rare['write'] == pytest.approx(10 * 1e-3 + 0.1)
+    assert frequent['write'] >= rare['write'] + 9 * 0.1
+    assert frequent['total'] - rare['total'] == pytest.approx(
+        frequent['write'] - rare['write'], abs=1e-3)
+
+
+def test_estimate_do2d_flush_columns(_param, _param_set, monkeypatch):
+    monkeypatch.setattr(estimate, '_time_writes', lambda *args: (0, 0.1))
+    inner = Parameter('inner_setter_parameter', set_cmd=None, get_cmd=None)
+
+    result = estimate_do2d(_param_set, 0, 1, 5, 0, inner, 0, 1, 3, 0,
+                           _param, write_period=100, flush_columns=True)
+
+    assert result['write'] == pytest.approx(6 * 0.1)
+
+
+def test_time_writes(_param_set, _param):
+    point_time, flush_time = estimate._time_writes(((_param_set, 0),),
+                                                   (_param,), 3)
+
+    assert point_time > 0
+    assert flush_time > 0
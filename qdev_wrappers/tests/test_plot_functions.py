@@ -0,0 +1,335 @@
+"""
+Tests for the live plot updates and the saving of plots.
+"""
+
+from qdev_wrappers import plot_functions
+from qdev_wrappers.dataset import doNd
+from qdev_wrappers.file_setup import CURRENT_EXPERIMENT
+from qdev_wrappers.plot_functions import (_downsample_image, _is_heatmap,
+                                          _LivePlotUpdater,
+                                          _save_individual_plots)
+from qcodes.data.data_array import DataArray
+from qcodes.data.io import DiskIO
+from qcodes.data.location import FormatLocation
+from qcodes.plots.base import BasePlot
+from qcodes.instrument.parameter import Parameter
+from qcodes.loops import Loop
+from unittest.mock import MagicMock
+from collections import namedtuple
+
+import os
+
+import pytest
+import numpy as np
+
+_Scale = namedtuple('_Scale', ['translate', 'scale', 'revisit'])
+
+
+class _Clock:
+
+    def __init__(self):
+        self.time = 0
+
+    def __call__(self):
+        return self.time
+
+
+@pytest.fixture()
+def _clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(plot_functions.time, 'perf_counter', clock)
+    return clock
+
+
+def _mock_plot(*configs):
+    plot = MagicMock()
+    plot.data_updaters = []
+    plot._get_transform.side_effect = lambda axdata: _Scale(0, 1, False)
+    plot.traces = []
+    for config in configs:
+        plot_object = MagicMock()
+        if 'z' in config:
+            hist = MagicMock()
+            hist.getLevels.return_value = (0, 1)
+            plot_object = {'image': MagicMock(), 'hist': hist,
+                           'histlevels': (0, 1),
+                           'scales': {'x': _Scale(0, 1, True),
+                                      'y': _Scale(0, 1, True)}}
+        plot.traces.append({'config': config, 'plot_object': plot_object})
+    return plot
+
+
+class _Buffer:
+    """
+    Array in the plot process that records the slices sent to it
+    """
+
+    def __init__(self, shape):
+        self.array = np.zeros(shape)
+        self.writes = []
+
+    def __setitem__(self, key, value):
+        self.writes.append(key)
+        self.array[key] = value
+
+    def __getitem__(self, key):
+        return self.array[key]
+
+
+def _recording_updater(plot, **kwargs):
+    updater = _LivePlotUpdater(plot, **kwargs)
+    updater.buffers = []
+
+    def _buffer(item, shape):
+        updater.buffers.append(_Buffer(shape))
+        return updater.buffers[-1]
+
+    updater._buffer = _buffer
+    return updater
+
+
+def _data_array(shape):
+    set_arrays = []
+    for i, n in enumerate(shape):
+        set_array = DataArray(name=f'set_{i}', is_setpoint=True,
+                              preset_data=np.broadcast_to(
+                                  np.arange(n, dtype=float),
+                                  shape[:i + 1]).copy())
+        set_arrays.append(set_array)
+    return DataArray(name='data', preset_data=np.zeros(shape),
+                     set_arrays=tuple(set_arrays))
+
+
+@pytest.mark.parametrize('shape, heatmap', [((5,), False), ((1,), False),
+                                            ((4, 3), True), ((1, 3), True),
+                                            ((2, 3, 4), True),
+                                            ((1, 1, 4), True)])
+def test_is_heatmap(shape, heatmap):
+    data_array = _data_array(shape)
+    trace = {}
+    BasePlot.expand_trace((data_array,), trace)
+
+    assert _is_heatmap(data_array) is heatmap
+    assert _is_heatmap(data_array) == ('z' in trace)
+    assert _is_heatmap(np.zeros(shape)) is heatmap
+
+
+def test_is_heatmap_empty():
+    assert not _is_heatmap(np.zeros(0))
+    assert _is_heatmap(np.zeros((0, 3)))
+
+
+def test_downsample_image():
+    x = np.arange(100)
+    y = np.arange(30)
+    z = np.arange(30 * 100).reshape(30, 100)
+    config = {'x': x, 'y': y, 'z': z}
+
+    assert _downsample_image(config, 3000) is config
+
+    downsampled = _downsample_image(config, 500)
+    assert 250 < downsampled['z'].size <= 500
+    step_x, step_y = downsampled['x'][1], downsampled['y'][1]
+    assert np.array_equal(downsampled['x'], x[::step_x])
+    assert np.array_equal(downsampled['y'], y[::step_y])
+    assert np.array_equal(downsampled['z'], z[::step_y, ::step_x])
+    # the full data is left untouched
+    assert config['z'] is z
+
+
+def test_downsample_image_2d_setpoints():
+    x = np.tile(np.arange(100), (30, 1))
+    z = np.zeros((30, 100))
+    downsampled = _downsample_image({'x': x, 'y': np.arange(30), 'z': z},
+                                    500)
+
+    assert downsampled['x'].shape == downsampled['z'].shape
+    assert len(downsampled['y']) == len(downsampled['z'])
+
+
+def test_live_plot_throttling(_clock):
+    y = DataArray(name='y', shape=(10,), preset_data=np.zeros(10))
+    plot = _mock_plot({'x': np.arange(10), 'y': y})
+    updater = _LivePlotUpdater(plot, min_interval=1, max_fraction=0.1)
+    line = plot.traces[0]['plot_object']
+
+    updater()
+    assert line.setData.call_count == 1
+
+    # too soon after the previous update
+    _clock.time = 0.5
+    y.modified_range = (0, 1)
+    updater()
+    assert line.setData.call_count == 1
+
+    _clock.time = 1.5
+    updater()
+    assert line.setData.call_count == 2
+
+    # unchanged data is not redrawn
+    _clock.time = 3
+    updater()
+    assert line.setData.call_count == 2
+
+
+def test_live_plot_max_fraction(_clock):
+    plot = _mock_plot({'x': np.arange(10), 'y': np.zeros(10)})
+    line = plot.traces[0]['plot_object']
+
+    def _slow_update(x, y):
+        _clock.time += 0.5
+
+    line.setData.side_effect = _slow_update
+    updater = _LivePlotUpdater(plot, min_interval=1, max_fraction=0.1)
+
+    updater()
+    # an update of 0.5 s takes at most a tenth of the time
+    _clock.time = 4.9
+    updater()
+    assert line.setData.call_count == 1
+    _clock.time = 5.1
+    updater()
+    assert line.setData.call_count == 2
+
+
+def test_live_plot_sends_new_points(_clock):
+    x = DataArray(name='x', shape=(10,))
+    y = DataArray(name='y', shape=(10,))
+    x.init_data()
+    y.init_data()
+    plot = _mock_plot({'x': x, 'y': y})
+    updater = _recording_updater(plot, min_interval=1)
+    line = plot.traces[0]['plot_object']
+
+    x[0:3], y[0:3] = [0, 1, 2], [5, 6, 7]
+    updater()
+    assert [b.writes for b in updater.buffers] == [[slice(0, 3)]] * 2
+    sent_x, sent_y = line.setData.call_args[0]
+    assert np.array_equal(sent_y, [5, 6, 7])
+
+    _clock.time = 2
+    x[3:5], y[3:5] = [3, 4], [8, 9]
+    updater()
+    assert [b.writes for b in updater.buffers] == \
+        [[slice(0, 3), slice(3, 5)]] * 2
+    sent_x, sent_y = line.setData.call_args[0]
+    assert np.array_equal(sent_x, [0, 1, 2, 3, 4])
+    assert np.array_equal(sent_y, [5, 6, 7, 8, 9])
+
+
+def test_live_plot_sends_new_rows(_clock):
+    z = DataArray(name='z', shape=(4, 5))
+    z.init_data()
+    plot = _mock_plot({'x': np.arange(5), 'y': np.arange(4), 'z': z})
+    updater = _recording_updater(plot, min_interval=1)
+    image = plot.traces[0]['plot_object']['image']
+
+    z[0] = np.arange(5)
+    z[1, 0:2] = [-1, 10]
+    updater()
+    buffer, = updater.buffers
+    assert buffer.writes == [(slice(None), slice(0, 2))]
+    sent, = image.setImage.call_args[0]
+    assert sent.shape == (5, 2)
+    assert np.array_equal(sent[:, 0], np.arange(5))
+    # the missing points are drawn at the lowest value
+    assert np.array_equal(sent[:, 1], [-1, 10, -1, -1, -1])
+    assert image.setImage.call_args[1]['levels'] == (-1, 10)
+
+    _clock.time = 2
+    z[1, 2:] = 0
+    z[2, 0] = 3
+    updater()
+    # the partly filled row is sent again
+    assert buffer.writes[-1] == (slice(None), slice(1, 3))
+    sent, = image.setImage.call_args[0]
+    assert sent.shape == (5, 3)
+    assert np.array_equal(sent[:, 1], [-1, 10, 0, 0, 0])
+
+
+def test_live_plot_without_qtplot_internals(_clock):
+    plot = _mock_plot({'x': np.arange(10), 'y': np.zeros(10)})
+    del plot._get_transform
+    updater = _LivePlotUpdater(plot)
+
+    updater()
+
+    plot.update_plot.assert_called_once_with()
+    plot.traces[0]['plot_object'].setData.assert_not_called()
+
+
+def test_live_plot_downsamples_images(_clock):
+    z = np.arange(30 * 100).reshape(30, 100)
+    plot = _mock_plot({'x': np.arange(100), 'y': np.arange(30), 'z': z})
+    updater = _LivePlotUpdater(plot, max_pixels=500)
+    plot_object = plot.traces[0]['plot_object']
+
+    updater()
+
+    sent, = plot_object['image'].setImage.call_args[0]
+    assert sent.size <= 500
+    assert plot.traces[0]['config']['z'] is z
+    x, = plot._get_transform.call_args_list[0][0]
+    assert len(x) == sent.shape[0]
+    # the scales are recomputed for the full image afterwards
+    assert all(scale.revisit for scale in plot_object['scales'].values())
+
+
+def _saved_loop_data(tmp_path, monkeypatch):
+    x = Parameter('x', set_cmd=None, get_cmd=None)
+    y = Parameter('y', set_cmd=None, get_cmd=lambda: x() ** 2)
+    z = Parameter('z', set_cmd=None, get_cmd=lambda: -x())
+    loop = Loop(x.sweep(0, 1, num=5)).each(y, z)
+    data = loop.get_data_set(io=DiskIO(str(tmp_path)),
+                             location=FormatLocation(fmt='data/{counter}'))
+    loop.run(quiet=True)
+    monkeypatch.setitem(CURRENT_EXPERIMENT, 'sample_name', 'sample')
+    monkeypatch.setitem(CURRENT_EXPERIMENT, 'pdf_subfolder', 'pdf')
+    os.makedirs(os.path.join(tmp_path, 'data', 'pdf'))
+    return data, (y, z)
+
+
+def test_save_individual_plots(tmp_path, monkeypatch):
+    data, params = _saved_loop_data(tmp_path, monkeypatch)
+    monkeypatch.setattr(plot_functions, '_plot_executor', None)
+    # in process the plots are saved relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    futures = _save_individual_plots(data, params, display_plot=False,
+                                     wait=False)
+
+    assert futures == []
+    # no worker processes are started unless asked for
+    assert plot_functions._plot_executor is None
+    name = os.path.basename(data.location)
+    assert sorted(os.listdir(os.path.join(tmp_path, 'data', 'pdf'))) == [
+        f'{name}_001.pdf', f'{name}_002.pdf']
+
+
+def test_save_individual_plots_in_background(tmp_path, monkeypatch):
+    data, params = _saved_loop_data(tmp_path, monkeypatch)
+
+    futures = _save_individual_plots(data, params, display_plot=False,
+                                     wait=False, parallel_save=True)
+    for future in futures:
+        future.result()
+
+    name = os.path.basename(data.location)
+    assert sorted(os.listdir(os.path.join(tmp_path, 'data', 'pdf'))) == [
+        f'{name}_001.pdf', f'{name}_002.pdf']
+    # the worker processes are shared with the dataset sweep functions
+    assert doNd._get_plot_executor() is plot_functions._get_plot_executor()
+
+
+def test_plot_executor_shut_down_at_exit(monkeypatch):
+    registered = []
+    monkeypatch.setattr(plot_functions, '_plot_executor', None)
+    monkeypatch.setattr(plot_functions.atexit, 'register', registered.append)
+
+    executor = plot_functions._get_plot_executor()
+
+    assert registered == [plot_functions._shutdown_plot_executor]
+    plot_functions._shutdown_plot_executor()
+    assert plot_functions._plot_executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
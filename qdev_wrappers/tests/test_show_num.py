@@ -0,0 +1,196 @@
+"""
+Tests for loading legacy data sets through the cache of show_num.
+"""
+
+from qdev_wrappers.show_num import data_cache, load_datasets, show_num
+from qcodes.instrument.parameter import Parameter
+from qcodes.loops import Loop
+import qcodes as qc
+
+import importlib
+import os
+import shutil
+import pytest
+import numpy as np
+
+# the package exports the function show_num under the name of the module
+show_num_module = importlib.import_module('qdev_wrappers.show_num')
+
+
+def _make_dataset(location, two_d=False, offset=0):
+    x = Parameter('x', set_cmd=None, get_cmd=None)
+    y = Parameter('y', set_cmd=None, get_cmd=None)
+    first = Parameter('first', set_cmd=None,
+                      get_cmd=lambda: x() + 2 * (y() or 0) + offset)
+    second = Parameter('second', set_cmd=None, get_cmd=lambda: -x())
+    if two_d:
+        loop = Loop(x.sweep(0, 1, num=3)).loop(y.sweep(0, 2, num=4)).each(
+            first, second)
+    else:
+        loop = Loop(x.sweep(0, 1, num=5)).each(first, second)
+    data = loop.get_data_set(location=location)
+    loop.run(quiet=True)
+    return data
+
+
+@pytest.fixture()
+def _samplefolder(tmp_path):
+    data_cache.clear()
+    samplefolder = str(tmp_path) + os.sep
+    _make_dataset(samplefolder + '001')
+    _make_dataset(samplefolder + '002', two_d=True)
+    yield samplefolder
+    data_cache.clear()
+
+
+def _assert_same_arrays(data, expected):
+    assert set(data.arrays) == set(expected.arrays)
+    for array_id, array in expected.arrays.items():
+        loaded = data.arrays[array_id]
+        assert loaded.shape == array.shape
+        assert loaded.is_setpoint == array.is_setpoint
+        assert ([a.array_id for a in loaded.set_arrays] ==
+                [a.array_id for a in array.set_arrays])
+        np.testing.assert_array_equal(loaded.ndarray, array.ndarray)
+
+
+@pytest.mark.parametrize('id', [1, 2])
+def test_load_matches_load_data(_samplefolder, id):
+    location = _samplefolder + '{:03d}'.format(id)
+
+    data = data_cache.load(location)
+
+    _assert_same_arrays(data, qc.load_data(location))
+    # a second load is served from the cache
+    assert data_cache.load(location) is data
+
+
+def test_load_some_arrays(_samplefolder):
+    location = _samplefolder + '002'
+    expected = qc.load_data(location)
+
+    data = data_cache.load(location, array_ids=())
+    assert set(data.arrays) == set()
+    data = data_cache.load(location, array_ids=('first',))
+    assert set(data.arrays) == {'x_set', 'y_set', 'first'}
+    data = data_cache.load(location)
+    _assert_same_arrays(data, expected)
+
+
+def test_load_datasets_duplicates(_samplefolder):
+    paths = [_samplefolder + '002', _samplefolder + '001',
+             _samplefolder + '002']
+
+    datasets = load_datasets(paths)
+
+    assert datasets[0] is datasets[2]
+    _assert_same_arrays(datasets[0], qc.load_data(paths[0]))
+    _assert_same_arrays(datasets[1], qc.load_data(paths[1]))
+
+
+def test_show_num_returns_views(_samplefolder):
+    location = _samplefolder + '002'
+    expected = qc.load_data(location)
+
+    data_list, plots = show_num([2, 2], samplefolder=_samplefolder,
+                                dataname='first', avg_sub='row',
+                                savepng=False)
+
+    assert len(plots) == 1
+    assert data_list[0] is not data_list[1]
+    # only the array plotted and its setpoints are read and returned
+    assert set(data_cache.load(location, array_ids=()).arrays) == \
+        {'x_set', 'y_set', 'first'}
+    for data in data_list:
+        assert set(data.arrays) == {'x_set', 'y_set', 'first'}
+        assert data.arrays['first'] is not data_cache.load(
+            location).arrays['first']
+    # the average subtracted in the returned data leaves the cache unchanged
+    _assert_same_arrays(data_cache.load(location), expected)
+    assert np.allclose(np.nanmean(data_list[0].arrays['first'].ndarray,
+                                  axis=1), 0)
+
+
+def test_show_num_views_share_memory(_samplefolder):
+    location = _samplefolder + '002'
+
+    data_list, _ = show_num(2, samplefolder=_samplefolder, do_plots=False)
+
+    data, = data_list
+    cached = data_cache.load(location)
+    assert set(data.arrays) == set(cached.arrays)
+    for array_id, array in data.arrays.items():
+        assert np.shares_memory(array.ndarray, cached.arrays[array_id].ndarray)
+        with pytest.raises(ValueError):
+            array.ndarray[0] = 0
+
+
+def _sidecar(location):
+    return os.path.join(location, show_num_module.SIDECAR_NAME)
+
+
+def test_sidecar_can_be_disabled(_samplefolder, monkeypatch):
+    monkeypatch.setattr(show_num_module, 'write_sidecars', False)
+    location = _samplefolder + '001'
+
+    data_cache.load(location)
+
+    assert not os.path.exists(_sidecar(location))
+
+
+def test_sidecar_not_in_stamp(_samplefolder):
+    location = _samplefolder + '001'
+    stamp = show_num_module._file_stamp(location)
+
+    data_cache.load(location)
+    assert os.path.exists(_sidecar(location))
+    # a writer interrupted before renaming its file leaves it behind
+    with open(os.path.join(location, 'tmpabc.tmp'), 'wb') as f:
+        f.write(b'partial')
+
+    assert show_num_module._file_stamp(location) == stamp
+    assert not [fn for fn in os.listdir(location)
+                if fn.endswith('.tmp') and fn != 'tmpabc.tmp']
+    data_cache.clear()
+    data_cache.load(location)
+    # the sidecar is still up to date
+    assert show_num_module._read_sidecar(
+        qc.DataSet(location=location), _sidecar(location), stamp)
+
+
+@pytest.mark.parametrize('id', [1, 2])
+def test_sidecar(_samplefolder, monkeypatch, id):
+    location = _samplefolder + '{:03d}'.format(id)
+    expected = qc.load_data(location)
+
+    # only the columns asked for are parsed and no sidecar is written
+    data_cache.load(location, array_ids=('first',))
+    assert not os.path.exists(_sidecar(location))
+    data_cache.load(location)
+    assert os.path.exists(_sidecar(location))
+
+    def _fail(*args):
+        raise AssertionError('data file parsed')
+
+    data_cache.clear()
+    monkeypatch.setattr(show_num_module, '_read_gnuplot_file', _fail)
+    _assert_same_arrays(data_cache.load(location), expected)
+
+
+def test_sidecar_older_than_data(_samplefolder):
+    location = _samplefolder + '001'
+    data_cache.load(location)
+    sidecar_time = os.stat(_sidecar(location)).st_mtime_ns
+    data_cache.clear()
+
+    # the data is changed after the sidecar was written
+    _make_dataset(_samplefolder + '003', offset=1)
+    data_file = os.path.join(location, 'x_set.dat')
+    shutil.copyfile(os.path.join(_samplefolder + '003', 'x_set.dat'),
+                    data_file)
+    os.utime(data_file, ns=(sidecar_time + 10**9, sidecar_time + 10**9))
+
+    data = data_cache.load(location)
+    _assert_same_arrays(data, qc.load_data(location))
+    assert np.allclose(data.arrays['first'].ndarray,
+                       np.linspace(0, 1, 5) + 1)
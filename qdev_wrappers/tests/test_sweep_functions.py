@@ -0,0 +1,95 @@
+"""
+Tests for the parallel readout of the sweep functions.
+"""
+
+from qdev_wrappers import sweep_functions
+from qdev_wrappers.sweep_functions import (_flush_buffers, _group_readout,
+                                           _ParallelReadout)
+from qcodes.loops import Loop
+from qcodes.tests.instrument_mocks import DummyInstrument
+from unittest.mock import patch
+
+import pytest
+import numpy as np
+
+
+@pytest.fixture()
+def _instruments():
+    dac = DummyInstrument('dac', gates=['ch1', 'ch2'])
+    dmm = DummyInstrument('dmm', gates=['v1', 'v2'])
+    dac.ch2(2)
+    dmm.v1(3)
+    dmm.v2(4)
+    try:
+        yield dac, dmm
+    finally:
+        dac.close()
+        dmm.close()
+        sweep_functions._instruments_with_errors.clear()
+
+
+def _measure(dac, *actions):
+    loop = Loop(dac.ch1.sweep(0, 1, num=3)).each(*actions)
+    data = loop.get_data_set(location=False)
+    loop.run(quiet=True)
+    return data
+
+
+def test_group_readout(_instruments):
+    dac, dmm = _instruments
+    params = [dac.ch1, dmm.v1, dac.ch2, dmm.v2]
+
+    grouped = _group_readout(params)
+    assert len(grouped) == 1
+    readout = grouped[0]
+    assert isinstance(readout, _ParallelReadout)
+    assert readout.names == tuple(p.full_name for p in params)
+    assert readout.shapes == ((),) * 4
+    assert readout.groups == [[0, 2], [1, 3]]
+
+    # parameters read out over a single bus are left alone
+    assert list(_group_readout([dac.ch1, dac.ch2])) == [dac.ch1, dac.ch2]
+
+
+def test_parallel_readout_matches_serial(_instruments):
+    dac, dmm = _instruments
+    params = [dac.ch1, dmm.v1, dac.ch2, dmm.v2]
+
+    serial = _measure(dac, *params)
+    parallel = _measure(dac, *_group_readout(params))
+
+    assert list(parallel.arrays) == list(serial.arrays)
+    for name, array in serial.arrays.items():
+        assert parallel.arrays[name].shape == array.shape
+        assert np.array_equal(parallel.arrays[name].ndarray, array.ndarray)
+    assert np.allclose(parallel.arrays['dmm_v2'].ndarray, 4)
+
+
+def test_parallel_readout_errors(_instruments):
+    dac, dmm = _instruments
+
+    def _fail():
+        raise RuntimeError('no reply')
+
+    dmm.add_parameter('broken', get_cmd=_fail)
+    readout = _ParallelReadout([dac.ch1, dmm.broken])
+
+    with pytest.raises(RuntimeError):
+        readout.get()
+    assert sweep_functions._instruments_with_errors == {'dmm'}
+
+    with patch.object(DummyInstrument, 'device_clear', create=True) as clear:
+        # only the instruments with errors are flushed
+        _flush_buffers(dac.ch1, only_with_errors=True)
+        assert clear.call_count == 0
+        _flush_buffers(dac.ch1, dmm.v1, only_with_errors=True)
+        assert clear.call_count == 1
+    assert sweep_functions._instruments_with_errors == set()
+
+    with patch.object(DummyInstrument, 'device_clear', create=True,
+                      side_effect=TimeoutError):
+        sweep_functions._instruments_with_errors.add('dmm')
+        with pytest.raises(TimeoutError):
+            _flush_buffers(dmm.v1, only_with_errors=True)
+    # a failed flush is tried again next time
+    assert sweep_functions._instruments_with_errors == {'dmm'}
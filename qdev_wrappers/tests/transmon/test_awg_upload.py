@@ -0,0 +1,105 @@
+"""
+Tests of the incremental upload of sequences to a mocked AWG5014.
+"""
+
+from unittest import mock
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from qdev_wrappers.transmon import awg_helpers
+from qdev_wrappers.transmon.awg_helpers import send_changed_waveforms
+
+
+class _Sequence:
+    """
+    Stand in for an unwrapped sequence of two elements on two channels
+    """
+
+    def __init__(self, amps, goto_states=(0, 0), jump_tos=(0, 0)):
+        self.amps = amps
+        self.goto_states = list(goto_states)
+        self.jump_tos = list(jump_tos)
+
+    def unwrap(self):
+        waveforms = [[amp * np.ones(10) for amp in self.amps],
+                     [np.zeros(10) for _ in self.amps]]
+        markers = [[np.zeros(10) for _ in self.amps] for _ in range(2)]
+        return [(waveforms, markers, markers, [1] * len(self.amps),
+                 [1] * len(self.amps), self.goto_states, self.jump_tos,
+                 [1, 2])]
+
+
+@pytest.fixture()
+def awg():
+    awg = mock.MagicMock()
+    awg.name = 'test_awg5014'
+    yield awg
+    awg_helpers._awg_upload_state.pop(awg.name, None)
+
+
+def _deleted(awg):
+    return [c[0][0] for c in awg.write.call_args_list
+            if c[0][0].startswith('WLISt:WAVeform:DELete')]
+
+
+def test_first_upload(awg):
+    sent = send_changed_waveforms(awg, _Sequence([0.1, 0.2]))
+
+    # the zero waveform of channel 2 is shared by both elements
+    assert sent == 3
+    awg.delete_all_waveforms_from_list.assert_called_once_with()
+    awg.run_mode.assert_called_once_with('SEQ')
+    awg.sequence_length.assert_called_once_with(2)
+    assert awg.set_sqel_waveform.call_count == 4
+
+
+def test_only_changed_waveforms_sent(awg):
+    send_changed_waveforms(awg, _Sequence([0.1, 0.2]))
+    awg.reset_mock()
+
+    sent = send_changed_waveforms(awg, _Sequence([0.1, 0.3]))
+
+    assert sent == 1
+    assert awg.send_waveform_to_list.call_count == 1
+    np.testing.assert_array_equal(
+        awg.send_waveform_to_list.call_args[0][0], 0.3 * np.ones(10))
+    awg.delete_all_waveforms_from_list.assert_not_called()
+    awg.run_mode.assert_not_called()
+    awg.sequence_length.assert_not_called()
+    # only the changed element is reassigned
+    assert {c[0][2] for c in awg.set_sqel_waveform.call_args_list} == {2}
+    # and the waveform it no longer uses is deleted
+    old_hash = awg_helpers._waveform_hash(0.2 * np.ones(10), np.zeros(10),
+                                          np.zeros(10))
+    assert _deleted(awg) == [
+        'WLISt:WAVeform:DELete "wfm_{}"'.format(old_hash[:16])]
+    assert len(awg_helpers._awg_upload_state[awg.name]['waveforms']) == 3
+
+
+def test_unchanged_sequence_sends_nothing(awg):
+    send_changed_waveforms(awg, _Sequence([0.1, 0.2]))
+    awg.reset_mock()
+
+    assert send_changed_waveforms(awg, _Sequence([0.1, 0.2])) == 0
+    awg.set_sqel_waveform.assert_not_called()
+    assert _deleted(awg) == []
+
+
+def test_jump_and_goto_reset(awg):
+    send_changed_waveforms(awg, _Sequence([0.1, 0.2], goto_states=(0, 1),
+                                          jump_tos=(2, 0)))
+    awg.set_sqel_event_jump_type.assert_any_call(1, 'IND')
+    awg.set_sqel_event_jump_target_index.assert_called_once_with(1, 2)
+    awg.set_sqel_goto_state.assert_any_call(2, 1)
+    awg.set_sqel_goto_target_index.assert_called_once_with(2, 1)
+    awg.reset_mock()
+
+    send_changed_waveforms(awg, _Sequence([0.1, 0.2]))
+
+    awg.set_sqel_event_jump_type.assert_any_call(1, 'OFF')
+    awg.set_sqel_goto_state.assert_any_call(2, 0)
+    awg.set_sqel_event_jump_target_index.assert_not_called()
+    awg.set_sqel_goto_target_index.assert_not_called()
@@ -0,0 +1,59 @@
+"""
+Tests of the clifford tables used to build randomised benchmarking
+sequences.
+"""
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from qdev_wrappers.transmon.sequencing.benchmarking import (
+    clifford_rotations, clifford_table, clifford_inverse, gates_to_mat,
+    cliffords_to_gates, make_random_clifford_sequences)
+
+
+def _equal_up_to_phase(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    overlap = np.trace(b.conj().T @ a) / 2
+    return np.isclose(abs(overlap), 1) and np.allclose(a, overlap * b)
+
+
+def test_clifford_table_matches_gates():
+    for i, first in enumerate(clifford_rotations):
+        for j, second in enumerate(clifford_rotations):
+            # clifford_table[i, j] applies j and then i
+            expected = gates_to_mat(second + first)
+            actual = gates_to_mat(clifford_rotations[clifford_table[i, j]])
+            assert _equal_up_to_phase(actual, expected), (i, j)
+
+
+def test_clifford_inverse():
+    for i, rot in enumerate(clifford_rotations):
+        mat = gates_to_mat(rot + clifford_rotations[clifford_inverse[i]])
+        assert _equal_up_to_phase(mat, np.eye(2))
+
+
+@pytest.mark.parametrize('interleaved', [None, 3, ['Y/2', 'X/2']])
+def test_sequences_invert_to_identity(interleaved):
+    sequences = make_random_clifford_sequences(20, 10,
+                                               interleaved=interleaved,
+                                               seed=1)
+
+    length = 20 if interleaved is None else 40
+    assert sequences.shape == (10, length + 1)
+    for cliffords in sequences:
+        mat = gates_to_mat(cliffords_to_gates(cliffords))
+        assert _equal_up_to_phase(mat, np.eye(2))
+    if interleaved == 3:
+        assert (sequences[:, 1:-1:2] == 3).all()
+
+
+def test_seed_reproducible():
+    first = make_random_clifford_sequences(15, 5, seed=42)
+    second = make_random_clifford_sequences(
+        15, 5, seed=np.random.RandomState(42))
+    other = make_random_clifford_sequences(15, 5, seed=43)
+
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, other)
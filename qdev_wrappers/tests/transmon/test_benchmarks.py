@@ -0,0 +1,48 @@
+"""
+Smoke tests running each sequence benchmark at its smallest parameters.
+"""
+
+import itertools
+
+import pytest
+
+pytest.importorskip('chickpea')
+
+from benchmarks import sequencing
+from benchmarks.sequencing import _SequenceBenchmark
+
+benchmarks = [getattr(sequencing, name) for name in dir(sequencing)
+              if isinstance(getattr(sequencing, name), type) and
+              issubclass(getattr(sequencing, name), _SequenceBenchmark) and
+              getattr(sequencing, name) is not _SequenceBenchmark]
+
+
+def _smallest_params(benchmark):
+    params = getattr(benchmark, 'params', [])
+    if params and not isinstance(params[0], list):
+        params = [params]
+    return [min(p) for p in params]
+
+
+def test_benchmarks_found():
+    assert {b.__name__ for b in benchmarks} >= {'AllXY', 'Benchmarking',
+                                                'T1', 'Floquet'}
+
+
+def test_build_is_abstract():
+    with pytest.raises(TypeError):
+        _SequenceBenchmark()
+
+
+@pytest.mark.parametrize('benchmark', benchmarks,
+                         ids=[b.__name__ for b in benchmarks])
+def test_benchmark_builds(benchmark):
+    params = _smallest_params(benchmark)
+    instance = benchmark()
+    instance.setup(*params)
+    try:
+        sequence = instance.build(*params)
+        assert len(sequence) > 0
+        assert instance.track_generated_samples(*params) > 0
+    finally:
+        instance.teardown(*params)
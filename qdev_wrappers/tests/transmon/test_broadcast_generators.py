@@ -0,0 +1,143 @@
+"""
+Tests that the broadcast generators agree with their scalar counterparts.
+"""
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from qdev_wrappers.transmon import math_functions
+from qdev_wrappers.transmon.math_functions import (
+    broadcast_generators, clear_waveform_cache, stack_waveforms)
+
+SR = 1e9
+amps = np.linspace(-1, 1, 5)
+gaussian = {'sigma': 10e-9, 'sigma_cutoff': 4, 'amp': 0.5}
+tones = {'amp': 0.5, 'dur': 200e-9}
+
+# fixed and varied arguments of each generator
+cases = {
+    'gaussian_array': (gaussian, {'amp': amps}),
+    'cos_gaussian_array': (dict(gaussian, SSBfreq=50e6),
+                           {'SSBfreq': np.linspace(-100e6, 100e6, 5),
+                            'amp': amps}),
+    'cos_gaussian_multi_array': (dict(gaussian, SSBfreq_list=[20e6, 70e6]),
+                                 {'amp': amps}),
+    'sin_gaussian_array': (dict(gaussian, SSBfreq=50e6),
+                           {'SSBfreq': np.linspace(-100e6, 100e6, 5)}),
+    'sin_gaussian_multi_array': (dict(gaussian, SSBfreq_list=[20e6, 70e6]),
+                                 {'positive': [True, False] * 2}),
+    'ramp_array': ({'start': 0, 'stop': 1, 'dur': 100e-9},
+                   {'start': amps, 'stop': -amps}),
+    'flat_array': ({'amp': 0.5, 'dur': 100e-9}, {'amp': amps}),
+    'gaussian_derivative_array': (dict(gaussian),
+                                  {'amp': amps,
+                                   'positive': [True, False] * 2 + [True]}),
+    'cos_array': (dict(tones, freq=10e6),
+                  {'freq': np.linspace(0, 100e6, 5)}),
+    'cos_multi_array': (dict(tones, freq_list=[10e6, 30e6]), {'amp': amps}),
+    'sin_array': (dict(tones, freq=10e6),
+                  {'freq': np.linspace(0, 100e6, 5),
+                   'positive': [False] * 5}),
+    'sin_multi_array': (dict(tones, freq_list=[10e6, 30e6]), {'amp': amps}),
+}
+
+
+def _buffer(array):
+    while array.base is not None:
+        array = array.base
+    return array
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_waveform_cache()
+    yield
+    clear_waveform_cache()
+
+
+def _rows(gen_func, func_args, variable_args):
+    num = len(next(iter(variable_args.values())))
+    return [gen_func.__wrapped__(SR=SR, **dict(func_args, **{
+        name: values[i] for name, values in variable_args.items()}))
+        for i in range(num)]
+
+
+def test_all_generators_covered():
+    assert {f.__name__ for f in broadcast_generators} == set(cases)
+
+
+@pytest.mark.parametrize('name', sorted(cases))
+def test_broadcast_matches_scalar(name):
+    gen_func = getattr(math_functions, name)
+    func_args, variable_args = cases[name]
+    expected = _rows(gen_func, func_args, variable_args)
+
+    waves = broadcast_generators[gen_func](
+        SR=SR, **dict(func_args, **variable_args))
+
+    assert waves.shape == (len(expected), len(expected[0]))
+    for wave, row in zip(waves, expected):
+        np.testing.assert_allclose(wave, row, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('name', sorted(cases))
+def test_broadcast_out(name):
+    gen_func = getattr(math_functions, name)
+    func_args, variable_args = cases[name]
+    expected = broadcast_generators[gen_func](
+        SR=SR, **dict(func_args, **variable_args))
+    out = np.empty(expected.shape)
+
+    waves = broadcast_generators[gen_func](
+        SR=SR, out=out, **dict(func_args, **variable_args))
+
+    assert waves is out
+    np.testing.assert_array_equal(out, expected)
+
+
+@pytest.mark.parametrize('name', sorted(cases))
+def test_stack_waveforms(name):
+    gen_func = getattr(math_functions, name)
+    func_args, variable_args = cases[name]
+    expected = _rows(gen_func, func_args, variable_args)
+
+    waves = stack_waveforms(gen_func, func_args, variable_args, SR)
+
+    assert not waves.flags.writeable
+    for i, row in enumerate(expected):
+        np.testing.assert_allclose(waves[i], row, rtol=1e-12, atol=1e-12)
+        # the rows are served from the cache
+        cached = gen_func(SR=SR, **dict(func_args, **{
+            name: values[i] for name, values in variable_args.items()}))
+        assert np.shares_memory(cached, waves)
+
+def test_different_lengths_fall_back():
+    waves = stack_waveforms(math_functions.gaussian_array, {'amp': 1},
+                            {'sigma': [10e-9, 20e-9], 'sigma_cutoff': [4, 4]},
+                            SR)
+
+    assert [len(w) for w in waves] == [80, 160]
+
+
+def test_varied_durations():
+    durs = [20e-9, 10e-9, 20e-9, 30e-9]
+    waves = stack_waveforms(math_functions.flat_array, {'amp': 1},
+                            {'dur': durs}, SR)
+
+    assert [len(w) for w in waves] == [20, 10, 20, 30]
+    # the constant waveforms take no memory for their samples
+    assert all(w.strides == (0,) for w in waves)
+
+    expected = _rows(math_functions.cos_array, tones,
+                     {'dur': durs, 'freq': [10e6, 20e6, 30e6, 40e6]})
+    waves = stack_waveforms(math_functions.cos_array, tones,
+                            {'dur': durs, 'freq': [10e6, 20e6, 30e6, 40e6]},
+                            SR)
+    for wave, row in zip(waves, expected):
+        np.testing.assert_allclose(wave, row, rtol=1e-12, atol=1e-12)
+    # the waveforms are written to one buffer
+    assert len({id(_buffer(wave)) for wave in waves}) == 1
+    assert math_functions.cos_array(
+        SR=SR, **dict(tones, dur=durs[3], freq=40e6)) is waves[3]
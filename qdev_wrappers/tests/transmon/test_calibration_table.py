@@ -0,0 +1,74 @@
+"""
+Tests for the cached parsing of the calibration config.
+"""
+
+import os
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from qdev_wrappers.transmon import config_helpers
+from qdev_wrappers.transmon.config_helpers import (
+    get_calibration_array, get_calibration_table, get_calibration_val,
+    get_config_file, set_calibration_array, set_calibration_val)
+from qdev_wrappers.transmon.sequencing.profiling import dummy_calibration
+
+
+@pytest.fixture()
+def calibration():
+    with dummy_calibration(qubit_count=2, drag_coef=None):
+        config_helpers._calibration_table.clear()
+        yield
+    config_helpers._calibration_table.clear()
+
+
+def test_set_calibration_val_invalidates():
+    # the general config only supports setting single values
+    with dummy_calibration(qubit_count=1):
+        config_helpers._calibration_table.clear()
+        assert get_calibration_val('pi_pulse_amp') == 1
+
+        set_calibration_val('pi_pulse_amp', 0.8)
+
+        assert get_calibration_val('pi_pulse_amp') == 0.8
+        np.testing.assert_array_equal(
+            get_calibration_table()['pi_pulse_amp'], [0.8])
+    config_helpers._calibration_table.clear()
+
+
+def test_set_calibration_array_invalidates(calibration):
+    assert get_calibration_array('pi_pulse_amp') == [1, 1]
+
+    set_calibration_array('pi_pulse_amp', [0.7, 0.9])
+
+    assert get_calibration_array('pi_pulse_amp') == [0.7, 0.9]
+    assert get_calibration_val('pi_pulse_amp', qubit_index=1) == 0.9
+    np.testing.assert_array_equal(get_calibration_table()['pi_pulse_amp'],
+                                  [0.7, 0.9])
+
+
+def test_file_change_invalidates(calibration):
+    assert get_calibration_val('readout_amp', qubit_index=0) == 1
+    cfg_file = get_config_file('calib')
+    stat = os.stat(cfg_file)
+    with open(cfg_file) as f:
+        content = f.read()
+    with open(cfg_file, 'w') as f:
+        f.write(content.replace('readout_amp = 1 1', 'readout_amp = 0.25 1'))
+    # keep the modification time so that only the size changes
+    os.utime(cfg_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert get_calibration_val('readout_amp', qubit_index=0) == 0.25
+
+
+def test_table_none_to_nan(calibration):
+    table = get_calibration_table()
+
+    assert np.isnan(table['drag_coef']).all()
+    assert table['drag_coef'].shape == (2,)
+    assert get_calibration_val('drag_coef', qubit_index=0) is None
+    # the returned arrays are copies
+    table['pi_pulse_amp'][0] = 5
+    assert get_calibration_table()['pi_pulse_amp'][0] == 1
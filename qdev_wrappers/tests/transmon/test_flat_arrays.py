@@ -0,0 +1,158 @@
+"""
+Tests that the broadcast views returned by flat_array and flat_arrays
+behave as the dense arrays they replace wherever waveforms are used, and
+that constant waveforms stay compact until they are uploaded.
+"""
+
+from unittest import mock
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from chickpea import Element, Segment, Sequence, Waveform
+from qdev_wrappers.transmon import awg_helpers
+from qdev_wrappers.transmon.awg_helpers import (_waveform_hash,
+                                                send_changed_waveforms)
+from qdev_wrappers.transmon.math_functions import (
+    clear_waveform_cache, constant_waveform, dense_waveform, flat_array,
+    flat_arrays, gaussian_array)
+from qdev_wrappers.transmon.sequencing import load_sequence, save_sequence
+
+SR = 1e9
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_waveform_cache()
+    yield
+    clear_waveform_cache()
+
+
+def _ones(amp, dur):
+    return amp * np.ones(int(np.round(SR * dur)))
+
+
+@pytest.mark.parametrize('amp, dur', [(0, 100e-9), (0.5, 100e-9),
+                                      (-1, 33.4e-9), (1, 0)])
+def test_values_match_ones(amp, dur):
+    wave = flat_array(amp, dur, SR)
+
+    np.testing.assert_array_equal(wave, _ones(amp, dur))
+    assert wave.dtype == np.float64
+    assert not wave.flags.writeable
+    with pytest.raises(ValueError):
+        wave[...] = 2
+
+
+def test_flat_arrays_match_ones():
+    amps = np.linspace(-1, 1, 5)
+
+    waves = flat_arrays(amps, 100e-9, SR)
+
+    assert waves.shape == (5, 100)
+    for amp, wave in zip(amps, waves):
+        np.testing.assert_array_equal(wave, _ones(amp, 100e-9))
+    # rows can be copied into dense storage
+    np.testing.assert_array_equal(np.array(waves), waves)
+
+
+def test_concatenation():
+    pulse = gaussian_array(10e-9, 4, 1, SR)
+    wave = np.concatenate([flat_array(0, 100e-9, SR), pulse,
+                           flat_array(0.5, 50e-9, SR)])
+
+    np.testing.assert_array_equal(
+        wave, np.concatenate([_ones(0, 100e-9), pulse, _ones(0.5, 50e-9)]))
+    assert wave.flags.writeable
+    assert wave.flags.c_contiguous
+
+
+def test_waveform_wave():
+    waveform = Waveform(channel=1)
+    waveform.add_segment(Segment(name='wait', gen_func=flat_array,
+                                 func_args={'amp': 0, 'dur': 100e-9,
+                                            'SR': SR}))
+    waveform.add_segment(Segment(name='flat', gen_func=flat_array,
+                                 func_args={'amp': 0.5, 'dur': 50e-9,
+                                            'SR': SR}))
+    np.testing.assert_array_equal(
+        waveform.wave,
+        np.concatenate([_ones(0, 100e-9), _ones(0.5, 50e-9)]))
+
+    waveform.wave = flat_array(0.25, 80e-9, SR)
+
+    np.testing.assert_array_equal(waveform.wave, _ones(0.25, 80e-9))
+
+
+def test_hash_matches_dense():
+    markers = np.zeros(100)
+
+    assert (_waveform_hash(flat_array(0.5, 100e-9, SR), markers, markers) ==
+            _waveform_hash(_ones(0.5, 100e-9), markers, markers))
+
+
+def test_npz_save(tmpdir):
+    sequence = Sequence(name='flat')
+    for amp in [0, 0.5]:
+        waveform = Waveform(channel=1)
+        waveform.add_segment(Segment(name='flat', gen_func=flat_array,
+                                     func_args={'amp': amp, 'dur': 100e-9}))
+        element = Element(sample_rate=SR)
+        element.add_waveform(waveform)
+        sequence.add_element(element)
+    # a waveform with its wave set directly to a broadcast view
+    waveform = Waveform(channel=1)
+    waveform.wave = flat_array(1, 100e-9, SR)
+    element = Element(sample_rate=SR)
+    element.add_waveform(waveform)
+    sequence.add_element(element)
+    file_name = str(tmpdir.join('001_flat.npz'))
+
+    save_sequence(sequence, file_name)
+    waveforms = load_sequence(file_name).unwrap()[0][0][0]
+
+    for wave, amp in zip(waveforms, [0, 0.5, 1]):
+        np.testing.assert_array_equal(wave, _ones(amp, 100e-9))
+        # constant waveforms are stored and loaded compact
+        assert wave.strides == (0,)
+    with np.load(file_name) as f:
+        assert max(f[name].size for name in f.files
+                   if name.startswith('array_')) == 1
+
+
+def test_constant_waveform():
+    assert constant_waveform(flat_array(0.5, 100e-9, SR)) == (0.5, 100)
+    assert constant_waveform(_ones(0.5, 100e-9)) == (0.5, 100)
+    assert constant_waveform(gaussian_array(10e-9, 4, 1, SR)) is None
+    assert constant_waveform(np.zeros(0)) is None
+
+    dense = dense_waveform(flat_array(0.5, 100e-9, SR))
+    np.testing.assert_array_equal(dense, _ones(0.5, 100e-9))
+    assert dense.flags.c_contiguous and dense.strides == (8,)
+    np.testing.assert_array_equal(dense_waveform((0.5, 100)),
+                                  _ones(0.5, 100e-9))
+
+
+def test_upload_expands(tmpdir):
+    sequence = Sequence(name='flat')
+    waveform = Waveform(channel=1)
+    waveform.add_segment(Segment(name='flat', gen_func=flat_array,
+                                 func_args={'amp': 0.5, 'dur': 100e-9}))
+    element = Element(sample_rate=SR)
+    element.add_waveform(waveform)
+    sequence.add_element(element)
+    file_name = str(tmpdir.join('001_flat.npz'))
+    save_sequence(sequence, file_name)
+    awg = mock.MagicMock()
+    awg.name = 'test_flat_awg'
+
+    try:
+        send_changed_waveforms(awg, load_sequence(file_name))
+    finally:
+        awg_helpers._awg_upload_state.pop(awg.name, None)
+
+    wf, m1, m2, _ = awg.send_waveform_to_list.call_args[0]
+    np.testing.assert_array_equal(wf, _ones(0.5, 100e-9))
+    assert all(a.strides == (a.itemsize,) for a in (wf, m1, m2))
@@ -0,0 +1,84 @@
+"""
+Tests that rendering waveforms in parallel gives the same waveforms as
+generating them one by one.
+"""
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from qdev_wrappers.transmon.math_functions import (
+    clear_waveform_cache, cos_gaussian_array, flat_array, gaussian_array,
+    profile_generators, render_waveforms)
+from qdev_wrappers.transmon.sequencing import helpers
+
+from .test_varying_sequence import _template
+
+SR = 1e9
+calls = ([(flat_array, {'amp': amp, 'dur': 100e-9, 'SR': SR})
+          for amp in [0, 0.5, 1]] +
+         [(gaussian_array, {'sigma': 10e-9, 'sigma_cutoff': 4, 'amp': amp,
+                            'SR': SR}) for amp in [0.5, 1]] +
+         [(cos_gaussian_array, {'sigma': 10e-9, 'sigma_cutoff': 4,
+                                'SSBfreq': 50e6, 'amp': 1, 'SR': SR})])
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_waveform_cache()
+    yield
+    clear_waveform_cache()
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_parallel_equals_serial(processes):
+    serial = [gen_func.__wrapped__(**func_args)
+              for gen_func, func_args in calls]
+
+    with profile_generators() as stats:
+        # repeated calls are only generated once
+        assert render_waveforms(calls + calls[:2], max_workers=2,
+                                processes=processes) == len(calls)
+        rendered = [gen_func(**func_args) for gen_func, func_args in calls]
+
+    for wave, expected in zip(rendered, serial):
+        np.testing.assert_array_equal(wave, expected)
+    assert stats['flat_array']['generated'] == 3
+    assert stats['gaussian_array']['generated'] == 2
+    assert stats['cos_gaussian_array']['generated'] == 1
+    assert stats['flat_array']['samples'] == 300
+    assert sum(s['cached'] for s in stats.values()) == len(calls)
+
+
+def test_processes_keep_flat_waveforms_compact():
+    render_waveforms(calls[:1], max_workers=1, processes=True)
+
+    wave = flat_array(0, 100e-9, SR)
+    assert wave.strides == (0,)
+    assert not wave.flags.writeable
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_parallel_sequence_equals_serial(monkeypatch, processes):
+    vary_args = [(1, 1, 'amp'), (2, 1, 'SSBfreq')]
+    vary_settings = [(0, 1, 0.25), (-100e6, 100e6, 50e6)]
+    serial = helpers.make_varying_sequence(
+        _template(), vary_args, vary_settings, variable_name='amp',
+        readout_ch=2).unwrap()
+    clear_waveform_cache()
+
+    monkeypatch.setitem(helpers.render_settings, 'parallel', True)
+    monkeypatch.setitem(helpers.render_settings, 'processes', processes)
+    parallel = helpers.make_varying_sequence(
+        _template(), vary_args, vary_settings, variable_name='amp',
+        readout_ch=2).unwrap()
+
+    for parallel_seq, serial_seq in zip(parallel, serial):
+        for parallel_lists, serial_lists in zip(parallel_seq[:3],
+                                                serial_seq[:3]):
+            for parallel_ch, serial_ch in zip(parallel_lists, serial_lists):
+                for parallel_wave, serial_wave in zip(parallel_ch,
+                                                      serial_ch):
+                    np.testing.assert_array_equal(parallel_wave,
+                                                  serial_wave)
@@ -0,0 +1,141 @@
+"""
+Tests for saving sequences and loading them back.
+"""
+
+import pickle
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from chickpea import Element, Segment, Sequence, Waveform
+from qdev_wrappers.transmon.math_functions import (
+    clear_waveform_cache, flat_array, gaussian_array)
+from qdev_wrappers.transmon.sequencing import load_sequence, save_sequence
+
+SR = 1e9
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_waveform_cache()
+    yield
+    clear_waveform_cache()
+
+
+def _sequence(drive_func=gaussian_array):
+    sequence = Sequence(name='rabi', variable='amp', start=0.2, stop=0.6,
+                        step=0.2, variable_label='Amplitude')
+    sequence.labels = {'seq_type': 'rabi', 'pulse_mod': False}
+    for j, amp in enumerate([0.2, 0.4, 0.6]):
+        drive = Waveform(channel=1)
+        drive.add_segment(Segment(name='wait', gen_func=flat_array,
+                                  func_args={'amp': 0, 'dur': 100e-9}))
+        drive.add_segment(Segment(name='pulse', gen_func=drive_func,
+                                  func_args={'sigma': 10e-9,
+                                             'sigma_cutoff': 4,
+                                             'amp': np.float64(amp)}))
+        readout = Waveform(channel=4)
+        readout.add_segment(Segment(name='readout', gen_func=flat_array,
+                                    func_args={'amp': 1, 'dur': 180e-9}))
+        if j == 0:
+            readout.add_marker(2, 0, 10)
+        element = Element(sample_rate=SR)
+        element.add_waveform(drive)
+        element.add_waveform(readout)
+        sequence.add_element(element)
+    return sequence
+
+
+def _assert_same_unwrapped(loaded, sequence):
+    for loaded_seq, seq in zip(loaded.unwrap(), sequence.unwrap()):
+        assert len(loaded_seq) == len(seq)
+        for loaded_lists, lists in zip(loaded_seq[:3], seq[:3]):
+            for loaded_ch, ch in zip(loaded_lists, lists):
+                for loaded_array, array in zip(loaded_ch, ch):
+                    np.testing.assert_array_equal(loaded_array, array)
+        assert [list(v) for v in loaded_seq[3:]] == [list(v)
+                                                     for v in seq[3:]]
+
+
+def test_round_trip(tmpdir):
+    sequence = _sequence()
+    file_name = str(tmpdir.join('001_rabi.npz'))
+    save_sequence(sequence, file_name)
+
+    loaded = load_sequence(file_name)
+
+    assert isinstance(loaded, Sequence)
+    assert len(loaded) == len(sequence)
+    for a in ['name', 'variable', 'start', 'stop', 'step', 'variable_label',
+              'labels']:
+        assert getattr(loaded, a) == getattr(sequence, a)
+    _assert_same_unwrapped(loaded, sequence)
+    # the elements are rebuilt from the segment definitions
+    for i in range(len(sequence)):
+        for ch in [1, 4]:
+            segments = loaded[i][ch].segment_list
+            originals = sequence[i][ch].segment_list
+            assert [s.gen_func for s in segments] == [s.gen_func
+                                                      for s in originals]
+            assert [s.func_args for s in segments] == [s.func_args
+                                                       for s in originals]
+            np.testing.assert_array_equal(loaded[i][ch].wave,
+                                          sequence[i][ch].wave)
+
+
+def test_round_trip_unimportable_function(tmpdir):
+    def local_gaussian(**kwargs):
+        return gaussian_array.__wrapped__(**kwargs)
+
+    sequence = _sequence(local_gaussian)
+    file_name = str(tmpdir.join('001_rabi.npz'))
+    save_sequence(sequence, file_name)
+
+    loaded = load_sequence(file_name)
+
+    # only the rendered waveforms can be loaded
+    assert len(loaded) == len(sequence)
+    _assert_same_unwrapped(loaded, sequence)
+
+
+def test_round_trip_wave_set_directly(tmpdir):
+    sequence = _sequence()
+    waveform = Waveform(channel=1)
+    waveform.wave = np.linspace(0, 1, 200)
+    element = Element(sample_rate=SR)
+    element.add_waveform(waveform)
+    element.add_waveform(sequence[0][4].copy())
+    sequence.add_element(element)
+    file_name = str(tmpdir.join('001_rabi.npz'))
+    save_sequence(sequence, file_name)
+
+    loaded = load_sequence(file_name)
+
+    assert len(loaded) == len(sequence)
+    _assert_same_unwrapped(loaded, sequence)
+    # the elements can not be rebuilt without the segments of the wave
+    with pytest.raises(IndexError):
+        loaded[len(sequence) - 1]
+
+
+def test_save_existing_file(tmpdir):
+    file_name = str(tmpdir.join('001_rabi.npz'))
+    save_sequence(_sequence(), file_name)
+
+    with pytest.raises(Exception):
+        save_sequence(_sequence(), file_name)
+
+
+def test_load_pickled_sequence(tmpdir):
+    sequence = _sequence()
+    file_name = str(tmpdir.join('001_rabi.p'))
+    with open(file_name, 'wb') as f:
+        pickle.dump(sequence, f)
+
+    loaded = load_sequence(file_name)
+
+    assert loaded.name == sequence.name
+    assert loaded.labels == sequence.labels
+    _assert_same_unwrapped(loaded, sequence)
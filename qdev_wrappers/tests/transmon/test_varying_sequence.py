@@ -0,0 +1,157 @@
+"""
+Tests for building varying sequences from stacked waveforms.
+"""
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from chickpea import Element, Segment, Waveform
+from qdev_wrappers.transmon import math_functions
+from qdev_wrappers.transmon.math_functions import (
+    clear_waveform_cache, cos_gaussian_array, flat_array, gaussian_array,
+    profile_generators)
+from qdev_wrappers.transmon.sequencing import (make_time_varying_sequence,
+                                               make_varying_sequence)
+
+SR = 1e9
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_waveform_cache()
+    yield
+    clear_waveform_cache()
+
+
+def _template():
+    drive = Waveform(channel=1)
+    drive.add_segment(Segment(name='wait', gen_func=flat_array,
+                              func_args={'amp': 0, 'dur': 100e-9}))
+    drive.add_segment(Segment(name='pulse', gen_func=gaussian_array,
+                              func_args={'sigma': 10e-9, 'sigma_cutoff': 4,
+                                         'amp': 1}))
+    drive.add_segment(Segment(name='compensate', gen_func=flat_array,
+                              func_args={'amp': 0, 'dur': 100e-9}))
+    sideband = Waveform(channel=2)
+    sideband.add_segment(Segment(name='wait', gen_func=flat_array,
+                                 func_args={'amp': 0, 'dur': 100e-9}))
+    sideband.add_segment(Segment(name='pulse', gen_func=cos_gaussian_array,
+                                 func_args={'sigma': 10e-9, 'sigma_cutoff': 4,
+                                            'SSBfreq': 50e6, 'amp': 1}))
+    sideband.add_segment(Segment(name='compensate', gen_func=flat_array,
+                                 func_args={'amp': 0, 'dur': 100e-9}))
+    element = Element(sample_rate=SR)
+    element.add_waveform(drive)
+    element.add_waveform(sideband)
+    return element
+
+
+def _generate(segment):
+    # the undecorated generator bypasses the cache
+    func_args = dict(segment.func_args)
+    func_args.setdefault('SR', SR)
+    return segment.gen_func.__wrapped__(**func_args)
+
+
+def _loop_waveforms(vary_args_list, variable_arrays, total_time=None):
+    """
+    Waveforms of the elements of a varying sequence built one by one.
+    """
+    waveforms = []
+    for j in range(len(variable_arrays[0])):
+        element = _template()
+        for vary_args, values in zip(vary_args_list, variable_arrays):
+            element[vary_args[0]].segment_list[vary_args[1]].func_args[
+                vary_args[2]] = values[j]
+            if total_time is not None:
+                compensate = element[vary_args[0]].segment_list[vary_args[3]]
+                compensate.func_args['dur'] = 0
+                compensate.func_args['dur'] = (
+                    total_time - element[vary_args[0]].duration)
+        waveforms.append({ch: np.concatenate(
+            [_generate(s) for s in element[ch].segment_list])
+            for ch in (1, 2)})
+    return waveforms
+
+
+def _sequence_waveforms(sequence):
+    return [{ch: np.concatenate(
+        [s.gen_func(**dict(s.func_args, SR=SR))
+         for s in sequence[j][ch].segment_list]) for ch in (1, 2)}
+        for j in range(len(sequence))]
+
+
+def _assert_same(waveforms, expected):
+    assert len(waveforms) == len(expected)
+    for element, expected_element in zip(waveforms, expected):
+        for ch in (1, 2):
+            np.testing.assert_allclose(element[ch], expected_element[ch],
+                                       atol=1e-12)
+
+
+def test_varying_sequence_matches_loop():
+    vary_args_list = [(1, 1, 'amp'), (2, 1, 'amp')]
+    sequence = make_varying_sequence(
+        _template(), vary_args_list, [(0, 1, 0.1), (0, 1, 0.1)],
+        name='amp', variable_name='amp', readout_ch=2)
+
+    expected = _loop_waveforms(vary_args_list, [np.linspace(0, 1, 11)] * 2)
+    _assert_same(_sequence_waveforms(sequence), expected)
+
+
+def test_time_varying_sequence_matches_loop():
+    vary_args_list = [(1, 0, 'dur', 2), (2, 0, 'dur', 2)]
+    sequence = make_time_varying_sequence(
+        _template(), vary_args_list,
+        [(10e-9, 100e-9, 10e-9), (10e-9, 100e-9, 10e-9)], 500e-9,
+        name='wait', readout_ch=2)
+
+    expected = _loop_waveforms(vary_args_list,
+                               [np.linspace(10e-9, 100e-9, 10)] * 2,
+                               total_time=500e-9)
+    _assert_same(_sequence_waveforms(sequence), expected)
+
+
+def test_time_varying_sequence_is_stacked():
+    template = _template()
+    sequence = make_time_varying_sequence(
+        template, [(1, 0, 'dur', 2)], [(10e-9, 100e-9, 10e-9)], 500e-9,
+        name='wait', readout_ch=2)
+
+    with profile_generators() as stats:
+        waveforms = _sequence_waveforms(sequence)
+
+    # the varied waits and their compensations come from the stacked
+    # waveforms
+    assert stats['flat_array']['generated'] == 0
+    assert all(len(w[1]) == 500 for w in waveforms)
+    for j in range(len(sequence)):
+        # the segments which are not varied are shared with the template
+        assert sequence[j][1].segment_list[1] is template[1].segment_list[1]
+        assert sequence[j][2].segment_list == template[2].segment_list
+    assert sequence[0][2].marker_points
+    assert not template[2].marker_points
+
+
+def test_varied_waveforms_are_pinned(monkeypatch):
+    monkeypatch.setattr(math_functions, 'waveform_cache_size', 2)
+    sequence = make_varying_sequence(
+        _template(), [(1, 1, 'amp'), (2, 1, 'amp')],
+        [(0, 1, 0.1), (0, 1, 0.1)], name='amp', variable_name='amp',
+        readout_ch=2)
+
+    with profile_generators() as stats:
+        _sequence_waveforms(sequence)
+
+    # the varied pulses come from the stacked arrays, although the cache
+    # holds only two waveforms
+    assert stats['gaussian_array']['generated'] == 0
+    assert stats['cos_gaussian_array']['generated'] == 0
+    assert stats['gaussian_array']['cached'] == 11
+
+    # once the sequence is gone only the waveforms in the cache are left
+    del sequence
+    assert (set(math_functions._pinned_waveforms.keys()) <=
+            set(math_functions._waveform_cache))
@@ -0,0 +1,107 @@
+"""
+Tests for the cache of the waveform generators.
+"""
+
+import pytest
+import numpy as np
+
+pytest.importorskip('chickpea')
+
+from qdev_wrappers.transmon import math_functions
+from qdev_wrappers.transmon.math_functions import (
+    cached_waveform, clear_waveform_cache, cos_array, flat_array,
+    gaussian_array, profile_generators)
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_waveform_cache()
+    yield
+    clear_waveform_cache()
+
+
+def test_hit_and_miss():
+    with profile_generators() as stats:
+        first = gaussian_array(10e-9, 4, 1, 1e9)
+        second = gaussian_array(sigma=10e-9, sigma_cutoff=4, amp=1, SR=1e9)
+        third = gaussian_array(10e-9, 4, 0.5, 1e9)
+
+    assert second is first
+    assert third is not first
+    assert stats['gaussian_array']['generated'] == 2
+    assert stats['gaussian_array']['cached'] == 1
+    assert stats['gaussian_array']['samples'] == 2 * len(first)
+
+
+def test_key():
+    wave = cos_array(1e6, 1, 1e-6, 1e9)
+
+    # the same arguments, also given differently, and the default values
+    assert cos_array(1e6, 1, 1e-6, 1e9, True) is wave
+    assert cos_array(amp=1, freq=1e6, SR=1e9, dur=1e-6) is wave
+    # other arguments, sample rates and generators
+    assert cos_array(1e6, 1, 1e-6, 1e9, positive=False) is not wave
+    assert len(cos_array(1e6, 1, 1e-6, 2e9)) == 2 * len(wave)
+    assert math_functions.sin_array(1e6, 1, 1e-6, 1e9) is not wave
+
+
+def test_unhashable_arguments():
+    calls = []
+
+    @cached_waveform
+    def generator(amps, SR):
+        calls.append(amps)
+        return np.ones(len(amps))
+
+    # lists and arrays are part of the key by their values
+    assert generator([1, 2], 1e9) is generator([1, 2], 1e9)
+    assert generator(np.arange(2), 1e9) is generator(np.arange(2), 1e9)
+    # dictionaries can not be hashed and are not cached
+    assert generator({1: 2}, 1e9) is not generator({1: 2}, 1e9)
+    assert len(calls) == 4
+
+
+def test_read_only():
+    wave = gaussian_array(10e-9, 4, 1, 1e9)
+
+    assert not wave.flags.writeable
+    with pytest.raises(ValueError):
+        wave[0] = 1
+    # copies can be modified
+    copy = np.array(wave)
+    copy[0] = 1
+
+
+def test_eviction_by_count(monkeypatch):
+    monkeypatch.setattr(math_functions, 'waveform_cache_size', 2)
+    first = flat_array(0.1, 1e-6, 1e9)
+    second = flat_array(0.2, 1e-6, 1e9)
+
+    # using the first waveform makes the second the least recently used
+    assert flat_array(0.1, 1e-6, 1e9) is first
+    flat_array(0.3, 1e-6, 1e9)
+
+    assert flat_array(0.1, 1e-6, 1e9) is first
+    with profile_generators() as stats:
+        flat_array(0.2, 1e-6, 1e9)
+    assert stats['flat_array']['generated'] == 1
+
+
+def test_eviction_by_bytes(monkeypatch):
+    points = 1000
+    monkeypatch.setattr(math_functions, 'waveform_cache_bytes',
+                        int(2.5 * points * 8))
+    waves = [cos_array(1e6, amp, points / 1e9, 1e9)
+             for amp in (0.1, 0.2, 0.3)]
+
+    assert math_functions._waveform_cache_nbytes == 2 * points * 8
+    assert cos_array(1e6, 0.3, points / 1e9, 1e9) is waves[2]
+    assert cos_array(1e6, 0.2, points / 1e9, 1e9) is waves[1]
+    assert cos_array(1e6, 0.1, points / 1e9, 1e9) is not waves[0]
+
+    # broadcast flat waveforms only count their single value
+    flat_array(0.1, 1, 1e9)
+    assert math_functions._waveform_cache_nbytes <= 2 * points * 8 + 8
+
+    clear_waveform_cache()
+    assert math_functions._waveform_cache_nbytes == 0
@@ -1,9 +1,10 @@
 from . import check_sample_rate, make_save_send_load_awg_file, \
-    get_pulse_location, get_latest_counter
+    send_changed_waveforms, get_pulse_location, get_latest_counter
 from .sequencing import save_sequence
 
 
-def set_up_sequence(awg, alazar, acq_controllers, sequence, seq_mode='on'):
+def set_up_sequence(awg, alazar, acq_controllers, sequence, seq_mode='on',
+                    incremental=False):
     """
     Function which checks sample rate compatability between sequence and awg
     setting, uploads sequence to awg, sets the alazar instrument to the
@@ -16,6 +17,9 @@ def set_up_sequence(awg, alazar, acq_controllers, sequence, seq_mode='on'):
         acq_controllers list
         sequence for upload
         seq_mode (default 'on')
+        incremental (default False): if True only the waveforms and
+            elements which changed since the last upload are sent to the
+            awg (see send_changed_waveforms) and no .awg file is saved
     """
     check_sample_rate(awg)
     pulse_location = get_pulse_location()
@@ -29,8 +33,11 @@ def set_up_sequence(awg, alazar, acq_controllers, sequence, seq_mode='on'):
             num = 1
     name = '{0:03d}_{name}'.format(num, name=sequence.name)
     awg_file_name = pulse_location + name + '.awg'
-    seq_file_name = pulse_location + name + '.p'
-    make_save_send_load_awg_file(awg, sequence, awg_file_name)
+    seq_file_name = pulse_location + name + '.npz'
+    if incremental:
+        send_changed_waveforms(awg, sequence)
+    else:
+        make_save_send_load_awg_file(awg, sequence, awg_file_name)
     save_sequence(sequence, seq_file_name)
     awg.current_seq(num)
     alazar.seq_mode(seq_mode)
@@ -87,7 +94,7 @@ def set_up_sequence_multi_qubit(awg_list, alazar, acq_controllers, sequence,
     else:
         num = 1
     name = '{0:03d}_{name}'.format(num, name=sequence.name)
-    seq_file_name = pulse_location + name + '.p'
+    seq_file_name = pulse_location + name + '.npz'
     unwrapped_seq = sequence.unwrap()
     for i, awg in enumerate(awg_list):
         awg_file_name = pulse_location + name + '_' + awg.id_letter() + '.awg'
@@ -1,9 +1,12 @@
 import qcodes as qc
-import pickle
+import hashlib
+import numpy as np
 from os import listdir
 from qdev_wrappers.sweep_functions import _do_measurement, \
     _select_plottables
-from . import get_calibration_val, get_pulse_location
+from . import get_calibration_val, get_pulse_location, constant_waveform, \
+    dense_waveform
+from .sequencing import load_sequence
 
 
 # TODO: rount -> int/ciel
@@ -22,8 +25,8 @@ def get_current_seq(awg):
     seq_num = awg.current_seq()
     path = get_pulse_location()
     seq_file_name = next(f for f in listdir(
-        path) if (f[-1] == 'p' and str(seq_num) in f))
-    seq = pickle.load(open(path + seq_file_name, "rb"))
+        path) if (f.endswith(('.p', '.npz')) and str(seq_num) in f))
+    seq = load_sequence(path + seq_file_name)
     return seq
 
 
@@ -34,8 +37,8 @@ def get_current_seq_multi_qubit(awg_list):
                         '{}'.format(seq_nums))
     path = get_pulse_location()
     seq_file_name = next(f for f in listdir(
-        path) if (f[-1] == 'p' and str(seq_nums[0]) in f))
-    seq = pickle.load(open(path + seq_file_name, "rb"))
+        path) if (f.endswith(('.p', '.npz')) and str(seq_nums[0]) in f))
+    seq = load_sequence(path + seq_file_name)
     return seq
 
 
@@ -47,9 +50,114 @@ def make_save_send_load_awg_file(awg, sequence, file_name):
         awg instrument for upload
         unwrapped_sequence to be uploaded
     """
-    unwrapped_seq = sequence.unwrap()[0]
+    unwrapped_seq = list(sequence.unwrap()[0])
+    # constant waveforms and markers are only expanded for the upload
+    unwrapped_seq[:3] = [[[dense_waveform(wave) for wave in ch]
+                          for ch in arrays] for arrays in unwrapped_seq[:3]]
     awg.make_and_save_awg_file(*unwrapped_seq, filename=file_name)
     awg.make_send_and_load_awg_file(*unwrapped_seq)
+    # the awg file replaces the waveforms and sequence on the awg
+    _awg_upload_state.pop(awg.name, None)
+
+
+# waveforms and sequence elements uploaded by send_changed_waveforms, per awg
+_awg_upload_state = {}
+
+
+def _waveform_hash(wf, m1, m2):
+    content = hashlib.sha1()
+    for array in (wf, m1, m2):
+        constant = constant_waveform(array)
+        if constant is not None:
+            # the same for a dense array and a broadcast view of the samples
+            amp, npoints = constant
+            content.update('constant {}'.format(npoints).encode())
+            content.update(np.float64(amp).tobytes())
+            continue
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        content.update(str(array.shape).encode())
+        content.update(array.tobytes())
+    return content.hexdigest()
+
+
+def send_changed_waveforms(awg, sequence):
+    """
+    Uploads the sequence to the awg, only transferring the waveforms
+    which are not already in the waveform list of the awg and only
+    reassigning the sequence elements which changed since the last upload.
+    Waveforms are identified by a hash of their content and those no longer
+    used by the sequence are deleted from the waveform list. The first
+    upload to an awg, and the first after make_save_send_load_awg_file,
+    clears the waveform list, transfers all waveforms and sets the awg to
+    sequence mode.
+
+    Args:
+        awg instrument (AWG5014)
+        sequence to be uploaded
+
+    Returns:
+        number of waveforms transferred
+    """
+    unwrapped_seq = sequence.unwrap()[0]
+    waveforms, m1s, m2s, nreps, trig_waits, goto_states, jump_tos = \
+        unwrapped_seq[:7]
+    if len(unwrapped_seq) > 7 and unwrapped_seq[7] is not None:
+        channels = unwrapped_seq[7]
+    else:
+        channels = list(range(1, len(waveforms) + 1))
+    awg.stop()
+    state = _awg_upload_state.get(awg.name)
+    if state is None:
+        awg.delete_all_waveforms_from_list()
+        awg.run_mode('SEQ')
+        state = {'waveforms': {}, 'elements': []}
+        _awg_upload_state[awg.name] = state
+    sent = 0
+    elements = []
+    for el_i in range(len(nreps)):
+        wfm_names = []
+        for ch_i in range(len(channels)):
+            wf, m1, m2 = (waveforms[ch_i][el_i], m1s[ch_i][el_i],
+                          m2s[ch_i][el_i])
+            wfm_hash = _waveform_hash(wf, m1, m2)
+            if wfm_hash not in state['waveforms']:
+                wfm_name = 'wfm_' + wfm_hash[:16]
+                awg.send_waveform_to_list(dense_waveform(wf),
+                                          dense_waveform(m1),
+                                          dense_waveform(m2), wfm_name)
+                state['waveforms'][wfm_hash] = wfm_name
+                sent += 1
+            wfm_names.append(state['waveforms'][wfm_hash])
+        elements.append((tuple(wfm_names), nreps[el_i], trig_waits[el_i],
+                         goto_states[el_i], jump_tos[el_i]))
+    if len(elements) != len(state['elements']):
+        awg.sequence_length(len(elements))
+        state['elements'] = state['elements'][:len(elements)]
+    for el_i, element in enumerate(elements):
+        if el_i < len(state['elements']) and \
+                state['elements'][el_i] == element:
+            continue
+        wfm_names, nrep, trig_wait, goto_state, jump_to = element
+        el_no = el_i + 1
+        for channel, wfm_name in zip(channels, wfm_names):
+            awg.set_sqel_waveform(wfm_name, channel, el_no)
+        awg.set_sqel_loopcnt(nrep, el_no)
+        awg.set_sqel_trigger_wait(el_no, trig_wait)
+        awg.set_sqel_goto_state(el_no, int(goto_state != 0))
+        if goto_state:
+            awg.set_sqel_goto_target_index(el_no, goto_state)
+        if jump_to:
+            awg.set_sqel_event_jump_type(el_no, 'IND')
+            awg.set_sqel_event_jump_target_index(el_no, jump_to)
+        else:
+            awg.set_sqel_event_jump_type(el_no, 'OFF')
+    state['elements'] = elements
+    used = set(name for element in elements for name in element[0])
+    for wfm_hash, wfm_name in list(state['waveforms'].items()):
+        if wfm_name not in used:
+            awg.write('WLISt:WAVeform:DELete "{}"'.format(wfm_name))
+            del state['waveforms'][wfm_hash]
+    return sent
 
 
 def check_sample_rate(awg):
@@ -68,7 +176,7 @@ def check_sample_rate(awg):
 def check_seq_uploaded(awg, seq_type, dict_to_check,
                        start=None, stop=None, step=None):
     uploaded_seq = get_current_seq(awg)
-    if uploaded_seq.labels['seq_type'] is not seq_type:
+    if uploaded_seq.labels['seq_type'] != seq_type:
         return False
     for k in dict_to_check:
         if k not in uploaded_seq.labels:
@@ -6,7 +6,7 @@ import pickle
 # import copy
 # from os.path import sep
 import logging
-# import numpy as np
+import numpy as np
 from shutil import copyfile
 from . import get_qubit_count, get_config_file, get_current_qubit, \
     get_local_config_file, get_local_scripts_location
@@ -86,6 +86,71 @@ def get_allowed_keys(cfg_name: str, section=None):
         return d
 
 
+# parsed values of the calibration config in use, reloaded when the file in
+# use, its modification time or its size changes and cleared when a value
+# is set
+_calibration_table = {}
+
+
+def _load_calibration_table():
+    if 'calib_config' not in CURRENT_EXPERIMENT:
+        raise RuntimeError("calib_config not in CURRENT_EXPERIMENT")
+    cfg_file = get_config_file('calib')
+    stat = os.stat(cfg_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if (_calibration_table.get('file') != cfg_file or
+            _calibration_table.get('stamp') != stamp):
+        cfg = get_config('calib')
+        strings = {}
+        sections = {}
+        for s in cfg.sections():
+            for k, v in cfg.get(s).items():
+                strings[k] = v
+                sections.setdefault(k, []).append(s)
+        _calibration_table.clear()
+        _calibration_table.update(file=cfg_file, stamp=stamp,
+                                  strings=strings, sections=sections,
+                                  values={}, arrays={})
+    return _calibration_table
+
+
+def _get_calibration_values(key, table=None):
+    """
+    Parsed list of the values of key, parsed once per calibration table
+    """
+    table = table or _load_calibration_table()
+    try:
+        return table['values'][key]
+    except KeyError:
+        pass
+    sections = table['sections'].get(key, [])
+    if len(sections) > 1:
+        raise RuntimeError('multiple sections have same key name:'
+                           'sections {} have key {}'.format(sections, key))
+    elif len(sections) == 0:
+        raise RuntimeError('key "{}" not in config file'.format(key))
+    values = [_cast_to_float_or_None(st)
+              for st in table['strings'][key].split(" ")]
+    table['values'][key] = values
+    return values
+
+
+def get_calibration_table():
+    """
+    Returns:
+        dictionary from the keys of the calibration config in use to numpy
+        arrays of their values, one for each qubit if they are set per
+        qubit, with None values as nan
+    """
+    table = _load_calibration_table()
+    for k in table['strings']:
+        if k not in table['arrays']:
+            table['arrays'][k] = np.array(
+                [np.nan if v is None else v
+                 for v in _get_calibration_values(k, table)])
+    return {k: a.copy() for k, a in table['arrays'].items()}
+
+
 def _get_section_of_key(cfg, key):
     sections = []
     for s in cfg.sections():
@@ -130,6 +195,7 @@ def set_calibration_array(key, array):
     str_array = " ".join([str(a) for a in array])
     section = _get_section_of_key(cfg, key)
     cfg.set(section, key, str_array)
+    _calibration_table.clear()
 
 
 def set_calibration_val(key, qubit_value, qubit_index: int=None):
@@ -170,12 +236,11 @@ def set_calibration_val(key, qubit_value, qubit_index: int=None):
         log.info('changing general config file value for '
                  '"{}" to "{}"'.format(key, str_value))
     cfg.set(section, key, str_value)
+    _calibration_table.clear()
 
 
 def get_calibration_val(key, qubit_index=None):
-    cfg = get_config('calib')
-    section = _get_section_of_key(cfg, key)
-    values_array = cfg.get(section, key).split(" ")
+    values_array = _get_calibration_values(key)
     if len(values_array) == 1:
         if qubit_index is not None:
             log.info(
@@ -195,18 +260,16 @@ def get_calibration_val(key, qubit_index=None):
             raise IndexError(
                 'qubit_index {} out of range of values list, check '
                 'calib.config {} list length'.format(qubit_index, key))
-    return _cast_to_float_or_None(val)
+    return val
 
 
 def get_calibration_array(key):
-    cfg = get_config('calib')
-    section = _get_section_of_key(cfg, key)
-    values_array = cfg.get(section, key).split(" ")
+    values_array = _get_calibration_values(key)
     if len(values_array) == 1:
         qubit_count = get_qubit_count()
-        return [_cast_to_float_or_None(values_array[0])] * qubit_count
+        return values_array * qubit_count
     else:
-        return [_cast_to_float_or_None(v) for v in values_array]
+        return list(values_array)
 
 
 def _cast_to_float_or_None(val):
@@ -221,13 +284,9 @@ def _cast_to_float_or_None(val):
 
 
 def get_calibration_dict():
-    cfg = get_config('calib')
-    calib_dict = {}
-    for s in cfg.sections():
-        for k, v in cfg.get(s).items():
-            val_array = [_cast_to_float_or_None(st) for st in v.split(" ")]
-            calib_dict[k] = val_array
-    return calib_dict
+    table = _load_calibration_table()
+    return {k: list(_get_calibration_values(k, table))
+            for k in table['strings']}
 
 
 def print_pulse_settings():
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from qdev_wrappers.show_num import show_num
+from qdev_wrappers.show_num import show_num, load_num
 from functools import reduce
 import operator
 from dateutil import parser
@@ -24,7 +24,8 @@ def load(counter, plot=True, metadata=True, matplot=False):
         plot (QtPlot or Matplot): optional
     """
     useQT = not matplot
-    dataset, plots = show_num(counter, do_plot=plot, useQT=useQT)
+    datasets, plots = show_num(counter, do_plots=plot, useQT=useQT)
+    dataset = datasets[0]
     if metadata:
         _ = get_metadata(dataset, printout=True)
         _ = _get_data_duration(dataset)
@@ -51,7 +52,8 @@ def get_metadata(dataset, printout=True, specific_list=None):
     """
     missing_keys = []
     if isinstance(dataset, int):
-        dataset = show_num(dataset, do_plot=False)
+        # only the metadata is needed
+        dataset = load_num(dataset, array_ids=())
     snapshot = dataset.snapshot()
     meta_dict = defaultdict(dict)
     for instr, param in specific_list or get_metadata_list():
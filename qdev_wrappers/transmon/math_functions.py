@@ -1,7 +1,26 @@
 import numpy as np
+import functools
+import inspect
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from math import sqrt, factorial
+from threading import Lock
+from weakref import WeakValueDictionary
 from scipy import signal
 
+# maximum number of waveforms and of bytes kept by cached_waveform
+waveform_cache_size = 4096
+waveform_cache_bytes = 256 * 1024**2
+_waveform_cache = OrderedDict()
+_waveform_cache_nbytes = 0
+_waveform_cache_lock = Lock()
+# waveforms pinned by stack_waveforms, kept as long as they are referenced
+_pinned_waveforms = WeakValueDictionary()
+# statistics of the calls to the cached generators, see profile_generators
+_generator_stats = None
+
 
 def qubit_from_push(g, bare_res, pushed_res):
     """
@@ -140,6 +159,129 @@ def smooth_data_butter(data, fs, cutoff, order):
     return signal.filtfilt(b, a, data)
 
 
+def _hashable(value):
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _waveform_key(gen_func, bound):
+    return (gen_func,) + tuple((name, _hashable(value))
+                               for name, value in bound.arguments.items())
+
+
+def cached_waveform(gen_func):
+    """
+    Decorator which memoises a waveform generating function such as the
+    gen_func of a Segment. The waveforms are cached by the function and
+    its arguments, including the sample rate SR, and the same read only
+    array is returned for the same arguments, so that segments repeated
+    across the elements of a sequence are only generated once. The least
+    recently used waveforms are dropped once there are more than
+    waveform_cache_size or they take up more than waveform_cache_bytes.
+
+    The returned arrays are shared between all callers, copy them before
+    modifying them.
+    """
+    signature = inspect.signature(gen_func)
+
+    @functools.wraps(gen_func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = _waveform_key(gen_func, bound)
+        try:
+            hash(key)
+        except TypeError:
+            return _timed_call(gen_func, args, kwargs)
+        with _waveform_cache_lock:
+            wave = _waveform_cache.get(key)
+            if wave is not None:
+                _waveform_cache.move_to_end(key)
+            else:
+                wave = _pinned_waveforms.get(key)
+            if wave is not None:
+                if _generator_stats is not None:
+                    _generator_stats[gen_func.__name__]['cached'] += 1
+                return wave
+        wave = _timed_call(gen_func, args, kwargs)
+        _store_waveform(key, wave)
+        return wave
+    return wrapper
+
+
+def _timed_call(gen_func, args, kwargs):
+    if _generator_stats is None:
+        return gen_func(*args, **kwargs)
+    start = time.perf_counter()
+    wave = gen_func(*args, **kwargs)
+    _record_generated(gen_func.__name__, wave, time.perf_counter() - start)
+    return wave
+
+
+def _record_generated(name, wave, duration):
+    stats = _generator_stats[name]
+    stats['generated'] += 1
+    stats['time'] += duration
+    stats['samples'] += np.size(wave)
+
+
+@contextmanager
+def profile_generators():
+    """
+    Context manager recording the calls to the cached waveform generators
+    made within it. Yields a dictionary from generator names to the number
+    of waveforms generated, the time spent generating them, their total
+    number of samples and the number of calls answered from the cache.
+    """
+    global _generator_stats
+    previous = _generator_stats
+    _generator_stats = defaultdict(
+        lambda: {'generated': 0, 'time': 0., 'samples': 0, 'cached': 0})
+    try:
+        yield _generator_stats
+    finally:
+        _generator_stats = previous
+
+
+def _wave_nbytes(wave):
+    """
+    Bytes of memory held by wave, counting the samples of a broadcast
+    view only once.
+    """
+    return wave.itemsize * int(np.prod([n for n, stride in
+                                        zip(wave.shape, wave.strides)
+                                        if stride]))
+
+
+def _store_waveform(key, wave):
+    global _waveform_cache_nbytes
+    wave.flags.writeable = False
+    with _waveform_cache_lock:
+        previous = _waveform_cache.pop(key, None)
+        if previous is not None:
+            _waveform_cache_nbytes -= _wave_nbytes(previous)
+        _waveform_cache[key] = wave
+        _waveform_cache_nbytes += _wave_nbytes(wave)
+        # the waveform just stored is always kept
+        while len(_waveform_cache) > 1 and (
+                len(_waveform_cache) > waveform_cache_size or
+                _waveform_cache_nbytes > waveform_cache_bytes):
+            _, dropped = _waveform_cache.popitem(last=False)
+            _waveform_cache_nbytes -= _wave_nbytes(dropped)
+
+
+def clear_waveform_cache():
+    global _waveform_cache_nbytes
+    with _waveform_cache_lock:
+        _waveform_cache.clear()
+        _waveform_cache_nbytes = 0
+        _pinned_waveforms.clear()
+
+
+@cached_waveform
 def gaussian_array(sigma, sigma_cutoff, amp, SR, positive=True):
     """
     Function which makes a gaussian of length (2*sigma_cutoff)
@@ -156,6 +298,7 @@ def gaussian_array(sigma, sigma_cutoff, amp, SR, positive=True):
     return prefactor * np.exp(-(t / (2 * sigma))**2)
 
 
+@cached_waveform
 def cos_gaussian_array(sigma, sigma_cutoff, SSBfreq, amp, SR, positive=True):
     """
     Function which makes the I component of a single sideband with a gaussan
@@ -176,6 +319,7 @@ def cos_gaussian_array(sigma, sigma_cutoff, SSBfreq, amp, SR, positive=True):
     return y
 
 
+@cached_waveform
 def cos_gaussian_multi_array(sigma, sigma_cutoff, SSBfreq_list, amp, SR,
                              positive=True):
     points = int(np.round(SR * 2 * sigma_cutoff * sigma))
@@ -189,6 +333,7 @@ def cos_gaussian_multi_array(sigma, sigma_cutoff, SSBfreq_list, amp, SR,
     return y / len(SSBfreq_list)
 
 
+@cached_waveform
 def sin_gaussian_array(sigma, sigma_cutoff, SSBfreq, amp, SR, positive=True):
     """
     Function which makes the Q component of a single sideband with a gaussan
@@ -209,6 +354,7 @@ def sin_gaussian_array(sigma, sigma_cutoff, SSBfreq, amp, SR, positive=True):
     return y
 
 
+@cached_waveform
 def sin_gaussian_multi_array(sigma, sigma_cutoff, SSBfreq_list, amp, SR,
                              positive=True):
     points = int(np.round(SR * 2 * sigma_cutoff * sigma))
@@ -222,16 +368,50 @@ def sin_gaussian_multi_array(sigma, sigma_cutoff, SSBfreq_list, amp, SR,
     return y / len(SSBfreq_list)
 
 
+@cached_waveform
 def ramp_array(start, stop, dur, SR):
     points = int(np.round(SR * dur))
     return np.linspace(start, stop, points)
 
 
+@cached_waveform
 def flat_array(amp, dur, SR):
+    """
+    Constant waveform. It is returned as a read only broadcast view of
+    amp, so it only takes memory for the samples once it is combined with
+    other segments into a waveform.
+    """
     points = int(np.round(SR * dur))
-    return amp * np.ones(points)
+    return np.broadcast_to(np.float64(amp), (points,))
+
+
+def constant_waveform(wave):
+    """
+    (amp, npoints) of a waveform of npoints equal samples, such as the
+    broadcast views of flat_array, which are recognised without reading
+    their samples, or None if the samples differ. See dense_waveform.
+    """
+    wave = np.asarray(wave)
+    if wave.ndim != 1 or not len(wave):
+        return None
+    if wave.strides != (0,) and not np.all(wave == wave[0]):
+        return None
+    return wave[0], len(wave)
+
+
+def dense_waveform(wave):
+    """
+    Contiguous array of the samples of wave, which may be a broadcast view
+    or given as (amp, npoints), see constant_waveform. Waveforms are only
+    expanded with this when they are uploaded.
+    """
+    if isinstance(wave, tuple):
+        amp, npoints = wave
+        return np.full(npoints, amp, dtype=np.asarray(amp).dtype)
+    return np.ascontiguousarray(wave)
 
 
+@cached_waveform
 def gaussian_derivative_array(sigma, sigma_cutoff, amp, SR, positive=True):
     points = int(np.round(SR * 2 * sigma_cutoff * sigma))
     t = np.linspace(-1 * sigma_cutoff * sigma, sigma_cutoff * sigma,
@@ -240,6 +420,7 @@ def gaussian_derivative_array(sigma, sigma_cutoff, amp, SR, positive=True):
     return prefactor * t / sigma * np.exp(-(t / (2 * sigma))**2)
 
 
+@cached_waveform
 def cos_array(freq, amp, dur, SR, positive=True):
     points = int(np.round(SR * dur))
     t = np.linspace(0, dur, num=points)
@@ -248,6 +429,7 @@ def cos_array(freq, amp, dur, SR, positive=True):
     return prefactor * np.cos(angle)
 
 
+@cached_waveform
 def cos_multi_array(freq_list, amp, dur, SR, positive=True):
     points = int(np.round(SR * dur))
     t = np.linspace(0, dur, num=points)
@@ -259,6 +441,7 @@ def cos_multi_array(freq_list, amp, dur, SR, positive=True):
     return y / len(freq_list)
 
 
+@cached_waveform
 def sin_array(freq, amp, dur, SR, positive=True):
     points = int(np.round(SR * dur))
     t = np.linspace(0, dur, num=points)
@@ -267,6 +450,7 @@ def sin_array(freq, amp, dur, SR, positive=True):
     return prefactor * np.sin(angle)
 
 
+@cached_waveform
 def sin_multi_array(freq_list, amp, dur, SR, positive=True):
     points = int(np.round(SR * dur))
     t = np.linspace(0, dur, num=points)
@@ -276,3 +460,411 @@ def sin_multi_array(freq_list, amp, dur, SR, positive=True):
         angle = t * freq * 2 * np.pi
         y += prefactor * np.sin(angle)
     return y / len(freq_list)
+
+
+
+################################################################
+# Broadcast generators
+################################################################
+
+def _broadcast(*args):
+    """
+    Broadcasts the arguments of a broadcast generator against each other to
+    columns, one row for each waveform.
+    """
+    arrays = np.broadcast_arrays(*[np.atleast_1d(a) for a in args])
+    return [a.reshape(-1, 1) for a in arrays]
+
+
+def _points(dur, SR):
+    points = np.unique(np.round(SR * np.asarray(dur)).astype(int))
+    if len(points) != 1:
+        raise ValueError('Waveforms of different lengths can not be '
+                         'stacked: {}'.format(points))
+    return int(points[0])
+
+
+def _linspace(start, stop, points):
+    return np.linspace(start[:, 0], stop[:, 0], num=points, axis=-1)
+
+
+def _prefactor(amp, positive):
+    return np.where(positive, amp, -1 * amp)
+
+
+def _gaussian_time(sigma, sigma_cutoff, SR):
+    points = _points(2 * sigma_cutoff * sigma, SR)
+    return _linspace(-1 * sigma_cutoff * sigma, sigma_cutoff * sigma, points)
+
+
+def _tones(trig_func, freq_list, t, phase):
+    """
+    Mean of trig_func(2 pi freq t + phase) over the frequencies in
+    freq_list, for each row of t. If all rows share the same times and
+    frequencies the tones are computed once from a single outer product of
+    the frequencies and times.
+    """
+    freq_list = np.asarray(freq_list, dtype=float)
+    phase = np.asarray(phase, dtype=float)
+    if (freq_list.ndim == 1 and phase.ndim <= 1 and
+            np.all(t == t[:1])):
+        angle = 2 * np.pi * np.multiply.outer(freq_list, t[0])
+        return trig_func(angle + phase.reshape(-1, 1)).mean(axis=0)
+    angle = 2 * np.pi * freq_list[..., None] * t[:, None, :]
+    return trig_func(angle + phase[..., None]).mean(axis=-2)
+
+
+def gaussian_arrays(sigma, sigma_cutoff, amp, SR, positive=True, out=None):
+    """
+    Broadcast version of gaussian_array, the arguments can be arrays and
+    the waveforms are returned stacked in a 2D array, one row for each
+    value. The waveforms have to be of the same length, so sigma and
+    sigma_cutoff can only be varied together. If given the waveforms are
+    written to out, an array of the shape of the result.
+    """
+    sigma, sigma_cutoff, amp, positive = _broadcast(
+        sigma, sigma_cutoff, amp, positive)
+    t = _gaussian_time(sigma, sigma_cutoff, SR)
+    return np.multiply(_prefactor(amp, positive),
+                       np.exp(-(t / (2 * sigma))**2), out=out)
+
+
+def cos_gaussian_arrays(sigma, sigma_cutoff, SSBfreq, amp, SR,
+                        positive=True, phase=0, out=None):
+    """
+    Broadcast version of cos_gaussian_array with an additional phase of the
+    sideband
+    """
+    sigma, sigma_cutoff, SSBfreq, amp, positive, phase = _broadcast(
+        sigma, sigma_cutoff, SSBfreq, amp, positive, phase)
+    t = _gaussian_time(sigma, sigma_cutoff, SR)
+    envelope = _prefactor(amp, positive) * np.exp(-(t / (2 * sigma))**2)
+    return np.multiply(envelope, np.cos(2 * np.pi * SSBfreq * t + phase),
+                       out=out)
+
+
+def cos_gaussian_multi_arrays(sigma, sigma_cutoff, SSBfreq_list, amp, SR,
+                              positive=True, phase=0, out=None):
+    """
+    Broadcast version of cos_gaussian_multi_array. SSBfreq_list is a list
+    of frequencies used for all waveforms or a 2D array with a row of
+    frequencies for each waveform, phase can be given per frequency in the
+    same way.
+    """
+    sigma, sigma_cutoff, amp, positive = _broadcast(
+        sigma, sigma_cutoff, amp, positive)
+    t = _gaussian_time(sigma, sigma_cutoff, SR)
+    envelope = _prefactor(amp, positive) * np.exp(-(t / (2 * sigma))**2)
+    return np.multiply(envelope, -_tones(np.cos, SSBfreq_list, t, phase),
+                       out=out)
+
+
+def sin_gaussian_arrays(sigma, sigma_cutoff, SSBfreq, amp, SR,
+                        positive=True, phase=0, out=None):
+    """
+    Broadcast version of sin_gaussian_array with an additional phase of the
+    sideband
+    """
+    sigma, sigma_cutoff, SSBfreq, amp, positive, phase = _broadcast(
+        sigma, sigma_cutoff, SSBfreq, amp, positive, phase)
+    t = _gaussian_time(sigma, sigma_cutoff, SR)
+    envelope = _prefactor(amp, positive) * np.exp(-(t / (2 * sigma))**2)
+    return np.multiply(envelope, -np.sin(2 * np.pi * SSBfreq * t + phase),
+                       out=out)
+
+
+def sin_gaussian_multi_arrays(sigma, sigma_cutoff, SSBfreq_list, amp, SR,
+                              positive=True, phase=0, out=None):
+    """
+    Broadcast version of sin_gaussian_multi_array, see
+    cos_gaussian_multi_arrays
+    """
+    sigma, sigma_cutoff, amp, positive = _broadcast(
+        sigma, sigma_cutoff, amp, positive)
+    t = _gaussian_time(sigma, sigma_cutoff, SR)
+    envelope = _prefactor(amp, positive) * np.exp(-(t / (2 * sigma))**2)
+    return np.multiply(envelope, -_tones(np.sin, SSBfreq_list, t, phase),
+                       out=out)
+
+
+def ramp_arrays(start, stop, dur, SR, out=None):
+    """
+    Broadcast version of ramp_array
+    """
+    start, stop, dur = _broadcast(start, stop, dur)
+    ramp = _linspace(start, stop, _points(dur, SR))
+    if out is None:
+        return ramp
+    out[...] = ramp
+    return out
+
+
+def flat_arrays(amp, dur, SR, out=None):
+    """
+    Broadcast version of flat_array, without out the waveforms are a read
+    only broadcast view of amp
+    """
+    amp, dur = _broadcast(amp, dur)
+    shape = (len(amp), _points(dur, SR))
+    if out is None:
+        return np.broadcast_to(amp.astype(np.float64), shape)
+    out[...] = amp
+    return out
+
+
+def gaussian_derivative_arrays(sigma, sigma_cutoff, amp, SR, positive=True,
+                               out=None):
+    """
+    Broadcast version of gaussian_derivative_array
+    """
+    sigma, sigma_cutoff, amp, positive = _broadcast(
+        sigma, sigma_cutoff, amp, positive)
+    t = _gaussian_time(sigma, sigma_cutoff, SR)
+    return np.multiply(_prefactor(amp, positive) * t / sigma,
+                       np.exp(-(t / (2 * sigma))**2), out=out)
+
+
+def cos_arrays(freq, amp, dur, SR, positive=True, phase=0, out=None):
+    """
+    Broadcast version of cos_array with an additional phase
+    """
+    freq, amp, dur, positive, phase = _broadcast(
+        freq, amp, dur, positive, phase)
+    t = _linspace(np.zeros_like(dur), dur, _points(dur, SR))
+    return np.multiply(_prefactor(amp, positive),
+                       np.cos(t * freq * 2 * np.pi + phase), out=out)
+
+
+def cos_multi_arrays(freq_list, amp, dur, SR, positive=True, phase=0,
+                     out=None):
+    """
+    Broadcast version of cos_multi_array. freq_list is a list of
+    frequencies used for all waveforms or a 2D array with a row of
+    frequencies for each waveform, phase can be given per frequency in the
+    same way.
+    """
+    amp, dur, positive = _broadcast(amp, dur, positive)
+    t = _linspace(np.zeros_like(dur), dur, _points(dur, SR))
+    return np.multiply(_prefactor(amp, positive),
+                       _tones(np.cos, freq_list, t, phase), out=out)
+
+
+def sin_arrays(freq, amp, dur, SR, positive=True, phase=0, out=None):
+    """
+    Broadcast version of sin_array with an additional phase
+    """
+    freq, amp, dur, positive, phase = _broadcast(
+        freq, amp, dur, positive, phase)
+    t = _linspace(np.zeros_like(dur), dur, _points(dur, SR))
+    return np.multiply(_prefactor(amp, positive),
+                       np.sin(t * freq * 2 * np.pi + phase), out=out)
+
+
+def sin_multi_arrays(freq_list, amp, dur, SR, positive=True, phase=0,
+                     out=None):
+    """
+    Broadcast version of sin_multi_array, see cos_multi_arrays
+    """
+    amp, dur, positive = _broadcast(amp, dur, positive)
+    t = _linspace(np.zeros_like(dur), dur, _points(dur, SR))
+    return np.multiply(_prefactor(amp, positive),
+                       _tones(np.sin, freq_list, t, phase), out=out)
+
+
+# broadcast versions of the generators used by stack_waveforms
+broadcast_generators = {
+    gaussian_array: gaussian_arrays,
+    cos_gaussian_array: cos_gaussian_arrays,
+    cos_gaussian_multi_array: cos_gaussian_multi_arrays,
+    sin_gaussian_array: sin_gaussian_arrays,
+    sin_gaussian_multi_array: sin_gaussian_multi_arrays,
+    ramp_array: ramp_arrays,
+    flat_array: flat_arrays,
+    gaussian_derivative_array: gaussian_derivative_arrays,
+    cos_array: cos_arrays,
+    cos_multi_array: cos_multi_arrays,
+    sin_array: sin_arrays,
+    sin_multi_array: sin_multi_arrays,
+}
+
+
+def cache_waveform(gen_func, wave, signature=None, pin=False,
+                   **func_args):
+    """
+    Stores wave in the cache of gen_func, a function decorated with
+    cached_waveform, as the waveform for func_args. If pin the waveform
+    is also returned from the cache after it has been dropped, as long as
+    wave is referenced elsewhere.
+    """
+    signature = signature or inspect.signature(gen_func)
+    bound = signature.bind(**func_args)
+    bound.apply_defaults()
+    key = _waveform_key(gen_func.__wrapped__, bound)
+    try:
+        hash(key)
+    except TypeError:
+        return
+    _store_waveform(key, wave)
+    if pin:
+        with _waveform_cache_lock:
+            _pinned_waveforms[key] = wave
+
+
+def stack_waveforms(gen_func, func_args, variable_args, SR, pinned=None):
+    """
+    Generates the waveforms of a segment for a number of values of some of
+    its arguments at once, using the broadcast version of gen_func from
+    broadcast_generators if there is one. The waveforms are also stored in
+    the waveform cache so that rendering a segment with the same arguments
+    returns the corresponding row.
+
+    Args:
+        gen_func: generating function of the segment
+        func_args (dict): the fixed arguments of the segment
+        variable_args (dict): the varied arguments of the segment, with
+            arrays of equal length of their values
+        SR: sample rate
+        pinned (list, optional): if given the waveforms stored in the cache
+            are appended to it and are returned from the cache as long as
+            the list is referenced, however many other waveforms are
+            cached in the meantime
+
+    Returns:
+        2D array with one row for each value, or a list of waveforms if
+        they are of different length
+    """
+    args = dict(func_args, SR=SR)
+    num = len(next(iter(variable_args.values())))
+    broadcast = broadcast_generators.get(gen_func)
+    waves = None
+    if broadcast is not None:
+        try:
+            waves = broadcast(**dict(args, **variable_args))
+        except ValueError:
+            if 'dur' in variable_args:
+                waves = _ragged_waveforms(broadcast, args, variable_args,
+                                          num)
+    if waves is None:
+        waves = [np.asarray(gen_func(**dict(args, **{
+            name: values[i] for name, values in variable_args.items()})))
+            for i in range(num)]
+        if len(set(len(w) for w in waves)) == 1:
+            waves = np.stack(waves)
+    if isinstance(waves, np.ndarray):
+        waves.flags.writeable = False
+    if hasattr(gen_func, '__wrapped__'):
+        signature = inspect.signature(gen_func)
+        for i in range(num):
+            wave = waves[i]
+            cache_waveform(gen_func, wave, signature, pin=pinned is not None,
+                           **dict(args, **{name: values[i] for name, values
+                                           in variable_args.items()}))
+            if pinned is not None:
+                pinned.append(wave)
+    return waves
+
+
+def _ragged_waveforms(broadcast, args, variable_args, num):
+    """
+    Waveforms of a broadcast generator for varied durations, which differ
+    in length. Constant waveforms are broadcast views of their amplitude,
+    the others are written to one buffer with a call of broadcast for each
+    length. Returns a list of the waveforms.
+    """
+    points = np.round(args['SR'] * np.broadcast_to(
+        variable_args['dur'], (num,))).astype(int)
+    if broadcast is flat_arrays:
+        amps = np.broadcast_to(np.asarray(
+            variable_args.get('amp', args.get('amp')), dtype=np.float64),
+            (num,))
+        return [np.broadcast_to(amp, (n,)) for amp, n in zip(amps, points)]
+    buffer = np.empty(points.sum())
+    waves = [None] * num
+    offset = 0
+    for length in np.unique(points):
+        rows = np.flatnonzero(points == length)
+        block = buffer[offset:offset + len(rows) * length].reshape(
+            len(rows), length)
+        broadcast(**dict(args, **{name: np.broadcast_to(values, (num,))[rows]
+                                  for name, values in variable_args.items()}),
+                  out=block)
+        for row, j in enumerate(rows):
+            waves[j] = block[row]
+        offset += block.size
+    return waves
+
+
+def _generate(gen_func, func_args, compact=False):
+    """
+    Generates a waveform for render_waveforms, returning it with the time
+    taken. With compact broadcast views, such as those of flat_array, are
+    returned as their distinct samples and shape so that they are not
+    pickled as dense arrays, see _expand.
+    """
+    start = time.perf_counter()
+    wave = gen_func(**func_args)
+    duration = time.perf_counter() - start
+    if compact and isinstance(wave, np.ndarray) and 0 in wave.strides:
+        samples = wave[tuple(slice(None, 1) if stride == 0 else slice(None)
+                             for stride in wave.strides)]
+        wave = (np.ascontiguousarray(samples), wave.shape)
+    return wave, duration
+
+
+def _expand(wave):
+    if isinstance(wave, tuple):
+        samples, shape = wave
+        return np.broadcast_to(samples, shape)
+    return wave
+
+
+def render_waveforms(calls, max_workers=None, processes=False):
+    """
+    Generates the waveforms of a number of calls to cached waveform
+    generators concurrently and stores them in the waveform cache. Calls
+    which are already cached or repeated are only generated once. As the
+    waveforms are stored by their arguments the result does not depend on
+    the order in which they are generated. The waveforms generated are
+    recorded by profile_generators as when generated one by one.
+
+    Args:
+        calls: iterable of (gen_func, func_args) with gen_func decorated
+            with cached_waveform and func_args including SR
+        max_workers (default None): number of threads or processes, None
+            for the number of cores
+        processes (default False): generate the waveforms in a process
+            pool instead of a thread pool
+
+    Returns:
+        number of waveforms generated
+    """
+    pending = OrderedDict()
+    for gen_func, func_args in calls:
+        bound = inspect.signature(gen_func).bind(**func_args)
+        bound.apply_defaults()
+        key = _waveform_key(gen_func.__wrapped__, bound)
+        try:
+            hash(key)
+        except TypeError:
+            continue
+        with _waveform_cache_lock:
+            if key in _waveform_cache:
+                continue
+        pending.setdefault(key, (gen_func, func_args))
+    if not pending:
+        return 0
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers) as pool:
+        # generate with the undecorated functions in threads, processes
+        # need the decorated functions which can be pickled
+        results = pool.map(_generate, *zip(*[
+            (gen_func if processes else gen_func.__wrapped__, func_args,
+             processes)
+            for gen_func, func_args in pending.values()]))
+        for (gen_func, _), key, (wave, duration) in zip(
+                pending.values(), pending, results):
+            wave = _expand(wave)
+            if _generator_stats is not None:
+                _record_generated(gen_func.__name__, wave, duration)
+            _store_waveform(key, wave)
+    return len(pending)
@@ -10,3 +10,4 @@ from .allxy import *
 from .benchmarking import *
 from .floquet import *
 from .majorana import *
+from .profiling import *
@@ -1,3 +1,4 @@
+import numpy as np
 from . import make_readout_wf, get_calibration_val, \
     make_time_varying_sequence, make_varying_sequence, \
     cos_array, sin_array, flat_array, gaussian_array, cos_gaussian_array, \
@@ -45,10 +46,11 @@ def make_calib_SSB_single_sequence(freq, amp=1, dur=None, channels=[1, 2]):
     element = Element(sample_rate=sr)
     waveform_i = Waveform(channel=channels[0])
     waveform_q = Waveform(channel=channels[1])
-    waveform_i.wave = cos_array(
-        freq, amp, dur, sr)
-    waveform_q.wave = sin_array(
-        freq, amp, dur, sr)
+    # the cached arrays are read only, the waveforms get their own copies
+    waveform_i.wave = np.array(cos_array(
+        freq, amp, dur, sr))
+    waveform_q.wave = np.array(sin_array(
+        freq, amp, dur, sr))
     element.add_waveform(waveform_i)
     element.add_waveform(waveform_q)
     seq.add_element(element)
@@ -81,17 +81,98 @@ def mat_to_gates(mat):
     raise Exception('Could not find inversion for mat {}'.format(mat))
 
 
+def _phase_free_key(mat):
+    """
+    Key of a unitary which is the same for all matrices equal up to a
+    global phase
+    """
+    flat = np.asarray(mat).flatten()
+    first = flat[np.argmax(np.abs(flat) > 1e-6)]
+    return tuple(np.round(flat * abs(first) / first, 6))
+
+
+def _make_clifford_tables():
+    mats = [np.asarray(gates_to_mat(rot)) for rot in clifford_rotations]
+    index = {_phase_free_key(m): i for i, m in enumerate(mats)}
+    table = np.array([[index[_phase_free_key(a @ b)] for b in mats]
+                      for a in mats], dtype=np.int8)
+    inverse = np.argmax(table == 0, axis=0).astype(np.int8)
+    return index, table, inverse
+
+
+# clifford_table[i, j] is the index of the clifford applying
+# clifford_rotations[j] followed by clifford_rotations[i] and
+# clifford_inverse[i] the index of the inverse of clifford_rotations[i]
+_clifford_index, clifford_table, clifford_inverse = _make_clifford_tables()
+
+
+def gates_to_clifford(gate_list):
+    """
+    Index in clifford_rotations of the clifford performed by gate_list
+    """
+    return _clifford_index[_phase_free_key(gates_to_mat(gate_list))]
+
+
+def make_random_clifford_sequences(length, num_of_sequences,
+                                   interleaved=None, seed=None):
+    """
+    Generates random sequences of cliffords for randomised benchmarking,
+    each followed by the clifford inverting it.
+
+    Args:
+        length (int): number of random cliffords in each sequence
+        num_of_sequences (int)
+        interleaved (int or list) (default None): clifford index or gate
+            list to interleave after each random clifford for interleaved
+            randomised benchmarking
+        seed (int or numpy.random.RandomState) (default None): seed for
+            reproducible sequences
+
+    Returns:
+        array of shape (num_of_sequences, number of cliffords) of indices
+        in clifford_rotations in the order they are applied
+    """
+    if not isinstance(seed, np.random.RandomState):
+        seed = np.random.RandomState(seed)
+    cliffords = seed.randint(0, 24, size=(num_of_sequences, length),
+                             dtype=np.int8)
+    if interleaved is not None:
+        if not isinstance(interleaved, (int, np.integer)):
+            interleaved = gates_to_clifford(interleaved)
+        interleaved_cliffords = np.empty((num_of_sequences, 2 * length),
+                                         dtype=np.int8)
+        interleaved_cliffords[:, ::2] = cliffords
+        interleaved_cliffords[:, 1::2] = interleaved
+        cliffords = interleaved_cliffords
+    total = np.zeros(num_of_sequences, dtype=np.int8)
+    for clifford in cliffords.T:
+        total = clifford_table[clifford, total]
+    return np.concatenate([cliffords, clifford_inverse[total][:, None]],
+                          axis=1)
+
+
+def cliffords_to_gates(cliffords):
+    """
+    Gate list performing the cliffords with the given indices in
+    clifford_rotations
+    """
+    gate_list = []
+    for i in cliffords:
+        gate_list.extend(clifford_rotations[i])
+    return gate_list
+
+
 def make_benchmarking_sequence(
         length, num_of_sequences, SSBfreq=None, drag=False,
-        channels=[1, 2, 3, 4], spacing=None, gaussian=True):
-    gate_lists = []
-    for n in range(num_of_sequences):
-        gate_list = make_random_gate_list(length)
-        mat = gates_to_mat(gate_list)
-        inverting_mat = invert_mat(mat)
-        inverting_gates = mat_to_gates(inverting_mat)
-        gate_list.extend(inverting_gates)
-        gate_lists.append(gate_list)
+        channels=[1, 2, 3, 4], spacing=None, gaussian=True,
+        interleaved=None, seed=None):
+    """
+    Randomised benchmarking sequence, see make_random_clifford_sequences
+    for interleaved and seed
+    """
+    clifford_sequences = make_random_clifford_sequences(
+        length, num_of_sequences, interleaved=interleaved, seed=seed)
+    gate_lists = [cliffords_to_gates(c) for c in clifford_sequences]
     seq = make_sequence_from_gate_lists(
         gate_lists, SSBfreq=SSBfreq, drag=drag, gaussian=gaussian,
         variable_label=None, spacing=spacing,
@@ -300,8 +300,8 @@ def make_floquet_dur_sequence(
                         get_calibration_val('sample_rate'))
     if qubit_num == 1:
         floquet_sequence = make_time_varying_sequence(
-            floquet_element, channels[0], 1, 'dur', start, stop, step,
-            0, get_calibration_val('cycle_time'),
+            floquet_element, [(channels[0], 1, 'dur', 0)],
+            [(start, stop, step)], get_calibration_val('cycle_time'),
             name='floquet_seq',
             variable_name='floquet_drive_dur', variable_unit='s',
             readout_ch=r_ch, marker_points=marker_points)
@@ -1,10 +1,15 @@
 import numpy as np
+import copy
 import pickle
 import os
+import json
+import importlib
+import hashlib
+from collections import OrderedDict
 from . import get_calibration_dict, get_allowed_keys, gaussian_array, \
     gaussian_derivative_array, flat_array, cos_gaussian_array, \
     sin_gaussian_array, cos_array, sin_array, get_calibration_val, \
-    get_current_qubit
+    get_current_qubit, stack_waveforms, render_waveforms, constant_waveform
 
 from . import Segment, Waveform, Element, Sequence
 
@@ -15,18 +20,371 @@ from . import Segment, Waveform, Element, Sequence
 # TODO: test make_sequence_from_gate_lists
 
 
+_sequence_attributes = ['name', 'variable', 'variable_label', 'variable_unit',
+                        'start', 'stop', 'step', 'labels']
+_unwrapped_fields = ['nreps', 'trig_waits', 'goto_states', 'jump_tos']
+
+
+def _json_default(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def _function_path(func):
+    """
+    Path 'module:qualname' under which func can be imported, or None for
+    functions which can not be, such as lambdas and local functions
+    """
+    module = getattr(func, '__module__', None)
+    qualname = getattr(func, '__qualname__', None)
+    if module is None or qualname is None or '<' in qualname:
+        return None
+    return '{}:{}'.format(module, qualname)
+
+
+def _import_function(path):
+    module, qualname = path.split(':')
+    func = importlib.import_module(module)
+    for name in qualname.split('.'):
+        func = getattr(func, name)
+    return func
+
+
+def _element_definitions(sequence):
+    """
+    Segment definitions of the elements of the sequence, a list with for
+    each element its sample rate and for each channel the name, generating
+    function path and arguments of each segment. None if a generating
+    function can not be imported by its path or a waveform has no segments,
+    as when its wave was set directly.
+    """
+    definitions = []
+    for i in range(len(sequence)):
+        element = sequence[i]
+        channels = {}
+        for ch in element.keys():
+            if not element[ch].segment_list:
+                return None
+            segments = []
+            for segment in element[ch].segment_list:
+                path = _function_path(segment.gen_func)
+                if path is None:
+                    return None
+                segments.append({'name': segment.name, 'gen_func': path,
+                                 'func_args': dict(segment.func_args)})
+            channels[str(ch)] = segments
+        definitions.append({'sample_rate': element.sample_rate,
+                            'channels': channels})
+    return definitions
+
+
 def save_sequence(sequence, file_name):
+    """
+    Saves the sequence as an .npz file with the attributes of the sequence,
+    the segment definitions of its elements and the waveforms and markers
+    of the unwrapped sequence. Identical arrays are only stored once and
+    of arrays of equal samples, such as most markers, only one sample and
+    their length, see constant_waveform. Load it with load_sequence.
+    """
     if os.path.exists(file_name):
         raise Exception('File already exists at this location with this '
                         'name: {}'.format(file_name))
-    else:
-        pickle.dump(sequence, open(file_name, 'wb'))
+    arrays = {}
+    array_keys = {}
+    constants = {}
+
+    def array_index(array):
+        constant = constant_waveform(array)
+        if constant is None:
+            array = np.ascontiguousarray(array)
+            shape = array.shape
+        else:
+            array = np.ascontiguousarray(np.asarray(array)[:1])
+            shape = ('constant', constant[1])
+        key = (array.dtype.str, shape,
+               hashlib.sha1(array.tobytes()).digest())
+        if key not in array_keys:
+            array_keys[key] = len(array_keys)
+            arrays['array_{}'.format(array_keys[key])] = array
+            if constant is not None:
+                constants[str(array_keys[key])] = constant[1]
+        return array_keys[key]
+
+    unwrapped = sequence.unwrap()
+    layout = {'attributes': {a: getattr(sequence, a, None)
+                             for a in _sequence_attributes},
+              'length': len(sequence),
+              'elements': _element_definitions(sequence),
+              'channels': [],
+              'constants': constants}
+    variable_array = getattr(sequence, 'variable_array', None)
+    if variable_array is not None:
+        arrays['variable_array'] = np.asarray(variable_array)
+    for i, unwrapped_seq in enumerate(unwrapped):
+        waveforms, m1s, m2s = unwrapped_seq[:3]
+        for name, lists in zip(['waveforms', 'm1s', 'm2s'],
+                               [waveforms, m1s, m2s]):
+            arrays['awg{}_{}'.format(i, name)] = np.array(
+                [[array_index(a) for a in ch] for ch in lists],
+                dtype=np.int64).reshape(len(lists), -1)
+        for name, values in zip(_unwrapped_fields, unwrapped_seq[3:7]):
+            arrays['awg{}_{}'.format(i, name)] = np.asarray(values)
+        channels = unwrapped_seq[7] if len(unwrapped_seq) > 7 else None
+        layout['channels'].append(channels)
+    arrays['__layout__'] = np.array(json.dumps(layout,
+                                               default=_json_default))
+    with open(file_name, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+class SavedSequence(Sequence):
+    """
+    Sequence saved with save_sequence. It has the attributes of the saved
+    sequence and its elements, rebuilt from the saved segment definitions
+    when all their generating functions could be saved. Its unwrap returns
+    the saved unwrapped sequence, with the waveforms and markers read from
+    the file when it is first unwrapped and the constant ones as read only
+    broadcast views.
+    """
+
+    def __init__(self, file_name):
+        with np.load(file_name) as f:
+            layout = json.loads(str(f['__layout__']))
+            tables = {k: f[k] for k in f.files if k.startswith('awg')}
+            variable_array = (f['variable_array']
+                              if 'variable_array' in f.files else None)
+        attributes = dict(layout['attributes'])
+        labels = attributes.pop('labels', None)
+        super().__init__(**{k: attributes.get(k) for k in [
+            'name', 'variable', 'start', 'stop', 'step', 'variable_label',
+            'variable_unit']})
+        self.labels = labels or {}
+        if variable_array is not None:
+            self.variable_array = variable_array
+        for definition in layout.get('elements') or []:
+            self.add_element(self._make_element(definition))
+        self.file_name = file_name
+        self._layout = layout
+        self._tables = tables
+        self._arrays = None
+
+    @staticmethod
+    def _make_element(definition):
+        element = Element(sample_rate=definition['sample_rate'])
+        for ch, segments in definition['channels'].items():
+            segment_list = [
+                Segment(name=s['name'], gen_func=_import_function(
+                    s['gen_func']), func_args=s['func_args'])
+                for s in segments]
+            element.add_waveform(Waveform(channel=int(ch),
+                                          segment_list=segment_list))
+        return element
+
+    def __len__(self):
+        return self._layout['length']
+
+    def _load_arrays(self):
+        indices = set()
+        for name in ['waveforms', 'm1s', 'm2s']:
+            for i in range(len(self._layout['channels'])):
+                indices.update(
+                    self._tables['awg{}_{}'.format(i, name)].ravel().tolist())
+        with np.load(self.file_name) as f:
+            arrays = {j: f['array_{}'.format(j)] for j in indices}
+        # constant arrays stay compact until they are uploaded
+        for j, npoints in self._layout.get('constants', {}).items():
+            if int(j) in arrays:
+                arrays[int(j)] = np.broadcast_to(arrays[int(j)], (npoints,))
+        return arrays
+
+    def unwrap(self):
+        if self._arrays is None:
+            self._arrays = self._load_arrays()
+        unwrapped = []
+        for i, channels in enumerate(self._layout['channels']):
+            unwrapped_seq = [
+                [[self._arrays[j] for j in ch]
+                 for ch in self._tables['awg{}_{}'.format(i, name)]]
+                for name in ['waveforms', 'm1s', 'm2s']]
+            unwrapped_seq.extend(
+                self._tables['awg{}_{}'.format(i, name)].tolist()
+                for name in _unwrapped_fields)
+            if channels is not None:
+                unwrapped_seq.append(channels)
+            unwrapped.append(tuple(unwrapped_seq))
+        return unwrapped
+
+
+def load_sequence(file_name):
+    """
+    Loads a sequence saved with save_sequence as a SavedSequence, or a
+    pickled sequence saved by earlier versions
+    """
+    if file_name.endswith('.npz'):
+        return SavedSequence(file_name)
+    with open(file_name, 'rb') as f:
+        return pickle.load(f)
 
 
 ####################################################################
 # Sequence building functions (vary param over sequence)
 ####################################################################
 
+# concurrent generation of the waveforms of the elements built by the
+# sequence building functions, see render_elements
+render_settings = {'parallel': False, 'max_workers': None,
+                   'processes': False}
+
+
+def render_elements(elements, max_workers=None, processes=False):
+    """
+    Generates the waveforms of the segments of all channels of the elements
+    concurrently, in a thread pool or process pool, and stores them in the
+    waveform cache so that rendering the elements or a sequence of them
+    takes them from the cache. The elements themselves are not changed so
+    their order and the rendered waveforms are the same as without.
+    Segments with generating functions which are not cached are skipped.
+
+    Args:
+        elements: list of elements
+        max_workers (default None): number of threads or processes, None
+            for the number of cores
+        processes (default False): use a process pool instead of a thread
+            pool
+
+    Returns:
+        number of waveforms generated
+    """
+    calls = []
+    for element in elements:
+        for ch in element.keys():
+            for segment in element[ch].segment_list:
+                if not hasattr(segment.gen_func, '__wrapped__'):
+                    continue
+                func_args = dict(segment.func_args)
+                func_args.setdefault('SR', element.sample_rate)
+                calls.append((segment.gen_func, func_args))
+    return render_waveforms(calls, max_workers=max_workers,
+                            processes=processes)
+
+
+def _render_if_parallel(elements):
+    if render_settings['parallel']:
+        render_elements(elements,
+                        max_workers=render_settings['max_workers'],
+                        processes=render_settings['processes'])
+
+
+def make_varied_waveforms(element_template, vary_args_list,
+                          variable_arrays, pinned=None):
+    """
+    Generates the waveforms of the varied segments of element_template for
+    all the values of the variable arrays at once, using the broadcast
+    generators of math_functions. The waveforms are stored in the
+    waveform cache, so the elements of a varying sequence built from the
+    template render their varied segments from these arrays while the
+    segments which are not varied are generated once and shared. The
+    waveforms are pinned in the cache as long as the list pinned is
+    referenced, see stack_waveforms, so that they are not generated again
+    once more waveforms than waveform_cache_size have been cached.
+
+    vary_args list goes like
+        [(vary_ch_1, vary_seg_1, vary_arg_1), (vary_ch_2...)...]
+    variable_arrays goes like
+        [values_1, values_2...]
+
+    Returns:
+        dictionary from (channel, segment index) to the waveforms of the
+        segment, a 2D array with one row for each value
+    """
+    varied = OrderedDict()
+    for vary_args, values in zip(vary_args_list, variable_arrays):
+        varied.setdefault(tuple(vary_args[:2]), {})[vary_args[2]] = values
+    waves = {}
+    for (ch, seg_i), variable_args in varied.items():
+        segment = element_template[ch].segment_list[seg_i]
+        func_args = {k: v for k, v in segment.func_args.items()
+                     if k not in variable_args}
+        SR = func_args.pop('SR', element_template.sample_rate)
+        waves[(ch, seg_i)] = stack_waveforms(
+            segment.gen_func, func_args, variable_args, SR, pinned=pinned)
+    return waves
+
+
+def _varied_segments(element_template, vary_args_list, variable_arrays):
+    """
+    Segments of element_template with varied arguments, one for each value
+    of the variable arrays, as a dictionary from (channel, segment index)
+    to the list of segments.
+    """
+    varied = OrderedDict()
+    for vary_args, values in zip(vary_args_list, variable_arrays):
+        varied.setdefault(tuple(vary_args[:2]), {})[vary_args[2]] = values
+    segments = {}
+    for (ch, seg_i), variable_args in varied.items():
+        segment = element_template[ch].segment_list[seg_i]
+        num = len(next(iter(variable_args.values())))
+        segments[(ch, seg_i)] = [
+            Segment(name=segment.name, gen_func=segment.gen_func,
+                    func_args=dict(segment.func_args, **{
+                        name: values[j]
+                        for name, values in variable_args.items()}),
+                    time_markers=segment.time_markers)
+            for j in range(num)]
+    return segments
+
+
+def _compensating_durations(element_template, compensations, segments,
+                            total_time):
+    """
+    Durations of the compensating segments, given as (channel, segment
+    index), which make the waveforms of the elements total_time long, one
+    array with a value for each element for each of them.
+    """
+    num = len(next(iter(segments.values())))
+    durations = {}
+    for ch, comp_i in compensations:
+        duration = np.zeros(num)
+        for seg_i, segment in enumerate(element_template[ch].segment_list):
+            if seg_i == comp_i:
+                continue
+            if (ch, seg_i) in segments:
+                duration += [s.duration for s in segments[(ch, seg_i)]]
+            else:
+                duration += segment.duration
+        durations[(ch, comp_i)] = total_time - duration
+    return durations
+
+
+def _build_varied_elements(element_template, segments, readout_ch,
+                           marker_points):
+    """
+    Elements of a varying sequence, with the varied segments in segments
+    and the other segments shared with element_template. The first element
+    gets the marker on readout_ch which starts the sequence.
+    """
+    num = len(next(iter(segments.values())))
+    elements = []
+    for j in range(num):
+        element = Element(sample_rate=element_template.sample_rate)
+        for ch in element_template.keys():
+            template_wf = element_template[ch]
+            if j == 0 and ch == readout_ch:
+                # the marker added below is only on this waveform
+                waveform = template_wf.copy()
+            else:
+                waveform = copy.copy(template_wf)
+            waveform.segment_list = [
+                segments[(ch, seg_i)][j] if (ch, seg_i) in segments
+                else segment
+                for seg_i, segment in enumerate(template_wf.segment_list)]
+            element.add_waveform(waveform)
+        elements.append(element)
+    elements[0][readout_ch].add_marker(2, 0, marker_points)
+    return elements
+
+
 def make_varying_sequence(element_template, vary_args_list,
                           vary_settings_list,
                           name=None, variable_name=None,
@@ -38,6 +396,10 @@ def make_varying_sequence(element_template, vary_args_list,
         [(vary_ch_1, vary_seg_1, vary_arg_1), (vary_ch_2...)...]
     vary_settings list goes like
         [(start1, stop1, step1), (start2, stop2, ...)...]
+
+    The waveforms of the varied segments are generated for all elements at
+    once, see make_varied_waveforms, and the elements share the segments
+    which are not varied with element_template.
     """
     var_name = variable_name or ''.join([d[3] for d in vary_args_list])
     seq_name = name or variable_name + '_varying_seq'
@@ -58,13 +420,16 @@ def make_varying_sequence(element_template, vary_args_list,
     if len(set(elemnums)) != 1:
         raise Exception('variable arrays do not all have same length: {}'
                         ''.format(elemnums))
-    for j in range(elemnum):
-        elem = element_template.copy()
-        for ch_i, vary_args in enumerate(vary_args_list):
-            elem[vary_args[0]].segment_list[vary_args[1]].func_args[
-                vary_args[2]] = variable_arrays[ch_i][j]
-        if j == 0:
-            elem[readout_ch].add_marker(2, 0, marker_points)
+    # the sequence keeps the varied waveforms pinned until it is rendered
+    sequence.pinned_waveforms = []
+    make_varied_waveforms(element_template, vary_args_list, variable_arrays,
+                          pinned=sequence.pinned_waveforms)
+    segments = _varied_segments(element_template, vary_args_list,
+                                variable_arrays)
+    elements = _build_varied_elements(element_template, segments,
+                                      readout_ch, marker_points)
+    _render_if_parallel(elements)
+    for elem in elements:
         sequence.add_element(elem)
     sequence.check()
     return sequence
@@ -81,6 +446,12 @@ def make_time_varying_sequence(element_template, vary_args_list,
         [(vary_ch_1, vary_seg_1, vary_arg_1, compensate_seg_1), ...]
     vary_settings list goes like
         [(start1, stop1, step1), (start2, stop2, ...)...]
+
+    The duration of the compensating segment of each varied channel is set
+    such that its waveform is total_time long. The waveforms of the varied
+    and compensating segments are generated for all elements at once, see
+    make_varied_waveforms, and the elements share the other segments with
+    element_template.
     """
     var_name = variable_name or ''.join([d[2] for d in vary_args_list])
     seq_name = (name or variable_name or 'general') + '_time_varying_seq'
@@ -101,16 +472,27 @@ def make_time_varying_sequence(element_template, vary_args_list,
     if len(set(elemnums)) != 1:
         raise Exception('variable arrays do not all have same length: {}'
                         ''.format(elemnums))
-    for j in range(elemnum):
-        elem = element_template.copy()
-        for ch_i, vary_args in enumerate(vary_args_list):
-            elem[vary_args[0]].segment_list[vary_args[1]].func_args[
-                vary_args[2]] = variable_arrays[ch_i][j]
-            c_dur = total_time - elem[vary_args[0]].duration
-            elem[vary_args[0]].segment_list[vary_args[3]].func_args[
-                "dur"] = c_dur
-        if j == 0:
-            elem[readout_ch].add_marker(2, 0, marker_points)
+    varied_args = [tuple(v[:3]) for v in vary_args_list]
+    segments = _varied_segments(element_template, varied_args,
+                                variable_arrays)
+    compensations = list(OrderedDict.fromkeys(
+        (v[0], v[3]) for v in vary_args_list))
+    durations = _compensating_durations(element_template, compensations,
+                                        segments, total_time)
+    varied_args += [(ch, comp_i, 'dur') for ch, comp_i in compensations]
+    variable_arrays = list(variable_arrays) + [
+        durations[compensation] for compensation in compensations]
+    # the sequence keeps the varied waveforms pinned until it is rendered
+    sequence.pinned_waveforms = []
+    make_varied_waveforms(element_template, varied_args, variable_arrays,
+                          pinned=sequence.pinned_waveforms)
+    segments.update(_varied_segments(
+        element_template, varied_args[-len(compensations):],
+        variable_arrays[-len(compensations):]))
+    elements = _build_varied_elements(element_template, segments,
+                                      readout_ch, marker_points)
+    _render_if_parallel(elements)
+    for elem in elements:
         sequence.add_element(elem)
     sequence.check()
     return sequence
@@ -774,6 +1156,7 @@ def make_sequence_from_gate_lists(
     seq = Sequence(name=name or 'seq_from_gates',
                    variable_label=variable_label)
 
+    elements = []
     for i, gate_list in enumerate(gate_lists):
         element = make_element_from_gate_list(
             gate_list, SSBfreq=SSBfreq, drag=drag, gaussian=gaussian,
@@ -783,6 +1166,9 @@ def make_sequence_from_gate_lists(
             marker_points = int(get_calibration_val('marker_time') *
                                 get_calibration_val('sample_rate'))
             element[channels[3]].add_marker(2, 0, marker_points)
+        elements.append(element)
+    _render_if_parallel(elements)
+    for element in elements:
         seq.add_element(element)
     seq.check()
     return seq
@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from qdev_wrappers.file_setup import CURRENT_EXPERIMENT
+from . import profile_generators, clear_waveform_cache
+
+# calibration values of a typical single qubit setup for building sequences
+# without an experiment, see dummy_calibration
+dummy_calibration_values = {
+    'sample_rate': 1e9,
+    'cycle_time': 20e-6,
+    'pulse_end': 10e-6,
+    'pulse_readout_delay': 30e-9,
+    'readout_time': 2e-6,
+    'readout_amp': 1,
+    'marker_time': 500e-9,
+    'marker_readout_delay': 0,
+    'pulse_mod_time': 1.5e-6,
+    'qubit_spec_time': 5e-6,
+    'pi_pulse_sigma': 10e-9,
+    'sigma_cutoff': 4,
+    'pi_pulse_amp': 1,
+    'pi_half_pulse_amp': 0.5,
+    'pi_pulse_dur': 40e-9,
+    'drag_coef': 0.1,
+    'z_pulse_amp': 0.5,
+    'z_half_pulse_amp': 0.25,
+    'z_pulse_dur': 40e-9}
+
+
+@contextmanager
+def dummy_calibration(qubit_count=1, **values):
+    """
+    Context manager which sets up a temporary calibration config, and the
+    qubit count, so that sequences can be built without initialising an
+    experiment. The values are those of dummy_calibration_values updated
+    with values and are the same for all qubits.
+
+    Args:
+        qubit_count (int) (default 1)
+        values: calibration values to override
+    """
+    values = dict(dummy_calibration_values, **values)
+    folder = tempfile.mkdtemp()
+    with open(os.path.join(folder, 'calib.config'), 'w') as f:
+        f.write('[Pulse]\n')
+        for k, v in values.items():
+            f.write('{} = {}\n'.format(k, " ".join([str(v)] * qubit_count)))
+    keys = ['scriptfolder', 'calib_config', 'qubit_count', 'current_qubit']
+    previous = {k: CURRENT_EXPERIMENT[k] for k in keys
+                if k in CURRENT_EXPERIMENT}
+    CURRENT_EXPERIMENT.update(scriptfolder=folder, calib_config='general',
+                              qubit_count=qubit_count, current_qubit=0)
+    try:
+        yield
+    finally:
+        for k in keys:
+            CURRENT_EXPERIMENT.pop(k, None)
+        CURRENT_EXPERIMENT.update(previous)
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def profile_sequence_build(build, *args, render=True, print_profile=True,
+                           **kwargs):
+    """
+    Builds a sequence with an empty waveform cache and profiles it.
+
+    Args:
+        build: sequence building function called with args and kwargs
+        render (default True): also render the sequence by unwrapping it,
+            which is where most waveforms are generated
+        print_profile (default True)
+
+    Returns:
+        dictionary with the number of elements, the build and render
+        times, the peak memory allocated in bytes and, under 'generators',
+        the statistics of the waveform generators, see profile_generators
+    """
+    clear_waveform_cache()
+    tracemalloc.start()
+    try:
+        with profile_generators() as generators:
+            start = time.perf_counter()
+            sequence = build(*args, **kwargs)
+            build_time = time.perf_counter() - start
+            start = time.perf_counter()
+            if render:
+                sequence.unwrap()
+            render_time = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    profile = {'elements': len(sequence),
+               'build_time': build_time,
+               'render_time': render_time,
+               'peak_memory': peak_memory,
+               'generators': dict(generators)}
+    if print_profile:
+        _print_profile(profile)
+    return profile
+
+
+def _print_profile(profile):
+    print('{} elements built in {:.3f} s and rendered in {:.3f} s, peak '
+          'memory {:.1f} MB'.format(profile['elements'],
+                                    profile['build_time'],
+                                    profile['render_time'],
+                                    profile['peak_memory'] / 1e6))
+    generators = sorted(profile['generators'].items(),
+                        key=lambda item: -item[1]['time'])
+    for name, stats in generators:
+        print('{}: {} generated in {:.3f} s, {} samples, {} from cache'
+              ''.format(name, stats['generated'], stats['time'],
+                        stats['samples'], stats['cached']))